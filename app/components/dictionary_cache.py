@@ -0,0 +1,21 @@
+import os
+import sys
+
+import streamlit as st
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+from dictionary_provider import DictionaryProvider
+from dictionary_store import DictionaryStore
+from file_processor import DICTIONARY_PATH
+
+
+@st.cache_resource
+def get_dictionary_store():
+    """Versioned store behind the user-defined dictionary."""
+    return DictionaryStore(os.path.dirname(DICTIONARY_PATH))
+
+
+@st.cache_resource
+def get_dictionary_provider():
+    """Provider of the compiled user-defined dictionary."""
+    return DictionaryProvider(get_dictionary_store())
@@ -3,6 +3,7 @@ import pandas as pd
 import os
 from components.sidebar import show_sidebar
 from components.footer import show_footer
+from components.dictionary_cache import get_dictionary_provider, get_dictionary_store
 
 # Page config
 st.set_page_config(page_title="Manage Coding Dictionary", layout="wide")
@@ -35,12 +36,9 @@ if uploaded_file:
         df.columns = [col.lower() for col in df.columns]
 
         if set(df.columns) == REQUIRED_COLUMNS:
-            # Delete all existing dictionary files
-            for f in os.listdir(UPLOAD_FOLDER):
-                if f.endswith('.csv'):
-                    os.remove(os.path.join(UPLOAD_FOLDER, f))
-            # No need to backup, since all csv files are deleted
-            df.to_csv(DICT_PATH, index=False)
+            # Save as a new version; runs already coding keep the one they pinned
+            get_dictionary_store().save(df.to_csv(index=False).encode('utf-8'))
+            get_dictionary_provider().invalidate()
             st.success("✅ Dictionary uploaded and saved successfully!")
 
         else:
@@ -82,7 +80,8 @@ if os.path.exists(DICT_PATH):
     col1, col2 = st.columns([1, 1])
     with col1:
         if st.button("💾 Save Changes"):
-            edited_df.to_csv(DICT_PATH, index=False)
+            get_dictionary_store().save(edited_df.to_csv(index=False).encode('utf-8'))
+            get_dictionary_provider().invalidate()
             st.success("✅ Changes saved!")
 
     # Download
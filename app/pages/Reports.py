@@ -1,8 +1,12 @@
+import os
+import sys
 import matplotlib.pyplot as plt
-import pandas as pd
 import streamlit as st
 from components.footer import show_footer
 from components.sidebar import show_sidebar
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+from label_matrix import LabelMatrix, file_label_counts
+from summary_report import FrequencyCounter, combine
 
 st.set_page_config(page_title="Reports and Analysis", layout="wide")
 
@@ -11,26 +15,58 @@ show_sidebar()
 st.title("📊 Reports and Analysis")
 
 
-def aggregate_frequencies(dfs):
-    """Aggregate B5T frequencies from multiple DataFrames."""
-    if not dfs:
-        return None
+def file_summaries(dfs):
+    """
+    B5T counts of each processed transcript.
+
+    The Upload page stores them when it codes the files; they are only
+    counted here again if missing, e.g. for a session from before they
+    were stored.
+    """
+    summaries = st.session_state.get("processed_summaries") or []
+    if len(summaries) == len(dfs):
+        return list(summaries)
+    return [
+        FrequencyCounter.from_series(df["B5T"]) if "B5T" in df.columns else None
+        for df in dfs
+    ]
 
-    # Check if 'B5T' column exists in DataFrames
-    valid_dfs = [df for df in dfs if "B5T" in df.columns]
-    if not valid_dfs:
+
+def aggregate_frequencies(summaries):
+    """Aggregate B5T frequencies from the per-transcript counts."""
+    counters = [counter for counter in summaries if counter is not None]
+    if not counters:
         return None
 
-    # Combine DataFrames and calculate frequencies
-    combined = pd.concat(valid_dfs, ignore_index=True)
-    freq = combined["B5T"].value_counts().reset_index()
-    freq.columns = ["B5T", "frequency"]
-    return freq.sort_values("B5T")
+    # Merge per-transcript counts instead of concatenating every row
+    return combine(counters).to_frame("frequency")
+
+
+def label_matrices(dfs):
+    """
+    LabelMatrix of every label matched by each processed transcript.
+
+    The Upload page builds them while coding; None for a session from
+    before they were stored.
+    """
+    matrices = st.session_state.get("processed_labels") or []
+    if len(matrices) == len(dfs):
+        return list(matrices)
+    return [None] * len(dfs)
+
+
+def file_crosstabs(dfs):
+    """Cross-tab counts of each processed transcript, as stored by the Upload page."""
+    crosstabs = st.session_state.get("processed_crosstabs") or []
+    if len(crosstabs) == len(dfs):
+        return list(crosstabs)
+    return [None] * len(dfs)
 
 
 # Access processed DataFrames from session_state
 if "processed_dfs" in st.session_state and st.session_state["processed_dfs"]:
     processed_dfs = st.session_state["processed_dfs"]
+    summaries = file_summaries(processed_dfs)
 
     st.success(f"Found {len(processed_dfs)} processed transcript(s) for analysis.")
 
@@ -47,16 +83,15 @@ if "processed_dfs" in st.session_state and st.session_state["processed_dfs"]:
             st.dataframe(df.head(), use_container_width=True, hide_index=True)
 
             # Show B5T distribution for this file
-            if "B5T" in df.columns:
-                file_freq = df["B5T"].value_counts().reset_index()
-                file_freq.columns = ["B5T", "count"]
+            if summaries[i] is not None:
+                file_freq = summaries[i].to_frame("count", by_frequency=True)
                 st.caption("B5T distribution in this transcript:")
                 st.dataframe(file_freq, use_container_width=True, hide_index=True)
 
             st.divider()
 
     # Calculate frequency table for all transcripts
-    freq_df = aggregate_frequencies(processed_dfs)
+    freq_df = aggregate_frequencies(summaries)
 
     if freq_df is not None:
         st.header("🔍 Code Frequency Analysis")
@@ -96,6 +131,49 @@ if "processed_dfs" in st.session_state and st.session_state["processed_dfs"]:
             fig, ax = plt.subplots(figsize=(10, 10))
             freq_df.plot.pie(y="frequency", labels=freq_df["B5T"], ax=ax, legend=False)
             st.pyplot(fig)
+
+        # Every matched label, not only the resolved slots. The tables are
+        # merged from per-transcript counts made at coding time, so a rerun
+        # never goes over the coded rows
+        labelled = [
+            (labels, crosstabs)
+            for labels, crosstabs in zip(
+                label_matrices(processed_dfs), file_crosstabs(processed_dfs)
+            )
+            if labels is not None and crosstabs is not None and "Label" in crosstabs
+        ]
+        if not labelled:
+            st.info("🔁 Upload the transcripts again to see label cross-tabs and co-occurrence.")
+        else:
+            st.header("🔗 Label Cross-tabs and Co-occurrence")
+            matrices = [labels for labels, _ in labelled]
+            matrix = LabelMatrix.concat(matrices)
+
+            st.subheader("B5T × Subcategory1")
+            subcategory1 = sum(crosstabs["Subcategory1"] for _, crosstabs in labelled).to_frame()
+            st.dataframe(subcategory1.rename(columns={"": "(none)"}))
+
+            st.subheader("B5T × Matched Label")
+            st.caption("Rows of each B5T code that matched each dictionary label.")
+            st.dataframe(sum(crosstabs["Label"] for _, crosstabs in labelled).to_frame())
+
+            st.subheader("Label Co-occurrence")
+            st.caption("Rows that matched both labels; the diagonal counts each label.")
+            cooccurrence = matrix.cooccurrence()
+            st.dataframe(cooccurrence)
+            st.download_button(
+                label="⬇️ Download Co-occurrence CSV",
+                data=cooccurrence.to_csv().encode("utf-8"),
+                file_name="label_cooccurrence.csv",
+                mime="text/csv",
+            )
+
+            st.subheader("Transcript × Label")
+            st.dataframe(
+                file_label_counts(
+                    matrices, [f"Transcript #{i+1}" for i in range(len(matrices))]
+                )
+            )
     else:
         st.warning(
             "The processed transcripts do not contain 'B5T' column. Please ensure your transcripts were properly coded."
@@ -1,12 +1,17 @@
 import streamlit as st
+import logging
 import os
 import sys
-import tempfile
+from datetime import datetime
 import pandas as pd
+from components.dictionary_cache import get_dictionary_provider, get_dictionary_store
 from components.footer import show_footer
 from components.sidebar import show_sidebar
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
-from file_processor import process_multi_files, process_single_file
+from file_processor import process_dataframes
+from job_queue import ACTIVE_STATUSES, DONE, JobQueue
+from result_cache import ResultCache, content_hash
+from summary_report import FrequencyCounter, combine
 
 
 st.set_page_config(page_title="Upload Transcripts", layout="wide")
@@ -15,9 +20,10 @@ show_sidebar()
 for key in [
     "uploaded_files",
     "processed_files",
-    "temp_input_paths",
-    "temp_output_paths",
     "processed_dfs",
+    "processed_summaries",
+    "processed_labels",
+    "processed_crosstabs",
 ]:
     if key not in st.session_state:
         st.session_state[key] = []
@@ -31,6 +37,165 @@ if not os.path.exists(DICTIONARY_PATH):
     st.warning("⚠️No dictionary found. Please upload or create new dictionary before processing the transcript.")
 REPORT_FOLDER = os.path.join(os.path.dirname(__file__), '../uploaded_reports')
 os.makedirs(REPORT_FOLDER, exist_ok=True)
+RESULT_CACHE_FOLDER = os.path.join(os.path.dirname(__file__), '../result_cache')
+JOB_FOLDER = os.path.join(os.path.dirname(__file__), '../jobs')
+
+
+@st.cache_resource
+def get_result_cache():
+    """Cache of coded transcripts, keyed by file and dictionary."""
+    return ResultCache(RESULT_CACHE_FOLDER)
+
+
+@st.cache_resource
+def get_job_queue():
+    """Queue of background coding jobs."""
+    return JobQueue(JOB_FOLDER)
+
+
+def read_upload(file):
+    """Parse an uploaded transcript, reporting problems on the page."""
+    content = file.getvalue().decode("utf-8")
+    if not content.strip():
+        st.error(f"❌ File {file.name} is empty.")
+        return None
+
+    try:
+        file.seek(0)
+        df = pd.read_csv(file)
+    except pd.errors.ParserError:
+        lines = [line.strip() for line in content.split("\n") if line.strip()]
+        df = pd.DataFrame({"text": lines})
+
+    if "text" not in df.columns and "Text" not in df.columns:
+        if len(df.columns) == 1:
+            df.columns = ["text"]
+        else:
+            st.error(
+                f"❌ File {file.name} does not contain a valid 'text' column."
+            )
+            return None
+    return df
+
+
+def code_uploads(files, compiled_dict):
+    """
+    Code uploaded transcripts with the result cache in front.
+
+    A transcript already coded with this dictionary is served from the
+    cache; one coded with an earlier version is recoded incrementally.
+    The rest are coded in memory and cached.
+
+    Returns:
+        (coded_dfs, summaries, labels, crosstabs): coded DataFrame, B5T
+        FrequencyCounter, LabelMatrix and cross-tab counts per position in
+        files, for the files that succeeded
+    """
+    result_cache = get_result_cache()
+    coded_dfs = {}
+    summaries = {}
+    labels = {}
+    crosstabs = {}
+    pending = []
+
+    # Process files without showing the upload list
+    for idx, file in enumerate(files):
+        try:
+            file_hash = content_hash(file.getvalue())
+            cached_df = result_cache.get_coded(file_hash, compiled_dict)
+            if cached_df is not None:
+                coded_dfs[idx] = cached_df
+                summary = result_cache.get_summary(file_hash, compiled_dict)
+                if summary is None:
+                    summary = FrequencyCounter.from_series(cached_df["B5T"])
+                summaries[idx] = summary
+                labels[idx] = result_cache.get_labels(file_hash, compiled_dict)
+                crosstabs[idx] = result_cache.get_crosstabs(file_hash, compiled_dict)
+                continue
+
+            df = read_upload(file)
+            if df is None:
+                continue
+
+            pending.append((idx, file_hash, df))
+
+        except Exception as e:
+            st.error(f"❌ Failed to process `{file.name}`: {e}")
+
+    # Code every file that missed the cache straight from memory. This runs
+    # in-process: forking a pool from the multithreaded Streamlit server
+    # risks deadlocks, and large batches can be run as a background job
+    results = process_dataframes(
+        [df for _, _, df in pending], compiled_dict, workers=1
+    )
+    for (idx, file_hash, _), result in zip(pending, results):
+        if result["error"]:
+            st.error(f"❌ Failed to process `{files[idx].name}`: {result['error']}")
+            continue
+        coded_dfs[idx] = result["output"]
+        summaries[idx] = result["summary"]
+        labels[idx] = result["labels"]
+        crosstabs[idx] = result["crosstabs"]
+        try:
+            result_cache.put_coded(
+                file_hash,
+                compiled_dict,
+                result["output"],
+                summary=result["summary"],
+                labels=result["labels"],
+                crosstabs=result["crosstabs"],
+            )
+        except Exception as e:
+            # The file is coded either way; it is just coded again next time
+            logging.warning(f"Could not cache coded transcript {files[idx].name}: {e}")
+    return coded_dfs, summaries, labels, crosstabs
+
+
+def show_background_jobs(queue):
+    """List background jobs with their per-file progress and results."""
+    st.subheader("🕒 Background Jobs")
+    st.button("🔄 Refresh progress")
+    jobs = queue.jobs()
+    if not jobs:
+        st.info("No background jobs yet.")
+        return
+
+    for job in jobs:
+        created = datetime.fromtimestamp(job["created"]).strftime("%Y-%m-%d %H:%M:%S")
+        active = job["status"] in ACTIVE_STATUSES
+        with st.expander(
+            f"Job started {created}: {job['status']} ({job['finished']}/{job['total']} files)",
+            expanded=active,
+        ):
+            st.progress(job["finished"] / job["total"] if job["total"] else 0.0)
+            if job["error"]:
+                st.error(f"❌ {job['error']}")
+
+            files = queue.files(job["id"])
+            st.dataframe(
+                pd.DataFrame(files)[["name", "status", "rows", "error"]],
+                use_container_width=True,
+                hide_index=True,
+            )
+            for f in files:
+                if f["status"] == DONE and os.path.exists(f["output_path"]):
+                    with open(f["output_path"], "rb") as output:
+                        st.download_button(
+                            label=f"⬇️ Download processed result: processed_{f['name']}",
+                            data=output.read(),
+                            file_name=f"processed_{f['name']}",
+                            mime="text/csv",
+                            key=f"download_job_{job['id']}_{f['position']}",
+                        )
+
+            if active:
+                if st.button("⏹️ Cancel job", key=f"cancel_job_{job['id']}"):
+                    queue.cancel(job["id"])
+                    st.rerun()
+            elif st.button("🗑️ Delete job", key=f"delete_job_{job['id']}"):
+                queue.delete(job["id"])
+                st.rerun()
+
 
 with st.expander("📋 View file format requirements"):
     st.warning(
@@ -43,6 +208,13 @@ with st.expander("📋 View file format requirements"):
         """
     )
 
+job_queue = get_job_queue()
+try:
+    # Restart jobs whose runner was lost, e.g. in a server restart
+    job_queue.resume()
+except Exception as e:
+    st.error(f"❌ Could not resume background jobs: {e}")
+
 st.subheader("⬆️ Upload Files:")
 uploaded_files = st.file_uploader(
     "Upload one or more transcript CSV files",
@@ -50,87 +222,56 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True,
     key="uploader",
 )
+run_in_background = st.toggle(
+    "🕒 Run in background",
+    help="Code the files in a background job that keeps running if you close this tab",
+)
 
-if uploaded_files:
-    st.session_state.uploaded_files = uploaded_files
-    st.session_state.temp_input_paths.clear()
-    st.session_state.temp_output_paths.clear()
-    st.session_state.processed_dfs.clear()
-
-    # Process files without showing the upload list
-    for file in uploaded_files:
-        try:
-            content = file.getvalue().decode("utf-8")
-            if not content.strip():
-                st.error(f"❌ File {file.name} is empty.")
-                continue
-
+if uploaded_files and run_in_background:
+    if st.button("🚀 Start background job"):
+        job_files = []
+        for file in uploaded_files:
             try:
-                file.seek(0)
-                df = pd.read_csv(file)
-            except pd.errors.ParserError:
-                lines = [line.strip() for line in content.split("\n") if line.strip()]
-                df = pd.DataFrame({"text": lines})
-
-            if "text" not in df.columns and "Text" not in df.columns:
-                if len(df.columns) == 1:
-                    df.columns = ["text"]
-                else:
-                    st.error(
-                        f"❌ File {file.name} does not contain a valid 'text' column."
-                    )
-                    continue
-
-            temp_input = tempfile.NamedTemporaryFile(
-                delete=False, suffix=".csv", prefix="dialogcoder_input_"
-            )
-            df.to_csv(temp_input.name, index=False)
-            st.session_state.temp_input_paths.append(temp_input.name)
-
-            temp_output = tempfile.NamedTemporaryFile(
-                delete=False, suffix=".csv", prefix="dialogcoder_output_"
-            )
-            st.session_state.temp_output_paths.append(temp_output.name)
+                df = read_upload(file)
+            except Exception as e:
+                st.error(f"❌ Failed to process `{file.name}`: {e}")
+                continue
+            if df is not None:
+                job_files.append((file.name, df))
+        if job_files:
+            job_queue.submit(job_files, get_dictionary_store().current_path())
+            st.success(f"✅ Queued {len(job_files)} file(s). Progress is shown below.")
 
-        except Exception as e:
-            st.error(f"❌ Failed to process `{file.name}`: {e}")
+elif uploaded_files:
+    st.session_state.uploaded_files = uploaded_files
+    st.session_state.processed_dfs.clear()
+    st.session_state.processed_summaries.clear()
+    st.session_state.processed_labels.clear()
+    st.session_state.processed_crosstabs.clear()
 
-    if len(st.session_state.temp_input_paths) == 1:
-        process_single_file(
-            st.session_state.temp_input_paths[0], st.session_state.temp_output_paths[0]
-        )
-    elif len(st.session_state.temp_input_paths) > 1:
-        process_multi_files(
-            st.session_state.temp_input_paths, st.session_state.temp_output_paths
-        )
+    compiled_dict = get_dictionary_provider().get()
+    coded_dfs, summaries, labels, crosstabs = code_uploads(uploaded_files, compiled_dict)
+    st.session_state["coded_dictionary_hash"] = compiled_dict.content_hash
 
     for idx, file in enumerate(st.session_state.uploaded_files):
-        try:
-            path = st.session_state.temp_output_paths[idx]
-        except IndexError:
+        if idx not in coded_dfs:
             st.warning(f"⚠️ Skipping `{file.name}`: no processed output found.")
             continue
 
-        if not os.path.exists(path):
-            st.warning(f"⚠️ Skipping `{file.name}`: processed file not found.")
-            continue
-
-        with open(path, "rb") as f:
-            st.download_button(
-                label=f"⬇️ Download processed result: processed_{file.name}",
-                data=f.read(),
-                file_name=f"processed_{file.name}",
-                mime="text/csv",
-
-                key=f"download_processed_{idx}_{file.name}"
+        df = coded_dfs[idx]
+        st.download_button(
+            label=f"⬇️ Download processed result: processed_{file.name}",
+            data=df.to_csv(index=False).encode("utf-8"),
+            file_name=f"processed_{file.name}",
+            mime="text/csv",
 
-            )
+            key=f"download_processed_{idx}_{file.name}"
 
-        try:
-            df = pd.read_csv(path)
-            st.session_state["processed_dfs"].append(df)
-        except Exception:
-            st.error(f"❌ Failed to preview `{file.name}`.")
+        )
+        st.session_state["processed_dfs"].append(df)
+        st.session_state["processed_summaries"].append(summaries[idx])
+        st.session_state["processed_labels"].append(labels[idx])
+        st.session_state["processed_crosstabs"].append(crosstabs[idx])
 
     # Display processed results
     if st.session_state["processed_dfs"]:
@@ -147,11 +288,8 @@ if uploaded_files:
                 f"📊 B5T Code Frequency Statistics - {file_name}", expanded=True
             ):
                 if "B5T" in df.columns:
-                    freq_df = df["B5T"].value_counts().reset_index()
-                    freq_df.columns = ["B5T", "Frequency"]
-                    if not freq_df.empty and "B5T" in freq_df.columns:
-                        freq_df["B5T"] = freq_df["B5T"].astype(str)
-                        freq_df = freq_df.sort_values("B5T")
+                    freq_df = st.session_state["processed_summaries"][idx].to_frame()
+                    if not freq_df.empty:
                         csv = freq_df.to_csv(index=False).encode("utf-8")
                         st.download_button(
                             f"⬇️ Download B5T_frequency_{file_name}",
@@ -172,15 +310,11 @@ if uploaded_files:
 
         # Display combined statistics
         with st.expander("📊 Combined B5T Code Frequency Statistics", expanded=True):
-            combined_df = pd.concat(
-                st.session_state["processed_dfs"], ignore_index=True
-            )
-            if "B5T" in combined_df.columns:
-                freq_df = combined_df["B5T"].value_counts().reset_index()
-                freq_df.columns = ["B5T", "Frequency"]
-                if not freq_df.empty and "B5T" in freq_df.columns:
-                    freq_df["B5T"] = freq_df["B5T"].astype(str)
-                    freq_df = freq_df.sort_values("B5T")
+            # Corpus totals are merged from the per-file counts stored at coding time
+            counters = st.session_state["processed_summaries"]
+            if counters:
+                freq_df = combine(counters).to_frame()
+                if not freq_df.empty:
                     csv = freq_df.to_csv(index=False).encode("utf-8")
                     st.download_button(
                         "⬇️ Download Combined_B5T_frequency.csv",
@@ -201,6 +335,18 @@ if uploaded_files:
 
 # Display cached results when returning from other pages
 elif st.session_state["uploaded_files"]:
+    compiled_dict = get_dictionary_provider().get()
+    if st.session_state.get("coded_dictionary_hash") != compiled_dict.content_hash:
+        # The dictionary was edited since these transcripts were coded
+        coded_dfs, summaries, labels, crosstabs = code_uploads(
+            st.session_state["uploaded_files"], compiled_dict
+        )
+        st.session_state["processed_dfs"] = [coded_dfs[idx] for idx in sorted(coded_dfs)]
+        st.session_state["processed_summaries"] = [summaries[idx] for idx in sorted(summaries)]
+        st.session_state["processed_labels"] = [labels[idx] for idx in sorted(labels)]
+        st.session_state["processed_crosstabs"] = [crosstabs[idx] for idx in sorted(crosstabs)]
+        st.session_state["coded_dictionary_hash"] = compiled_dict.content_hash
+        st.info("🔁 The dictionary has changed, so the transcripts were recoded with it.")
     st.success("Showing previously uploaded transcripts (cached).")
 
     # Display preview and frequency statistics for each file
@@ -214,11 +360,8 @@ elif st.session_state["uploaded_files"]:
         # Display frequency statistics
         with st.expander(f"📊 B5T Code Frequency Statistics - {fname}", expanded=True):
             if "B5T" in df.columns:
-                freq_df = df["B5T"].value_counts().reset_index()
-                freq_df.columns = ["B5T", "Frequency"]
-                if not freq_df.empty and "B5T" in freq_df.columns:
-                    freq_df["B5T"] = freq_df["B5T"].astype(str)
-                    freq_df = freq_df.sort_values("B5T")
+                freq_df = st.session_state["processed_summaries"][i].to_frame()
+                if not freq_df.empty:
                     csv = freq_df.to_csv(index=False).encode("utf-8")
                     st.download_button(
                         f"⬇️ Download B5T_frequency_{fname}",
@@ -239,13 +382,11 @@ elif st.session_state["uploaded_files"]:
 
     # Display combined statistics
     with st.expander("📊 Combined B5T Code Frequency Statistics", expanded=True):
-        combined_df = pd.concat(st.session_state["processed_dfs"], ignore_index=True)
-        if "B5T" in combined_df.columns:
-            freq_df = combined_df["B5T"].value_counts().reset_index()
-            freq_df.columns = ["B5T", "Frequency"]
-            if not freq_df.empty and "B5T" in freq_df.columns:
-                freq_df["B5T"] = freq_df["B5T"].astype(str)
-                freq_df = freq_df.sort_values("B5T")
+        # Corpus totals are merged from the per-file counts stored at coding time
+        counters = st.session_state["processed_summaries"]
+        if counters:
+            freq_df = combine(counters).to_frame()
+            if not freq_df.empty:
                 csv = freq_df.to_csv(index=False).encode("utf-8")
                 st.download_button(
                     "⬇️ Download Combined_B5T_frequency.csv",
@@ -267,5 +408,7 @@ elif st.session_state["uploaded_files"]:
 else:
     st.info("Upload transcript CSV files to begin.")
 
+show_background_jobs(job_queue)
+
 # Display footer
 show_footer()
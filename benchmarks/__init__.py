@@ -0,0 +1 @@
+"""Throughput benchmarks for the Plan A classifier and file processor."""
@@ -0,0 +1,205 @@
+"""
+Run the Plan A benchmarks and print the results as JSON.
+
+    python -m benchmarks.run                      # quick matrix
+    python -m benchmarks.run --full -o bench.json # 100..50k keywords, 1k..5M rows
+    python -m benchmarks.run --keywords 1000 --rows 100000 --cases classify_series
+
+Every case runs in a fresh process so its peak RSS is not inflated by
+earlier cases. Synthetic inputs are generated once per size into a
+temporary folder (or --data-dir, to reuse them between runs).
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+from benchmarks.synthetic import generate_dictionary, generate_transcript
+
+QUICK_KEYWORDS = [100, 1000, 10000]
+QUICK_ROWS = [1000, 100000]
+FULL_KEYWORDS = [100, 1000, 10000, 50000]
+FULL_ROWS = [1000, 100000, 1000000, 5000000]
+
+CASES = [
+    "find_b5t_labels",
+    "classify_series",
+    "process_single_file",
+    "process_single_file_streaming",
+    "process_multi_files",
+]
+
+# The row-by-row API is only timed up to this many rows to keep runs short
+ROW_API_LIMIT = 100000
+
+
+def _peak_rss_kb(who):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _run_case(case, dictionary_path, transcript_path, rows, workers, output_dir):
+    """Run one benchmark case. Executed in a fresh process."""
+    import logging
+
+    import pandas as pd
+
+    from classifier import (
+        classify_series,
+        compile_dictionary,
+        find_b5t_labels,
+        load_dictionaries,
+    )
+    from file_processor import process_multi_files, process_single_file
+
+    # Per-file progress logging would dominate the output of large runs
+    logging.getLogger().setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    compiled = compile_dictionary(load_dictionaries(dictionary_path))
+    compile_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if case == "find_b5t_labels":
+        texts = pd.read_csv(transcript_path)["text"].dropna().tolist()
+        started = time.perf_counter()
+        for text in texts:
+            find_b5t_labels(compiled, text)
+    elif case == "classify_series":
+        texts = pd.read_csv(transcript_path)["text"]
+        started = time.perf_counter()
+        classify_series(texts, compiled)
+    elif case == "process_single_file":
+        process_single_file(
+            transcript_path, os.path.join(output_dir, "single.csv"), compiled, workers=workers
+        )
+    elif case == "process_single_file_streaming":
+        process_single_file(
+            transcript_path,
+            os.path.join(output_dir, "streamed.csv"),
+            compiled,
+            workers=workers,
+            chunksize=100000,
+        )
+    elif case == "process_multi_files":
+        # Four copies of the transcript, one output each
+        outputs = [os.path.join(output_dir, f"multi_{i}.csv") for i in range(4)]
+        process_multi_files(
+            [transcript_path] * 4, outputs, workers=workers, dictionary_path=dictionary_path
+        )
+        rows *= 4
+    seconds = time.perf_counter() - started
+
+    return {
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+        "compile_seconds": round(compile_seconds, 4),
+        "peak_rss_kb": _peak_rss_kb(resource.RUSAGE_SELF),
+        "peak_rss_children_kb": _peak_rss_kb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def run(keyword_sizes, row_sizes, cases, workers, data_dir):
+    results = []
+    for keyword_count in keyword_sizes:
+        dictionary_path = os.path.join(data_dir, f"dictionary_{keyword_count}.csv")
+        if not os.path.exists(dictionary_path):
+            generate_dictionary(dictionary_path, keyword_count)
+        for row_count in row_sizes:
+            transcript_path = os.path.join(data_dir, f"transcript_{row_count}.csv")
+            if not os.path.exists(transcript_path):
+                generate_transcript(transcript_path, row_count)
+            for case in cases:
+                if case == "find_b5t_labels" and row_count > ROW_API_LIMIT:
+                    continue
+                with tempfile.TemporaryDirectory() as output_dir:
+                    # A fresh interpreter per case keeps peak RSS comparable
+                    with ProcessPoolExecutor(
+                        max_workers=1, mp_context=get_context("spawn")
+                    ) as pool:
+                        metrics = pool.submit(
+                            _run_case,
+                            case,
+                            dictionary_path,
+                            transcript_path,
+                            row_count,
+                            workers,
+                            output_dir,
+                        ).result()
+                result = {
+                    "case": case,
+                    "keywords": keyword_count,
+                    "rows": row_count,
+                    "workers": workers,
+                    **metrics,
+                }
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+    return results
+
+
+def environment():
+    import numpy
+    import pandas
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pandas.__version__,
+        "numpy": numpy.__version__,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--full", action="store_true", help="Run the full size matrix")
+    parser.add_argument("--keywords", type=int, nargs="+", help="Dictionary sizes")
+    parser.add_argument("--rows", type=int, nargs="+", help="Transcript sizes")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--workers", type=int, default=1, help="Workers for file processing")
+    parser.add_argument("--data-dir", help="Folder to keep generated inputs in")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    keyword_sizes = args.keywords or (FULL_KEYWORDS if args.full else QUICK_KEYWORDS)
+    row_sizes = args.rows or (FULL_ROWS if args.full else QUICK_ROWS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        os.makedirs(data_dir, exist_ok=True)
+        report = {
+            "environment": environment(),
+            "results": run(keyword_sizes, row_sizes, args.cases, args.workers, data_dir),
+        }
+        if not args.data_dir:
+            from dictionary_artifact import remove_artifacts
+
+            # Compiled artifacts of the throwaway dictionaries live outside tmp_dir
+            for keyword_count in keyword_sizes:
+                remove_artifacts(os.path.join(data_dir, f"dictionary_{keyword_count}.csv"))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Synthetic dictionaries and transcripts for benchmarking Plan A.
+
+Both are modeled on tests/sample_files: dictionaries use the same
+`b5t,keywords` layout with comma-separated keyword lists, and transcripts
+are single `text` column CSVs mixing verbatim sample utterances (which
+repeat heavily in real exercises) with generated radio-style sentences.
+"""
+
+import csv
+import os
+import random
+import re
+
+SAMPLE_FILES = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../tests/sample_files")
+)
+
+# Real B5T codes first, so small dictionaries exercise the TL and WL rules
+BASE_LABELS = ["ASP", "ORD", "DUP", "FB", "MV", "WL", "SA", "IR", "CF", "RQ"]
+
+
+def sample_utterances():
+    """Return every transcript line found in tests/sample_files."""
+    lines = []
+    for root, _, files in os.walk(SAMPLE_FILES):
+        for name in sorted(files):
+            if not name.endswith(".csv") or name == "dictionary.csv":
+                continue
+            with open(os.path.join(root, name), encoding="utf-8") as f:
+                lines.extend(row["text"] for row in csv.DictReader(f) if row.get("text"))
+    return lines
+
+
+def vocabulary(size, rng):
+    """Words from the sample transcripts padded with generated words."""
+    words = sorted(
+        {w.lower() for line in sample_utterances() for w in re.findall(r"[A-Za-z]\w*", line)}
+    )
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice("abcdefghiklmnoprstuvwy") for _ in range(rng.randint(3, 9)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def generate_dictionary(path, keyword_count, seed=0):
+    """
+    Write a dictionary CSV with keyword_count keywords spread over labels.
+
+    About one keyword in four is a two- or three-word phrase.
+    """
+    rng = random.Random(seed)
+    words = vocabulary(keyword_count * 2, rng)
+    label_count = max(len(BASE_LABELS), keyword_count // 50)
+    labels = BASE_LABELS + [f"C{i}" for i in range(label_count - len(BASE_LABELS))]
+
+    keywords = {label: [] for label in labels}
+    for i in range(keyword_count):
+        if rng.random() < 0.25:
+            keyword = " ".join(rng.sample(words, rng.randint(2, 3)))
+        else:
+            keyword = words[i % len(words)]
+        keywords[labels[i % len(labels)]].append(keyword)
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["b5t", "keywords"])
+        for label in labels:
+            writer.writerow([label, ",".join(keywords[label])])
+    return path
+
+
+def generate_transcript(path, row_count, repeat_ratio=0.5, seed=0):
+    """
+    Write a transcript CSV of row_count rows.
+
+    repeat_ratio of the rows are verbatim sample utterances; the rest are
+    generated sentences of 4 to 20 words.
+    """
+    rng = random.Random(seed)
+    utterances = sample_utterances()
+    words = vocabulary(5000, rng)
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["text"])
+        for _ in range(row_count):
+            if rng.random() < repeat_ratio:
+                text = rng.choice(utterances)
+            else:
+                text = " ".join(rng.choices(words, k=rng.randint(4, 20))).capitalize()
+            writer.writerow([text])
+    return path
@@ -3,15 +3,15 @@ TODO MVP v0.1
 """
 
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
-from tqdm import tqdm
 
 from planb.column_inference.infer_columns import infer_dictionary_columns
 from planb.logging.logger import Logger
 from planb.pipeline.aggregator import aggregate
-from planb.pipeline.keyword_matcher import keyword_match
-from planb.pipeline.llm_adapter import OpenRouterClient
+from planb.pipeline.keyword_matcher import KeywordMatcher
+from planb.pipeline.llm_adapter import AsyncOpenRouterClient
 
 
 class Dispatcher:
@@ -32,12 +32,32 @@ class Dispatcher:
         """
 
 
+def read_table(fp: str, kind: str) -> pd.DataFrame:
+    """
+    Read a CSV or Excel file into a DataFrame.
+
+    Args:
+        fp: File path to the CSV/Excel file
+        kind: What the file holds, used in the error message
+
+    Raises:
+        ValueError: If the file format is not supported
+    """
+    if fp.endswith(".csv"):
+        return pd.read_csv(fp)
+    if fp.endswith((".xlsx", ".xls")):
+        return pd.read_excel(fp)
+    raise ValueError(f"Unsupported {kind} file format: {fp}")
+
+
 def run_classification(
     transcript_fp: str, dict_fp: str, threshold: float = 0.5
 ) -> pd.DataFrame:
     """
     Run the full classification pipeline on a transcript file using a keyword dictionary.
 
+    Reads both files and hands them to classify_dataframe.
+
     Args:
         transcript_fp: File path to the transcript CSV/Excel file
         dict_fp: File path to the keyword dictionary CSV/Excel file
@@ -53,6 +73,122 @@ def run_classification(
         FileNotFoundError: If transcript or dictionary files don't exist
         ValueError: If files can't be parsed or required columns are missing
     """
+    logger = Logger()
+
+    logger.log_info(f"Reading transcript from {transcript_fp}")
+    transcript_df = read_table(transcript_fp, "transcript")
+
+    logger.log_info(f"Reading dictionary from {dict_fp}")
+    dict_df = read_table(dict_fp, "dictionary")
+
+    return classify_dataframe(transcript_df, dict_df, threshold)
+
+
+# Result columns added to the transcript, with the values of unclassified rows
+RESULT_DEFAULTS = {
+    "primary_code": None,
+    "primary_confidence": 0.0,
+    "secondary_code": None,
+    "secondary_confidence": 0.0,
+    "explanation": None,
+}
+
+
+def match_keywords(
+    keyword_matcher: KeywordMatcher, texts: pd.Series, failed: Dict[int, Exception]
+) -> List[Optional[List[Tuple[str, float]]]]:
+    """
+    Keyword hits of every row, matching each distinct text only once.
+
+    Args:
+        keyword_matcher: Compiled keyword dictionary
+        texts: Transcript text column
+        failed: Row position -> error; rows whose text cannot be matched
+            are added to it and get None
+
+    Returns:
+        One list of (code, confidence) tuples per row, in row order
+    """
+    by_text = {}
+    hits = []
+    for pos, text in enumerate(texts):
+        try:
+            if text not in by_text:
+                by_text[text] = keyword_matcher.match(text)
+            hits.append(by_text[text])
+        except Exception as e:
+            failed[pos] = e
+            hits.append(None)
+    return hits
+
+
+def build_contexts(
+    transcript_df: pd.DataFrame,
+    kw_hits: List[Optional[List[Tuple[str, float]]]],
+    failed: Dict[int, Exception],
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    LLM context of every row that has not failed yet.
+
+    Args:
+        transcript_df: Transcript being classified
+        kw_hits: Output of match_keywords
+        failed: Row position -> error; rows whose context cannot be built
+            are added to it and get None
+
+    Returns:
+        One context dict (or None) per row, in row order
+    """
+    speakers = (
+        transcript_df["speaker"].tolist()
+        if "speaker" in transcript_df.columns
+        else [None] * len(transcript_df)
+    )
+    contexts = []
+    for pos, (i, hits, speaker) in enumerate(
+        zip(transcript_df.index, kw_hits, speakers)
+    ):
+        if pos in failed:
+            contexts.append(None)
+            continue
+        try:
+            context = {
+                "row_id": i,
+                "transcript_row": i + 1,  # 1-indexed for human readability
+                "keywords_found": [code for code, _ in hits],
+            }
+        except Exception as e:
+            failed[pos] = e
+            contexts.append(None)
+            continue
+
+        # Add speaker if available
+        if not pd.isna(speaker):
+            context["speaker"] = speaker
+        contexts.append(context)
+    return contexts
+
+
+def classify_dataframe(
+    transcript_df: pd.DataFrame, dict_df: pd.DataFrame, threshold: float = 0.5
+) -> pd.DataFrame:
+    """
+    Run the full classification pipeline on an in-memory transcript.
+
+    Args:
+        transcript_df: Transcript data with a 'text' column (or an alternative)
+        dict_df: Keyword dictionary data
+        threshold: Confidence threshold for classification (default: 0.5)
+
+    Returns:
+        Copy of transcript_df plus classification columns:
+        - primary_code, primary_confidence
+        - secondary_code, secondary_confidence
+        - explanation
+
+    Raises:
+        ValueError: If required columns are missing
+    """
     # Initialize logger
     logger = Logger()
 
@@ -60,22 +196,8 @@ def run_classification(
     start_time = datetime.now()
     logger.log_info(f"Starting classification pipeline at {start_time}")
 
-    # Read files into memory
-    logger.log_info(f"Reading transcript from {transcript_fp}")
-    if transcript_fp.endswith(".csv"):
-        transcript_df = pd.read_csv(transcript_fp)
-    elif transcript_fp.endswith((".xlsx", ".xls")):
-        transcript_df = pd.read_excel(transcript_fp)
-    else:
-        raise ValueError(f"Unsupported transcript file format: {transcript_fp}")
-
-    logger.log_info(f"Reading dictionary from {dict_fp}")
-    if dict_fp.endswith(".csv"):
-        dict_df = pd.read_csv(dict_fp)
-    elif dict_fp.endswith((".xlsx", ".xls")):
-        dict_df = pd.read_excel(dict_fp)
-    else:
-        raise ValueError(f"Unsupported dictionary file format: {dict_fp}")
+    # The caller's DataFrame is left untouched
+    transcript_df = transcript_df.copy()
 
     # Log row counts
     transcript_row_count = len(transcript_df)
@@ -90,15 +212,12 @@ def run_classification(
         f"Using '{keyword_col}' as keyword column and '{code_col}' as code column"
     )
 
-    # Initialize the LLM client
-    llm_client = OpenRouterClient()
+    # Compile the dictionary once for every row
+    keyword_matcher = KeywordMatcher(dict_df, keyword_col, code_col)
 
-    # Initialize new columns in the transcript dataframe
-    transcript_df["primary_code"] = None
-    transcript_df["primary_confidence"] = 0.0
-    transcript_df["secondary_code"] = None
-    transcript_df["secondary_confidence"] = 0.0
-    transcript_df["explanation"] = None
+    # Initialize the LLM client; it sends up to OPENROUTER_MAX_CONCURRENCY
+    # requests at once
+    llm_client = AsyncOpenRouterClient()
 
     # Ensure 'text' column exists
     text_col = "text"
@@ -121,59 +240,61 @@ def run_classification(
                 f"Cannot find text column in transcript. Required column 'text' or alternatives not found."
             )
 
-    # Process each row with progress bar
+    # Each stage runs over every row before the next one starts; a row that
+    # fails in a stage is logged, skipped by the later stages and keeps the
+    # default results
     logger.log_info(
         f"Processing {transcript_row_count} rows with classification pipeline"
     )
-    for i, row in tqdm(
-        transcript_df.iterrows(), total=transcript_row_count, desc="Classifying"
-    ):
-        try:
-            # Create a copy of the row with 'text' column for keyword matching
-            row_for_matching = row.copy()
-            if text_col != "text":
-                row_for_matching["text"] = row[text_col]
-
-            # Step 1: Keyword matching
-            kw_hits = keyword_match(
-                row_for_matching,
-                dict_df[[keyword_col, code_col]].rename(
-                    columns={keyword_col: "keyword", code_col: "code"}
-                ),
+    row_ids = list(transcript_df.index)
+    failed = {}
+
+    # Step 1: Keyword matching, once per distinct text
+    kw_hits = match_keywords(keyword_matcher, transcript_df[text_col], failed)
+
+    # Step 2: LLM classification of the remaining rows as one concurrent batch
+    contexts = build_contexts(transcript_df, kw_hits, failed)
+    pending = [pos for pos in range(transcript_row_count) if pos not in failed]
+    llm_results = [{}] * transcript_row_count
+    texts = transcript_df[text_col].tolist()
+    batch = llm_client.classify_lines(
+        [texts[pos] for pos in pending], [contexts[pos] for pos in pending]
+    )
+    for pos, llm_result in zip(pending, batch):
+        if isinstance(llm_result, Exception):
+            logger.log_warning(
+                f"LLM classification failed for row {row_ids[pos]}: {str(llm_result)}"
             )
-
-            # Step 2: LLM classification
-            # Create context for LLM
-            context = {
-                "row_id": i,
-                "transcript_row": i + 1,  # 1-indexed for human readability
-                "keywords_found": [code for code, _ in kw_hits],
-            }
-
-            # Add speaker if available
-            if "speaker" in row and not pd.isna(row["speaker"]):
-                context["speaker"] = row["speaker"]
-
-            # Call LLM classifier
-            llm_result = {}
-            try:
-                llm_result = llm_client.classify_line(row[text_col], context)
-            except Exception as e:
-                logger.log_warning(f"LLM classification failed for row {i}: {str(e)}")
-
-            # Step 3: Aggregate results
-            result = aggregate(kw_hits, llm_result, threshold)
-
-            # Step 4: Update DataFrame with results
-            transcript_df.at[i, "primary_code"] = result["primary_code"]
-            transcript_df.at[i, "primary_confidence"] = result["primary_confidence"]
-            transcript_df.at[i, "secondary_code"] = result["secondary_code"]
-            transcript_df.at[i, "secondary_confidence"] = result["secondary_confidence"]
-            transcript_df.at[i, "explanation"] = result["explanation"]
-
+            continue
+        llm_results[pos] = llm_result
+    if llm_client.cache is not None:
+        stats = llm_client.cache.stats()
+        logger.log_info(
+            f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate)"
+        )
+
+    # Step 3: Aggregate results
+    rows = [dict(RESULT_DEFAULTS) for _ in range(transcript_row_count)]
+    for pos in range(transcript_row_count):
+        if pos in failed:
+            continue
+        try:
+            rows[pos] = aggregate(kw_hits[pos], llm_results[pos], threshold)
         except Exception as e:
-            logger.log_error(f"Error processing row {i}", error=e)
-            # Continue with next row rather than terminating the entire process
+            failed[pos] = e
+
+    for pos, error in sorted(failed.items()):
+        logger.log_error(f"Error processing row {row_ids[pos]}", error=error)
+        # Continue with next row rather than terminating the entire process
+
+    # Step 4: Update DataFrame with results, one column at a time
+    for column, default in RESULT_DEFAULTS.items():
+        transcript_df[column] = pd.Series(
+            [row[column] for row in rows],
+            index=transcript_df.index,
+            dtype=float if isinstance(default, float) else object,
+        )
 
     # Log end time and stats
     end_time = datetime.now()
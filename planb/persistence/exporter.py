@@ -39,6 +39,17 @@ class Exporter:
         """
 
 
+def coded_filename(original_name: str) -> str:
+    """
+    Name of the coded CSV for an original transcript file name.
+
+    Example:
+        >>> coded_filename("data/my_data.xlsx")
+        'my_data_coded.csv'
+    """
+    return f"{Path(original_name).stem}_coded.csv"
+
+
 def export_csv(df: pd.DataFrame, original_name: str) -> Path:
     """
     Export a DataFrame to CSV in a temporary directory with a modified filename.
@@ -59,13 +70,8 @@ def export_csv(df: pd.DataFrame, original_name: str) -> Path:
     # Create temporary directory if it doesn't exist
     tmp_dir = Path(tempfile.gettempdir())
 
-    # Extract the stem (filename without extension) from the original name
-    original_path = Path(original_name)
-    original_stem = original_path.stem
-
     # Create the new filename with "_coded" suffix
-    output_filename = f"{original_stem}_coded.csv"
-    output_path = tmp_dir / output_filename
+    output_path = tmp_dir / coded_filename(original_name)
 
     # Save the DataFrame to CSV with UTF-8 encoding and no index
     df.to_csv(output_path, index=False, encoding="utf-8")
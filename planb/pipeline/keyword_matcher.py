@@ -8,28 +8,101 @@ from typing import List, Tuple
 import pandas as pd
 
 
+# Runs of word characters, as delimited by the \b assertions keywords match on
+_TOKEN_RE = re.compile(r"\w+")
+
+
 class KeywordMatcher:
-    """Matches user input against predefined keywords to determine intent."""
+    """
+    Keyword dictionary compiled once for matching many transcript rows.
+
+    A keyword matches wherever r"\b<keyword>\b" matches the lower-cased
+    text. Keywords that start and end with a word character can only match
+    at the start of a word of the text, so they are indexed by their first
+    word and a row is checked in a single pass over its words. The few
+    keywords with punctuation at either end keep a compiled regex each.
+    """
 
-    def __init__(self):
-        pass
+    def __init__(
+        self, kw_df: pd.DataFrame, keyword_col: str = "keyword", code_col: str = "code"
+    ):
+        """
+        Args:
+            kw_df: Keyword dictionary, one keyword per row
+            keyword_col: Column holding the keywords
+            code_col: Column holding the code of each keyword
 
-    def match(self, query):
+        Raises:
+            ValueError: If either column is missing
+        """
+        if keyword_col not in kw_df.columns or code_col not in kw_df.columns:
+            raise ValueError(
+                "Keyword DataFrame must contain 'keyword' and 'code' columns"
+            )
+
+        self._codes = []
+        # First word of a keyword -> (keyword position, keyword)
+        self._token_index = {}
+        self._patterns = []
+        for keyword, code in zip(kw_df[keyword_col], kw_df[code_col]):
+            # Rows without a keyword can never match
+            if pd.isna(keyword):
+                continue
+            keyword = str(keyword).lower()
+            position = len(self._codes)
+            self._codes.append(code)
+            first = _TOKEN_RE.match(keyword)
+            if first is not None and _TOKEN_RE.fullmatch(keyword[-1]):
+                self._token_index.setdefault(first.group(), []).append(
+                    (position, keyword)
+                )
+            else:
+                pattern = re.compile(r"\b" + re.escape(keyword) + r"\b")
+                self._patterns.append((position, pattern))
+
+    def __len__(self):
+        return len(self._codes)
+
+    def match(self, text: str) -> List[Tuple[str, float]]:
         """
-        Analyze input query for keywords to determine intent.
+        Match the keywords against one transcript text.
 
         Args:
-            query: The user input text to analyze
+            text: The transcript text to search
 
         Returns:
-            Dictionary with matched keywords and confidence scores
+            List of tuples (code, 1.0), one per matched keyword, in
+            dictionary order
         """
+        text = text.lower()
+        found = set()
+        for token in _TOKEN_RE.finditer(text):
+            candidates = self._token_index.get(token.group())
+            if candidates is None:
+                continue
+            start = token.start()
+            for position, keyword in candidates:
+                end = start + len(keyword)
+                if (
+                    position not in found
+                    and text.startswith(keyword, start)
+                    and (end == len(text) or not _TOKEN_RE.match(text[end]))
+                ):
+                    found.add(position)
+
+        for position, pattern in self._patterns:
+            if pattern.search(text):
+                found.add(position)
+        return [(self._codes[position], 1.0) for position in sorted(found)]
 
 
 def keyword_match(df_row: pd.Series, kw_df: pd.DataFrame) -> List[Tuple[str, float]]:
     """
     Match keywords from a keyword dataframe against text in a dataframe row.
 
+    Compiles kw_df on every call; to match many rows, build a
+    KeywordMatcher once and call its match method instead.
+
     Args:
         df_row: A pandas Series representing a row from a dataframe,
                 must contain a 'text' column
@@ -52,15 +125,6 @@ def keyword_match(df_row: pd.Series, kw_df: pd.DataFrame) -> List[Tuple[str, flo
     if "text" not in df_row:
         raise ValueError("DataFrame row must contain a 'text' column")
 
-    if not all(col in kw_df.columns for col in ["keyword", "code"]):
-        raise ValueError("Keyword DataFrame must contain 'keyword' and 'code' columns")
-
-    # Get the text to search in
-    text = df_row["text"].lower()
-
-    # List to store matches
-    matches = []
-
     # Apply special role-based rules if speaker information is available
     speaker_role = None
     if "speaker" in df_row:
@@ -76,21 +140,4 @@ def keyword_match(df_row: pd.Series, kw_df: pd.DataFrame) -> List[Tuple[str, flo
             # Apply customer-specific rules
             pass
 
-    # Process each keyword
-    for _, kw_row in kw_df.iterrows():
-        keyword = kw_row["keyword"].lower()
-        code = kw_row["code"]
-
-        # Handle phrase keywords (containing spaces)
-        if " " in keyword:
-            # For phrases, match the entire phrase
-            pattern = r"\b" + re.escape(keyword) + r"\b"
-        else:
-            # For single words, match whole words
-            pattern = r"\b" + re.escape(keyword) + r"\b"
-
-        # Search for the pattern in the text
-        if re.search(pattern, text):
-            matches.append((code, 1.0))
-
-    return matches
+    return KeywordMatcher(kw_df).match(df_row["text"])
@@ -2,13 +2,460 @@
 TODO MVP v0.1
 """
 
+import asyncio
+import hashlib
 import json
 import os
+import sqlite3
+import threading
 import time
-from typing import Any, Dict
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Union
 
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from tqdm import tqdm
+
+
+# OpenAI-compatible endpoint used unless OPENROUTER_BASE_URL is set
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Default model
+DEFAULT_MODEL = "meta-llama/llama-3.3-70b-instruct"
+
+# Requests in flight at once for AsyncOpenRouterClient, unless
+# OPENROUTER_MAX_CONCURRENCY is set
+DEFAULT_CONCURRENCY = 8
+
+# Seconds before a single request is abandoned
+DEFAULT_TIMEOUT = 60.0
+
+# Prepare system message to guide model behavior
+SYSTEM_MESSAGE = """You are a text classifier that analyzes lines of code/text.
+                Return a JSON object with the following fields:
+                - code: a short classification code
+                - confidence: a value between 0.0 and 1.0 indicating your confidence
+                - explanation: a brief explanation of your classification
+                
+                Format your entire response as valid JSON only, nothing else."""
+
+# Attempts per line before its error is reported
+MAX_ATTEMPTS = 3
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff delay after a failed attempt: 2^attempt * 100ms"""
+    return (2**attempt) * 0.1
+
+
+# Request options shared by the sync and async clients
+REQUEST_OPTIONS = {
+    "temperature": 0.2,  # Low temperature for more deterministic results
+    "response_format": {"type": "json_object"},
+    "extra_headers": {
+        "HTTP-Referer": "http://localhost",  # for OpenRouter free-tier
+        "X-Title": "DialogueCoder-PlanB",
+    },
+}
+
+
+def build_messages(text: str, context: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Chat messages asking the model to classify one line."""
+    # Prepare prompt with context
+    context_str = json.dumps(context)
+    user_prompt = f"Classify this text (context: {context_str}):\n\n{text}"
+    return [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+# Context fields that only locate a line in its transcript. They are sent to
+# the model but left out of request keys, so identical lines of a transcript
+# share one request and one cache entry.
+LOCATION_FIELDS = ("row_id", "transcript_row")
+
+
+def key_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """Context of a line as it counts towards its request key."""
+    return {name: value for name, value in context.items() if name not in LOCATION_FIELDS}
+
+
+def parse_response(response) -> Dict[str, Any]:
+    """
+    Classification result of a chat completion.
+
+    Raises:
+        ValueError: If the JSON reply lacks code, confidence or explanation
+    """
+    response_text = response.choices[0].message.content
+    result = json.loads(response_text)
+
+    # Ensure all required fields are present
+    if not all(key in result for key in ["code", "confidence", "explanation"]):
+        raise ValueError("Response missing required fields")
+
+    return result
+
+
+# Batch mode: several lines per request, with one JSON answer per line
+BATCH_SYSTEM_MESSAGE = """You are a text classifier that analyzes lines of code/text.
+                You are given a JSON array of items, each with an id, a text and its context.
+                Return a JSON object with a single field "results": an array with one object
+                per item, in the same order, each with the following fields:
+                - id: the id of the item
+                - code: a short classification code
+                - confidence: a value between 0.0 and 1.0 indicating your confidence
+                - explanation: a brief explanation of your classification
+
+                Format your entire response as valid JSON only, nothing else."""
+
+# Lines per request unless OPENROUTER_BATCH_LINES is set; 1 sends each line alone
+DEFAULT_BATCH_LINES = 1
+
+# Estimated prompt and answer tokens per batched request, unless
+# OPENROUTER_BATCH_TOKENS is set
+DEFAULT_BATCH_TOKENS = 4000
+
+# Estimated answer tokens per line of a batch
+ANSWER_TOKENS_PER_LINE = 60
+
+RESULT_FIELDS = ("code", "confidence", "explanation")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt fragment, at about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def batch_item(text: str, context: Dict[str, Any]) -> str:
+    """One line as it appears in a batch prompt, without its id."""
+    return json.dumps({"text": text, "context": context})
+
+
+def batch_item_messages(text: str, context: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Messages a batched line's answer is cached under."""
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_MESSAGE},
+        {"role": "user", "content": batch_item(text, context)},
+    ]
+
+
+def build_batch_messages(
+    texts: List[str], contexts: List[Dict[str, Any]]
+) -> List[Dict[str, str]]:
+    """Chat messages asking the model to classify several lines at once."""
+    items = [
+        {"id": i, "text": text, "context": context}
+        for i, (text, context) in enumerate(zip(texts, contexts))
+    ]
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_MESSAGE},
+        {"role": "user", "content": f"Classify each of these items:\n\n{json.dumps(items)}"},
+    ]
+
+
+def parse_batch_response(response, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Per-line results of a batched chat completion, aligned with the lines.
+
+    Each item is validated on its own: it is placed by its id (or its
+    position if it has none), and one that is out of range, repeated or
+    lacks code, confidence or explanation gives None for its line, as do
+    lines the reply does not answer at all.
+    """
+    results = [None] * count
+    try:
+        reply = json.loads(response.choices[0].message.content)
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return results
+    items = reply.get("results") if isinstance(reply, dict) else reply
+    if not isinstance(items, list):
+        return results
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("id", position)
+        if not isinstance(index, int) or isinstance(index, bool):
+            continue
+        if 0 <= index < count and results[index] is None:
+            if all(key in item for key in RESULT_FIELDS):
+                results[index] = {key: item[key] for key in RESULT_FIELDS}
+    return results
+
+
+def next_batch_end(tokens: List[int], start: int, max_lines: int, token_budget: int) -> int:
+    """
+    End of the batch that starts at start.
+
+    Takes as many lines as fit in both max_lines and the token budget,
+    counting each line's prompt tokens plus its expected answer, and
+    always at least one line.
+    """
+    budget = token_budget - estimate_tokens(BATCH_SYSTEM_MESSAGE)
+    end, used = start, 0
+    while end < len(tokens) and end - start < max_lines:
+        cost = tokens[end] + ANSWER_TOKENS_PER_LINE
+        if end > start and used + cost > budget:
+            break
+        used += cost
+        end += 1
+    return end
+
+
+def _api_settings(
+    api_key: Optional[str], base_url: Optional[str], cache: Optional["LLMResponseCache"]
+):
+    """API key and base URL, from the arguments or the environment."""
+    # Try to load from .env file
+    load_dotenv()
+
+    # Get API key from environment; an offline replay never uses it
+    api_key = api_key or os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        if cache is not None and cache.offline:
+            return "offline", base_url or DEFAULT_BASE_URL
+        raise ValueError("OPENROUTER_API_KEY environment variable is not set")
+    return api_key, base_url or os.getenv("OPENROUTER_BASE_URL") or DEFAULT_BASE_URL
+
+
+class OfflineCacheMiss(LookupError):
+    """A line was not in the response cache while replaying offline."""
+
+
+_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+class LLMResponseCache:
+    """
+    SQLite cache of LLM classification results, keyed by a hash of the
+    model, prompts and temperature.
+
+    In offline mode a miss raises OfflineCacheMiss instead of reaching the
+    network.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        offline: bool = False,
+    ):
+        """
+        Args:
+            path: SQLite file of the cache
+            ttl_seconds: Age after which an entry is no longer used
+            max_entries: Entries kept by evict, most recently used first
+            offline: Replay from the cache only, never writing to it
+        """
+        self.path = os.path.abspath(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Access times of hits not yet written by flush, by key
+        self._accessed = {}
+        if not offline:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with closing(self._connect()) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_CACHE_SCHEMA)
+            self.evict()
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        """
+        Cache configured by OPENROUTER_CACHE_PATH, or None if it is unset.
+
+        OPENROUTER_CACHE_TTL (seconds), OPENROUTER_CACHE_MAX_ENTRIES and
+        OPENROUTER_OFFLINE=1 set the other options.
+        """
+        load_dotenv()
+        path = os.getenv("OPENROUTER_CACHE_PATH")
+        if not path:
+            return None
+        ttl = os.getenv("OPENROUTER_CACHE_TTL")
+        max_entries = os.getenv("OPENROUTER_CACHE_MAX_ENTRIES")
+        return cls(
+            path,
+            ttl_seconds=float(ttl) if ttl else None,
+            max_entries=int(max_entries) if max_entries else None,
+            offline=os.getenv("OPENROUTER_OFFLINE", "") not in ("", "0"),
+        )
+
+    def _connect(self):
+        if self.offline:
+            return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, str]], temperature: float) -> str:
+        """Hash of everything that determines a request's answer."""
+        payload = {
+            "model": model,
+            "system": messages[0]["content"],
+            "user": messages[-1]["content"],
+            "temperature": temperature,
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str, count: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Cached result for key, or None if it is missing or expired.
+
+        Args:
+            key: Request key, from key()
+            count: Record the lookup in the hit and miss stats; callers
+                that try several keys for one line record it once with
+                count_lookup instead
+        """
+        now = time.time()
+        row = None
+        if not self.offline or os.path.exists(self.path):
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT result, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    row = None
+        with self._lock:
+            if row is not None and not self.offline:
+                self._accessed[key] = now
+        if count:
+            self.count_lookup(row is not None)
+        return None if row is None else json.loads(row[0])
+
+    def count_lookup(self, hit: bool):
+        """Record one line's lookup in the hit and miss stats."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def flush(self):
+        """Write the access times of the hits since the last flush."""
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        if not accessed:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(now, key) for key, now in accessed.items()],
+            )
+
+    def lookup(self, model: str, messages: List[Dict[str, str]], temperature: float):
+        """
+        Key and cached result of a request; the result is None on a miss.
+
+        Raises:
+            OfflineCacheMiss: On a miss in offline mode
+        """
+        key = self.key(model, messages, temperature)
+        result = self.get(key)
+        if result is None and self.offline:
+            raise OfflineCacheMiss("Line is not in the LLM response cache (offline replay)")
+        return key, result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result; ignored in offline mode."""
+        if self.offline:
+            return
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, result, created, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), now, now),
+            )
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and created < now - self.ttl_seconds
+
+    def evict(self) -> int:
+        """
+        Write pending access times, then drop expired entries and the
+        least recently used ones beyond max_entries.
+
+        Returns:
+            Number of entries removed
+        """
+        if self.offline:
+            return 0
+        self.flush()
+        removed = 0
+        with closing(self._connect()) as conn, conn:
+            if self.ttl_seconds is not None:
+                removed += conn.execute(
+                    "DELETE FROM responses WHERE created < ?",
+                    (time.time() - self.ttl_seconds,),
+                ).rowcount
+            if self.max_entries is not None:
+                removed += conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                    "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+        return removed
+
+    def __len__(self):
+        if self.offline and not os.path.exists(self.path):
+            return 0
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self),
+        }
+
+
+def identical_lines(
+    model: str, texts: List[str], contexts: List[Dict[str, Any]]
+) -> Dict[str, List[int]]:
+    """
+    Positions of the lines grouped by request key, in order of first use.
+
+    Lines with the same text and key_context ask the model the same
+    question, so the clients send each group once, even while an earlier
+    copy is still in flight.
+    """
+    groups = {}
+    for i, (text, context) in enumerate(zip(texts, contexts)):
+        key = LLMResponseCache.key(
+            model, build_messages(text, key_context(context)), REQUEST_OPTIONS["temperature"]
+        )
+        groups.setdefault(key, []).append(i)
+    return groups
+
+
+def spread_answers(groups: Dict[str, List[int]], answers: List[Any], count: int) -> List[Any]:
+    """Give every line the answer of its group, as grouped by identical_lines."""
+    results = [None] * count
+    for positions, answer in zip(groups.values(), answers):
+        for i in positions:
+            results[i] = answer
+    return results
 
 
 class LLMAdapter:
@@ -30,32 +477,121 @@ class LLMAdapter:
         """
 
 
-class OpenRouterClient:
+class _BatchMode:
+    """Batch-mode bookkeeping shared by the sync and async clients."""
+
+    batch_lines = DEFAULT_BATCH_LINES
+    batch_tokens = DEFAULT_BATCH_TOKENS
+
+    def _init_batching(self, batch_lines: Optional[int], batch_tokens: Optional[int]):
+        if batch_lines is None:
+            batch_lines = int(os.getenv("OPENROUTER_BATCH_LINES", DEFAULT_BATCH_LINES))
+        if batch_tokens is None:
+            batch_tokens = int(os.getenv("OPENROUTER_BATCH_TOKENS", DEFAULT_BATCH_TOKENS))
+        if batch_lines < 1:
+            raise ValueError("batch_lines must be at least 1")
+        self.batch_lines = batch_lines
+        self.batch_tokens = batch_tokens
+
+    def _batch_lookup(self, texts, contexts):
+        """
+        Cached answers and batch cache keys of the lines, and the positions
+        of the lines still to send in batches.
+
+        A line counts as one cache lookup, whether it was answered in a
+        batch or on its own before. Offline, a line found under neither key
+        gets OfflineCacheMiss as its answer.
+        """
+        results = [None] * len(texts)
+        keys = [None] * len(texts)
+        if self.cache is not None:
+            temperature = REQUEST_OPTIONS["temperature"]
+            for i, (text, context) in enumerate(zip(texts, contexts)):
+                context = key_context(context)
+                keys[i] = self.cache.key(
+                    self.model, batch_item_messages(text, context), temperature
+                )
+                # A line answered on its own before needs no batch either
+                results[i] = self.cache.get(keys[i], count=False) or self.cache.get(
+                    self.cache.key(self.model, build_messages(text, context), temperature),
+                    count=False,
+                )
+                self.cache.count_lookup(results[i] is not None)
+                if results[i] is None and self.cache.offline:
+                    results[i] = OfflineCacheMiss(
+                        "Line is not in the LLM response cache (offline replay)"
+                    )
+        return results, keys, [i for i, result in enumerate(results) if result is None]
+
+    def _batch_tokens(self, texts, contexts, pending) -> List[int]:
+        return [estimate_tokens(batch_item(texts[i], contexts[i])) for i in pending]
+
+    def _line_key(self, text, context):
+        """Single-line cache key of a line, or None without a cache."""
+        if self.cache is None:
+            return None
+        return self.cache.key(
+            self.model, build_messages(text, key_context(context)), REQUEST_OPTIONS["temperature"]
+        )
+
+    def _store_batch(self, batch, answers, results, keys) -> int:
+        """
+        Keep the valid answers of one batch and return how many there were.
+
+        A batch with no valid answer at all, e.g. a reply cut off at the
+        model's output limit, halves the batch size for the batches planned
+        after it, in this run and later ones.
+        """
+        answered = 0
+        for i, answer in zip(batch, answers):
+            if answer is None:
+                continue
+            answered += 1
+            results[i] = answer
+            if keys[i] is not None:
+                self.cache.put(keys[i], answer)
+        if len(batch) > 1 and not answered:
+            self.batch_lines = max(1, min(self.batch_lines, len(batch)) // 2)
+        return answered
+
+
+class OpenRouterClient(_BatchMode):
     """
     Client for interacting with OpenRouter-compatible LLM APIs.
     Uses the openai client library to make requests and handles retries.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        cache: Optional[LLMResponseCache] = None,
+        batch_lines: Optional[int] = None,
+        batch_tokens: Optional[int] = None,
+    ):
         """
         Initialize the OpenRouter client with API key from environment variables.
         Loads environment variables from .env file if available.
-        """
-        # Try to load from .env file
-        load_dotenv()
 
-        # Get API key from environment
-        self.api_key = os.getenv("OPENROUTER_API_KEY")
-        if not self.api_key:
-            raise ValueError("OPENROUTER_API_KEY environment variable is not set")
+        Args:
+            api_key: API key; defaults to OPENROUTER_API_KEY
+            base_url: OpenAI-compatible endpoint; defaults to
+                OPENROUTER_BASE_URL, then OpenRouter
+            cache: Response cache; defaults to LLMResponseCache.from_env()
+            batch_lines: Most lines classify_lines sends per request;
+                defaults to OPENROUTER_BATCH_LINES, then 1 (no batching)
+            batch_tokens: Estimated prompt and answer tokens per batched
+                request; defaults to OPENROUTER_BATCH_TOKENS, then
+                DEFAULT_BATCH_TOKENS
+        """
+        self.cache = cache if cache is not None else LLMResponseCache.from_env()
+        self.api_key, self.base_url = _api_settings(api_key, base_url, self.cache)
+        self._init_batching(batch_lines, batch_tokens)
 
         # Initialize OpenAI client with API key
-        self.client = OpenAI(
-            api_key=self.api_key, base_url="https://openrouter.ai/api/v1"
-        )
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
 
-        # Default model
-        self.model = "meta-llama/llama-3.3-70b-instruct"
+        self.model = DEFAULT_MODEL
 
     def classify_line(self, text: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -72,60 +608,326 @@ class OpenRouterClient:
                 - explanation: Explanation for the classification
 
         Raises:
+            OfflineCacheMiss: If the line is not cached in offline mode
             Exception: If all retry attempts fail
         """
-        max_attempts = 3
+        key = None
+        if self.cache is not None:
+            key, result = self.cache.lookup(
+                self.model, build_messages(text, key_context(context)), REQUEST_OPTIONS["temperature"]
+            )
+            if result is not None:
+                return result
+        return self._request_line(build_messages(text, context), key)
 
-        for attempt in range(1, max_attempts + 1):
+    def _request_line(self, messages, key):
+        """Request one line with retries, caching the result under key."""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
             try:
-                # Prepare system message to guide model behavior
-                system_message = """You are a text classifier that analyzes lines of code/text.
-                Return a JSON object with the following fields:
-                - code: a short classification code
-                - confidence: a value between 0.0 and 1.0 indicating your confidence
-                - explanation: a brief explanation of your classification
-                
-                Format your entire response as valid JSON only, nothing else."""
+                # Make API request
+                response = self.client.chat.completions.create(
+                    model=self.model, messages=messages, **REQUEST_OPTIONS
+                )
+                result = parse_response(response)
 
-                # Prepare prompt with context
-                context_str = json.dumps(context)
-                user_prompt = f"Classify this text (context: {context_str}):\n\n{text}"
+            except Exception:
+                # If this is the last attempt, re-raise the exception
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                time.sleep(retry_delay(attempt))
+                continue
 
-                # Make API request
+            if key is not None:
+                self.cache.put(key, result)
+            return result
+
+        # This should never be reached due to the raise in the except block
+        raise RuntimeError("Failed all retry attempts")
+
+    def classify_batch(
+        self, texts: List[str], contexts: List[Dict[str, Any]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Classify several lines in one request.
+
+        Args:
+            texts: The texts to classify
+            contexts: Context of each text, as for classify_line
+
+        Returns:
+            One result per text, in order, as parse_batch_response gives
+            them; every line gets None if all attempts fail
+        """
+        messages = build_batch_messages(texts, contexts)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
                 response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": user_prompt},
-                    ],
-                    temperature=0.2,  # Low temperature for more deterministic results
-                    response_format={"type": "json_object"},
-                    extra_headers={
-                        "HTTP-Referer": "http://localhost",  # for OpenRouter free-tier
-                        "X-Title": "DialogueCoder-PlanB",
-                    },
+                    model=self.model, messages=messages, **REQUEST_OPTIONS
                 )
+            except Exception:
+                if attempt == MAX_ATTEMPTS:
+                    return [None] * len(texts)
+                time.sleep(retry_delay(attempt))
+                continue
+            return parse_batch_response(response, len(texts))
 
-                # Parse response
-                response_text = response.choices[0].message.content
-                result = json.loads(response_text)
+    def classify_lines(
+        self, texts: List[str], contexts: List[Dict[str, Any]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Classify a batch of lines.
 
-                # Ensure all required fields are present
-                if not all(
-                    key in result for key in ["code", "confidence", "explanation"]
-                ):
-                    raise ValueError("Response missing required fields")
+        Identical lines are classified once. With batch_lines above 1,
+        lines are first sent batch_lines at a time, in batches sized to the
+        token budget; only the lines a batch gave no valid answer for are
+        then classified one by one.
 
-                return result
+        Args:
+            texts: The texts to classify
+            contexts: Context of each text, as for classify_line
+
+        Returns:
+            One classify_line result per text, in order. A line whose
+            attempts all fail gets its exception instead, so one bad line
+            does not stop the batch.
+        """
+        groups = identical_lines(self.model, texts, contexts)
+        firsts = [positions[0] for positions in groups.values()]
+        answers = self._classify_distinct(
+            [texts[i] for i in firsts], [contexts[i] for i in firsts]
+        )
+        return spread_answers(groups, answers, len(texts))
+
+    def _classify_distinct(self, texts, contexts):
+        """classify_lines for lines that are all different."""
+        results = [None] * len(texts)
+        if self.batch_lines > 1:
+            results, keys, pending = self._batch_lookup(texts, contexts)
+            tokens = self._batch_tokens(texts, contexts, pending)
+            start = 0
+            while start < len(pending):
+                end = next_batch_end(tokens, start, self.batch_lines, self.batch_tokens)
+                batch = pending[start:end]
+                answers = self.classify_batch(
+                    [texts[i] for i in batch], [contexts[i] for i in batch]
+                )
+                self._store_batch(batch, answers, results, keys)
+                start = end
 
+        singles = [i for i, result in enumerate(results) if result is None]
+        for i in tqdm(singles, desc="Classifying"):
+            try:
+                if self.batch_lines > 1:
+                    # Already looked up with the batch keys
+                    results[i] = self._request_line(
+                        build_messages(texts[i], contexts[i]),
+                        self._line_key(texts[i], contexts[i]),
+                    )
+                else:
+                    results[i] = self.classify_line(texts[i], contexts[i])
             except Exception as e:
-                # If this is the last attempt, re-raise the exception
-                if attempt == max_attempts:
-                    raise
+                results[i] = e
+        if self.cache is not None:
+            self.cache.evict()
+        return results
 
-                # Calculate backoff delay: 2^attempt * 100ms
-                delay = (2**attempt) * 0.1
-                time.sleep(delay)
 
-        # This should never be reached due to the raise in the except block
-        raise RuntimeError("Failed all retry attempts")
+class AsyncOpenRouterClient(_BatchMode):
+    """
+    Client for OpenRouter-compatible LLM APIs that classifies many lines
+    concurrently.
+
+    A batch shares one pooled HTTP client, and a semaphore bounds how many
+    requests are in flight at once. Each request has its own timeout and
+    retries, as with OpenRouterClient.classify_line, and results come back
+    in input order.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        cache: Optional[LLMResponseCache] = None,
+        batch_lines: Optional[int] = None,
+        batch_tokens: Optional[int] = None,
+    ):
+        """
+        Args:
+            api_key: API key; defaults to OPENROUTER_API_KEY
+            base_url: OpenAI-compatible endpoint; defaults to
+                OPENROUTER_BASE_URL, then OpenRouter
+            concurrency: Requests in flight at once; defaults to
+                OPENROUTER_MAX_CONCURRENCY, then DEFAULT_CONCURRENCY
+            timeout: Seconds before a single request is abandoned
+            cache: Response cache; defaults to LLMResponseCache.from_env()
+            batch_lines: Most lines per request, as for OpenRouterClient
+            batch_tokens: Token budget per batched request, as for
+                OpenRouterClient
+        """
+        self.cache = cache if cache is not None else LLMResponseCache.from_env()
+        self.api_key, self.base_url = _api_settings(api_key, base_url, self.cache)
+        self._init_batching(batch_lines, batch_tokens)
+        if concurrency is None:
+            concurrency = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", DEFAULT_CONCURRENCY))
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.model = DEFAULT_MODEL
+
+    async def aclassify_lines(
+        self, texts: List[str], contexts: List[Dict[str, Any]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """Async form of classify_lines, for callers already in an event loop."""
+        groups = identical_lines(self.model, texts, contexts)
+        firsts = [positions[0] for positions in groups.values()]
+        answers = await self._aclassify_distinct(
+            [texts[i] for i in firsts], [contexts[i] for i in firsts]
+        )
+        return spread_answers(groups, answers, len(texts))
+
+    async def _aclassify_distinct(self, texts, contexts):
+        """aclassify_lines for lines that are all different."""
+        limits = httpx.Limits(
+            max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+        )
+        semaphore = asyncio.Semaphore(self.concurrency)
+        async with httpx.AsyncClient(limits=limits) as http_client:
+            client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,
+                http_client=http_client,
+            )
+            progress = tqdm(total=len(texts), desc="Classifying")
+            try:
+                results = [None] * len(texts)
+                batched = self.batch_lines > 1
+                if batched:
+                    results, keys, pending = self._batch_lookup(texts, contexts)
+                    progress.update(len(texts) - len(pending))
+                    tokens = self._batch_tokens(texts, contexts, pending)
+                    start = 0
+
+                    async def send_batches():
+                        # Each batch is planned when a sender is free, so a
+                        # halved batch size applies to the rest of this run
+                        nonlocal start
+                        while start < len(pending):
+                            end = next_batch_end(
+                                tokens, start, self.batch_lines, self.batch_tokens
+                            )
+                            batch = pending[start:end]
+                            start = end
+                            answers = await self._classify_batch(
+                                client,
+                                semaphore,
+                                [texts[i] for i in batch],
+                                [contexts[i] for i in batch],
+                            )
+                            progress.update(
+                                self._store_batch(batch, answers, results, keys)
+                            )
+
+                    await asyncio.gather(*(send_batches() for _ in range(self.concurrency)))
+
+                # Lines without a (valid batched) answer go one at a time
+                singles = [i for i, result in enumerate(results) if result is None]
+                answers = await asyncio.gather(
+                    *(
+                        self._classify_line(
+                            client,
+                            semaphore,
+                            texts[i],
+                            contexts[i],
+                            progress,
+                            # Already looked up with the batch keys
+                            lookup=not batched,
+                        )
+                        for i in singles
+                    )
+                )
+                for i, answer in zip(singles, answers):
+                    results[i] = answer
+                return results
+            finally:
+                progress.close()
+                if self.cache is not None:
+                    self.cache.evict()
+
+    def classify_lines(
+        self, texts: List[str], contexts: List[Dict[str, Any]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Classify a batch of lines concurrently, as for
+        OpenRouterClient.classify_lines. Use aclassify_lines from async code.
+
+        Args:
+            texts: The texts to classify
+            contexts: Context of each text, as for classify_line
+
+        Returns:
+            One result per text, in input order. A line whose attempts all
+            fail gets its exception instead, so one bad line does not stop
+            the batch.
+        """
+        return asyncio.run(self.aclassify_lines(texts, contexts))
+
+    async def _classify_line(self, client, semaphore, text, context, progress, lookup=True):
+        """
+        Classify one line, holding a concurrency slot only while requesting.
+
+        Without lookup the cache is not read first, only written.
+        """
+        try:
+            messages = build_messages(text, context)
+            key = self._line_key(text, context)
+            if lookup and self.cache is not None:
+                key, result = self.cache.lookup(
+                    self.model,
+                    build_messages(text, key_context(context)),
+                    REQUEST_OPTIONS["temperature"],
+                )
+                if result is not None:
+                    return result
+
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    async with semaphore:
+                        response = await client.chat.completions.create(
+                            model=self.model, messages=messages, **REQUEST_OPTIONS
+                        )
+                    result = parse_response(response)
+                except Exception as e:
+                    if attempt == MAX_ATTEMPTS:
+                        return e
+                    await asyncio.sleep(retry_delay(attempt))
+                    continue
+
+                if key is not None:
+                    self.cache.put(key, result)
+                return result
+        except Exception as e:
+            # e.g. OfflineCacheMiss; reported in place like failed requests
+            return e
+        finally:
+            progress.update()
+
+    async def _classify_batch(self, client, semaphore, texts, contexts):
+        """Classify several lines in one request, as OpenRouterClient.classify_batch."""
+        messages = build_batch_messages(texts, contexts)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                async with semaphore:
+                    response = await client.chat.completions.create(
+                        model=self.model, messages=messages, **REQUEST_OPTIONS
+                    )
+            except Exception:
+                if attempt == MAX_ATTEMPTS:
+                    return [None] * len(texts)
+                await asyncio.sleep(retry_delay(attempt))
+                continue
+            return parse_batch_response(response, len(texts))
@@ -8,16 +8,15 @@ import sys
 sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
 
 
-import os
 from pathlib import Path
 from typing import Optional
 
 import pandas as pd
 import streamlit as st
 
-from planb.controller.dispatcher import run_classification
+from planb.controller.dispatcher import classify_dataframe
 from planb.logging.logger import Logger
-from planb.persistence.exporter import export_csv
+from planb.persistence.exporter import coded_filename
 
 # Initialize logger
 logger = Logger()
@@ -211,28 +210,8 @@ def main():
     if run_button and transcript_df is not None and dictionary_df is not None:
         try:
             with st.spinner("Running classification..."):
-                # Save temporary files for processing
-                temp_transcript_path = Path(
-                    os.path.join(os.path.dirname(__file__), "temp_transcript.csv")
-                )
-                temp_dict_path = Path(
-                    os.path.join(os.path.dirname(__file__), "temp_dict.csv")
-                )
-
-                transcript_df.to_csv(temp_transcript_path, index=False)
-                dictionary_df.to_csv(temp_dict_path, index=False)
-
-                # Run classification
-                results_df = run_classification(
-                    str(temp_transcript_path), str(temp_dict_path), threshold
-                )
-
-                # Clean up temp files
-                try:
-                    temp_transcript_path.unlink(missing_ok=True)
-                    temp_dict_path.unlink(missing_ok=True)
-                except Exception as e:
-                    logger.log_warning(f"Error cleaning up temporary files: {str(e)}")
+                # Classify the uploaded data directly, without temp files
+                results_df = classify_dataframe(transcript_df, dictionary_df, threshold)
 
                 # Show results
                 st.subheader("Classification Results")
@@ -241,18 +220,15 @@ def main():
                 # Show preview with color coding
                 show_dataframe_preview(results_df)
 
-                # Export results to CSV and create download button
+                # Create download button from the in-memory results
                 try:
-                    output_path = export_csv(results_df, transcript_file.name)
-
-                    with open(output_path, "rb") as file:
-                        st.download_button(
-                            label="Download Results CSV",
-                            data=file,
-                            file_name=output_path.name,
-                            mime="text/csv",
-                            help="Download the classified data as a CSV file",
-                        )
+                    st.download_button(
+                        label="Download Results CSV",
+                        data=results_df.to_csv(index=False).encode("utf-8"),
+                        file_name=coded_filename(transcript_file.name),
+                        mime="text/csv",
+                        help="Download the classified data as a CSV file",
+                    )
                 except Exception as e:
                     st.error(f"Error creating download file: {str(e)}")
                     logger.log_error("Error in file export", error=e)
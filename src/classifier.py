@@ -1,5 +1,18 @@
 import csv
 import re
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from label_matrix import LabelMatrix
+
+
+# TL subcategories are promoted under a single "TL" main category
+TL_SUBCATEGORIES = {"ASP", "ORD", "DUP", "FB", "MV"}
+
+# Runs of word characters, as delimited by the \b assertions keywords match on
+_TOKEN_RE = re.compile(r"\w+")
 
 
 def load_dictionaries(file_path):
@@ -12,72 +25,558 @@ def load_dictionaries(file_path):
     Returns:
     dict: A dictionary with B5T as keys and Keywords as values.
     """
-    b5t_dict = {}
     try:
         with open(file_path, "r", encoding="utf-8") as csvfile:
-            csv_reader = csv.reader(csvfile)
-            # header = next(csv_reader, None)
-            for row in csv_reader:
-                # If the row has at least two columns
-                if len(row) >= 2:
-                    b5t = row[0].strip()
-                    keyword = row[1].strip()
-                    b5t_dict[b5t] = keyword
-        # print(b5t_dict)
-        return b5t_dict
+            return parse_dictionary(csvfile)
 
     except Exception as e:
         return {}
 
 
-def find_b5t_labels(b5t_dict, text):
+def parse_dictionary(lines):
     """
-    Scans text, finds all matching B5T labels based on keywords
+    Builds the B5T mapping from the lines of a dictionary CSV.
+
+    Args:
+    lines (iterable): Lines of CSV text, e.g. an open file.
+
+    Returns:
+    B5TDictionary: A dictionary with B5T as keys and Keywords as values.
+    """
+    b5t_dict = B5TDictionary()
+    csv_reader = csv.reader(lines)
+    # header = next(csv_reader, None)
+    for row in csv_reader:
+        # If the row has at least two columns
+        if len(row) >= 2:
+            b5t = row[0].strip()
+            keyword = row[1].strip()
+            b5t_dict[b5t] = keyword
+    # print(b5t_dict)
+    b5t_dict.build_index()
+    return b5t_dict
+
+
+class B5TDictionary(dict):
+    """
+    B5T -> keywords mapping that also carries an inverted token index.
+
+    token_index maps the first word token of every (case-folded) keyword to
+    the (label, keyword) entries starting with it. Keywords that do not
+    start with a word character are listed in untokenized instead. The
+    index is built on first use and dropped by every change to the
+    mapping, so it always reflects the current entries.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._index = None
+
+    @property
+    def token_index(self):
+        return self._current_index()[0]
+
+    @property
+    def untokenized(self):
+        return self._current_index()[1]
+
+    def _current_index(self):
+        if self._index is None:
+            self.build_index()
+        return self._index
+
+    def build_index(self):
+        self._index = build_token_index(self)
+
+    def _changed(self):
+        self._index = None
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other):
+        result = super().__ior__(other)
+        self._changed()
+        return result
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._changed()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._changed()
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self._changed()
+        return value
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+
+def split_keywords(keywords_str):
+    """Splits a comma-separated keyword string into its non-empty keywords."""
+    return [kw.strip() for kw in keywords_str.split(",") if kw.strip()]
+
+
+def build_token_index(b5t_dict):
     """
-    # Find all possible labels
-    matched = []
+    Builds the inverted index of a B5T mapping.
+
+    Returns:
+    tuple: (token_index, untokenized) where token_index maps a first token
+        to a list of (label, keyword) pairs and untokenized lists the
+        (label, keyword) pairs whose keyword starts with a non-word
+        character. Keywords are case-folded.
+    """
+    token_index = {}
+    untokenized = []
     for label, keywords_str in b5t_dict.items():
-        # split keywords string
-        keywords = [kw.strip() for kw in keywords_str.split(",") if kw.strip()]
-        for kw in keywords:
-            pattern = r"\b" + re.escape(kw) + r"\b"
-            if re.search(pattern, text, re.IGNORECASE):
-                matched.append(label)
-                break  # match one keyword and jump to next label
-    # print(f"Matched labels: {matched}")
-
-    # TL subcategory logic
-    def find_tl_subcategory(categories):
-        # Initialize defaults
-        b5t, sub1, sub2 = "99", "", ""
-
-        # Define TL subcategories
-        tl_subcategories = {"ASP", "ORD", "DUP", "FB", "MV"}
-        tl_matches = [c for c in categories if c in tl_subcategories]
-        other_matches = [c for c in categories if c not in tl_subcategories]
-
-        # If TL subcategory matches are found
-        if tl_matches:
-            b5t = "TL"  # Set main category to TL
-            sub1 = tl_matches[0]  # First subcategory
-            sub2 = (
-                ",".join(tl_matches[1:3]) if len(tl_matches) > 1 else ""
-            )  # Subsequent subcategories
-        # Non-TL is found
-        elif other_matches:
-            b5t = other_matches[0]
-            sub1 = other_matches[1] if len(other_matches) > 1 else ""
-            sub2 = ",".join(other_matches[2:4]) if len(other_matches) > 2 else ""
-
-        # Special rule: WATCHLEADER priority
-        if "WL" in categories:
-            b5t = "WL"
-            # Recalculate subcategories, excluding WL
-            subcats = [c for c in categories if c != "WL"]
-            sub1 = subcats[0] if subcats else ""
-            sub2 = ",".join(subcats[1:3]) if len(subcats) > 1 else ""
-
-        return b5t, sub1, sub2
-
-    b5t, sub1, sub2 = find_tl_subcategory(matched)
+        for kw in dict.fromkeys(fold_case(kw) for kw in split_keywords(keywords_str)):
+            first = _TOKEN_RE.match(kw)
+            if first:
+                token_index.setdefault(first.group(), []).append((label, kw))
+            else:
+                untokenized.append((label, kw))
+    return token_index, untokenized
+
+
+def fold_case(text):
+    """
+    Lowercases text without changing its length, so match offsets found in
+    the folded text are valid offsets into the original text.
+    """
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    # A few characters (e.g. 'İ') lowercase to two code points; keep those as-is
+    return "".join(ch.lower() if len(ch.lower()) == 1 else ch for ch in text)
+
+
+def _is_word_char(ch):
+    # Same definition of a word character as the re module's \w for str patterns
+    return ch.isalnum() or ch == "_"
+
+
+def _is_boundary(text, pos):
+    """Equivalent of the regex \\b assertion at position pos of text."""
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < len(text) and _is_word_char(text[pos])
+    return before != after
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton that reports every (possibly overlapping)
+    occurrence of a set of keywords in a single pass over the text.
+    """
+
+    def __init__(self, keywords):
+        """
+        Args:
+        keywords (iterable): (keyword, payload) pairs. Keywords are matched
+            literally, so they should already be case-folded.
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for keyword, payload in keywords:
+            node = 0
+            for ch in keyword:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(keyword), payload))
+
+        # Breadth-first pass to build failure links and merge suffix outputs
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = fail
+                self._out[nxt] = self._out[nxt] + self._out[fail]
+
+    def __len__(self):
+        return len(self._goto)
+
+    def iter_matches(self, text):
+        """
+        Yields (start, end, payload) for every keyword occurrence in text.
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, payload in out[node]:
+                yield i + 1 - length, i + 1, payload
+
+
+# Characters left in case-folded text that re.IGNORECASE equates with an
+# ASCII letter while lowercasing does not ('ı' and 'İ' match 'i', 'ſ'
+# matches 's'). Other non-ASCII text folds the same way under both.
+_RE_CASE_EXCEPTIONS = frozenset("ıİſ")
+
+
+def keyword_pattern(keyword):
+    """Whole-word, case-insensitive regex for one keyword, as the original scan used."""
+    return re.compile(r"\b" + re.escape(keyword) + r"\b", re.IGNORECASE)
+
+
+class CompiledDictionary:
+    """
+    B5T dictionary compiled for matching many rows, by first token of each
+    keyword plus an automaton for keywords starting with punctuation.
+
+    Rows containing a character whose lowercase form disagrees with
+    re.IGNORECASE ('ı', 'İ', 'ſ') are matched with a regex per keyword.
+    """
+
+    def __init__(self, b5t_dict):
+        # SHA-256 of the dictionary CSV, set when loaded through dictionary_artifact
+        self.content_hash = None
+        self.labels = list(b5t_dict)
+        if isinstance(b5t_dict, B5TDictionary):
+            token_index, untokenized = b5t_dict.token_index, b5t_dict.untokenized
+        else:
+            token_index, untokenized = build_token_index(b5t_dict)
+
+        positions = {label: i for i, label in enumerate(self.labels)}
+        self._token_index = {
+            token: [(positions[label], kw) for label, kw in entries]
+            for token, entries in token_index.items()
+        }
+        self._untokenized = [(positions[label], kw) for label, kw in untokenized]
+        self._automaton = KeywordAutomaton(
+            (kw, index) for index, kw in self._untokenized
+        )
+        self._has_untokenized = bool(untokenized)
+        self.keyword_count = len(untokenized) + sum(
+            len(entries) for entries in token_index.values()
+        )
+        self._patterns = None
+        self._non_ascii_patterns = [
+            (index, keyword_pattern(kw)) for index, kw in self._entries() if not kw.isascii()
+        ]
+
+    def _entries(self):
+        """Returns (label position, keyword) for every keyword, in dictionary order."""
+        entries = [e for es in self._token_index.values() for e in es] + self._untokenized
+        return sorted(entries)
+
+    def patterns(self):
+        """Returns (label position, regex) for every keyword, compiled on first use."""
+        if self._patterns is None:
+            self._patterns = [(index, keyword_pattern(kw)) for index, kw in self._entries()]
+        return self._patterns
+
+    def match_indices_folded(self, folded_text):
+        """
+        Returns the positions in labels of the labels whose keywords occur as
+        whole words in an already case-folded text, in ascending order.
+        """
+        if not folded_text.isascii() and not _RE_CASE_EXCEPTIONS.isdisjoint(folded_text):
+            return sorted(
+                {index for index, pattern in self.patterns() if pattern.search(folded_text)}
+            )
+
+        found = set()
+        for index, pattern in self._non_ascii_patterns:
+            if pattern.search(folded_text):
+                found.add(index)
+        token_index = self._token_index
+        for token in _TOKEN_RE.finditer(folded_text):
+            candidates = token_index.get(token.group())
+            if candidates is None:
+                continue
+            # A token start is always a word boundary, so only the end needs checking
+            start = token.start()
+            for index, kw in candidates:
+                if (
+                    index not in found
+                    and folded_text.startswith(kw, start)
+                    and _is_boundary(folded_text, start + len(kw))
+                ):
+                    found.add(index)
+
+        if self._has_untokenized:
+            for start, end, index in self._automaton.iter_matches(folded_text):
+                if index in found:
+                    continue
+                if _is_boundary(folded_text, start) and _is_boundary(folded_text, end):
+                    found.add(index)
+        return sorted(found)
+
+    def match_folded(self, folded_text):
+        """
+        Returns the labels whose keywords occur as whole words in an already
+        case-folded text, in dictionary order.
+        """
+        return [self.labels[i] for i in self.match_indices_folded(folded_text)]
+
+    def match(self, text):
+        """Returns all labels matched by text, in dictionary order."""
+        return self.match_folded(fold_case(text))
+
+    def keywords(self):
+        """Returns the case-folded keywords of every label, as sets."""
+        keywords = {label: set() for label in self.labels}
+        for entries in self._token_index.values():
+            for index, kw in entries:
+                keywords[self.labels[index]].add(kw)
+        for index, kw in self._untokenized:
+            keywords[self.labels[index]].add(kw)
+        return keywords
+
+
+def compile_dictionary(b5t_dict):
+    """
+    Compiles a mapping returned by load_dictionaries into a CompiledDictionary.
+    """
+    if isinstance(b5t_dict, CompiledDictionary):
+        return b5t_dict
+    return CompiledDictionary(b5t_dict)
+
+
+def find_tl_subcategory(categories):
+    """
+    Resolves matched labels into the (B5T, Subcategory1, Subcategory2) slots.
+    """
+    # Initialize defaults
+    b5t, sub1, sub2 = "99", "", ""
+
+    tl_matches = [c for c in categories if c in TL_SUBCATEGORIES]
+    other_matches = [c for c in categories if c not in TL_SUBCATEGORIES]
+
+    # If TL subcategory matches are found
+    if tl_matches:
+        b5t = "TL"  # Set main category to TL
+        sub1 = tl_matches[0]  # First subcategory
+        sub2 = (
+            ",".join(tl_matches[1:3]) if len(tl_matches) > 1 else ""
+        )  # Subsequent subcategories
+    # Non-TL is found
+    elif other_matches:
+        b5t = other_matches[0]
+        sub1 = other_matches[1] if len(other_matches) > 1 else ""
+        sub2 = ",".join(other_matches[2:4]) if len(other_matches) > 2 else ""
+
+    # Special rule: WATCHLEADER priority
+    if "WL" in categories:
+        b5t = "WL"
+        # Recalculate subcategories, excluding WL
+        subcats = [c for c in categories if c != "WL"]
+        sub1 = subcats[0] if subcats else ""
+        sub2 = ",".join(subcats[1:3]) if len(subcats) > 1 else ""
+
     return b5t, sub1, sub2
+
+
+def find_b5t_labels(b5t_dict, text):
+    """
+    Scans text, finds all matching B5T labels based on keywords
+
+    Args:
+    b5t_dict (dict | CompiledDictionary): Output of load_dictionaries, or the
+        result of compile_dictionary on it. Pass the compiled form when
+        classifying many rows so the keywords are only compiled once.
+    text (str): The text to scan.
+
+    Returns:
+    tuple: (b5t, sub1, sub2)
+    """
+    matched = compile_dictionary(b5t_dict).match(text)
+    return find_tl_subcategory(matched)
+
+
+# Column names of the coded output, in order
+OUTPUT_COLUMNS = ["B5T", "Subcategory1", "Subcategory2"]
+
+# Default number of distinct utterances remembered by a ClassificationMemo
+DEFAULT_MEMO_SIZE = 100_000
+
+
+class ClassificationMemo:
+    """
+    Bounded LRU cache of classification results keyed by normalized text.
+
+    Transcripts repeat the same short utterances ("Roger", "Aye sir") many
+    times. A memo shared across the files of one run lets each distinct
+    utterance be matched once. Entries are only valid for one dictionary,
+    so the memo clears itself when used with a different one.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._dictionary = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def bind(self, compiled_dict):
+        """Ties the memo to a dictionary, dropping entries from any other one."""
+        if self._dictionary is not compiled_dict:
+            self._entries.clear()
+            self._dictionary = compiled_dict
+
+    def get(self, key):
+        """Returns the cached ((b5t, sub1, sub2), matched) for key, or None."""
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def record(self, hits, misses):
+        """Adds row counts served without (hits) and with (misses) matching."""
+        self.hits += hits
+        self.misses += misses
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
+
+
+def code_column(values, index=None):
+    """
+    Categorical column of codes, with the codes in use as sorted categories.
+
+    Each distinct code is stored once and rows hold small integer positions
+    into it, which takes a fraction of the memory of one string object per
+    row and makes value_counts and groupby on the codes cheap.
+    """
+    return pd.Series(pd.Categorical(values), index=index)
+
+
+def coded_frame(rows, codes, index):
+    """
+    Output columns for rows given as positions into a table of distinct
+    (b5t, sub1, sub2) results.
+
+    Args:
+    rows (list): Distinct (b5t, sub1, sub2) tuples
+    codes (np.ndarray): Position in rows of each output row
+    index (pd.Index): Index of the output
+    """
+    table = np.empty((len(rows), len(OUTPUT_COLUMNS)), dtype=object)
+    table[:] = rows
+    columns = {}
+    for i, name in enumerate(OUTPUT_COLUMNS):
+        categories, positions = np.unique(table[:, i].astype(str), return_inverse=True)
+        column = pd.Categorical.from_codes(
+            positions[codes], categories=pd.Index(categories, dtype=object)
+        )
+        columns[name] = column.remove_unused_categories()
+    return pd.DataFrame(columns, index=index)
+
+
+def fold_series(texts):
+    """
+    Case-folds a whole column at once, matching fold_case row by row.
+    """
+    texts = texts.astype(str)
+    folded = texts.str.lower()
+    # Rare rows whose lowercase form changes length fall back to fold_case
+    changed = folded.str.len() != texts.str.len()
+    if changed.any():
+        folded[changed] = texts[changed].map(fold_case)
+    return folded
+
+
+def classify_series(texts, compiled_dict, memo=None, with_labels=False):
+    """
+    Classifies a whole text column in one batch, matching each distinct
+    utterance once.
+
+    Args:
+    texts (pd.Series): The transcript text column. Missing values are
+        coded as "99".
+    compiled_dict (dict | CompiledDictionary): The dictionary to match against.
+    memo (ClassificationMemo): Optional memo carrying results for repeated
+        utterances across calls. Rows it saves from matching count as hits.
+    with_labels (bool): Also return a LabelMatrix of every label each row
+        matched, not only the ones resolved into the output columns.
+
+    Returns:
+    pd.DataFrame: Categorical B5T, Subcategory1 and Subcategory2 columns
+        aligned with the index of texts; with with_labels, a (DataFrame, LabelMatrix)
+        tuple.
+    """
+    compiled_dict = compile_dictionary(compiled_dict)
+    if memo is not None:
+        memo.bind(compiled_dict)
+    present = texts.notna()
+
+    codes = np.full(len(texts), -1, dtype=np.int64)
+    uniques = []
+    if present.any():
+        present_codes, uniques = pd.factorize(fold_series(texts[present]))
+        codes[present.to_numpy()] = present_codes
+
+    # Resolve each distinct set of matched labels only once
+    labels = compiled_dict.labels
+    resolved = {}
+    rows = []
+    label_sets = []
+    matched_count = 0
+    for folded in uniques:
+        # Surrounding whitespace never affects whole-word matches
+        key = folded.strip()
+        entry = memo.get(key) if memo is not None else None
+        if entry is None:
+            matched = tuple(compiled_dict.match_indices_folded(key))
+            if matched not in resolved:
+                resolved[matched] = find_tl_subcategory([labels[i] for i in matched])
+            entry = (resolved[matched], matched)
+            matched_count += 1
+            if memo is not None:
+                memo.put(key, entry)
+        rows.append(entry[0])
+        label_sets.append(entry[1])
+    if memo is not None:
+        present_count = int(present.sum())
+        memo.record(present_count - matched_count, matched_count)
+    # Trailing entry is picked up by code -1 (missing text)
+    rows.append(find_tl_subcategory([]))
+
+    coded_df = coded_frame(rows, codes, texts.index)
+    if with_labels:
+        return coded_df, LabelMatrix.from_codes(labels, codes, label_sets)
+    return coded_df
@@ -0,0 +1,137 @@
+"""
+Headless batch coding for Plan A.
+
+Codes transcript CSVs with the keyword dictionary without starting the
+Streamlit app, e.g. from cron:
+
+    python -m src.cli transcripts/ extra/*.csv -o coded/ --jobs 8 --summary
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from file_processor import DICTIONARY_PATH, process_multi_files
+from summary_report import combine, generate_summary_report
+
+
+def expand_inputs(inputs):
+    """
+    Expand files, folders and glob patterns into a sorted list of CSV files.
+
+    Raises:
+        FileNotFoundError: If an input matches no CSV file
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(
+                os.path.join(item, f) for f in os.listdir(item) if f.endswith(".csv")
+            )
+        elif glob.has_magic(item):
+            matches = sorted(f for f in glob.glob(item) if os.path.isfile(f))
+        else:
+            matches = [item] if os.path.isfile(item) else []
+        if not matches:
+            raise FileNotFoundError(f"No CSV files found for input: {item}")
+        files.extend(m for m in matches if m not in files)
+    return files
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.cli",
+        description="Code transcript CSV files with a B5T keyword dictionary.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="Transcript CSV files, folders or glob patterns"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", required=True, help="Folder to write coded CSVs to"
+    )
+    parser.add_argument(
+        "-d",
+        "--dictionary",
+        default=DICTIONARY_PATH,
+        help="Dictionary CSV (default: the dictionary saved by the app)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream each transcript in blocks of this many rows",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Also write a B5T frequency report for each coded transcript and a combined one",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    try:
+        input_files = expand_inputs(args.inputs)
+    except FileNotFoundError as e:
+        logging.error(str(e))
+        return 2
+
+    # Coded files keep the input file name, so names must be unique
+    names = [os.path.basename(f) for f in input_files]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        logging.error(f"Input file names must be unique: {', '.join(duplicates)}")
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output_files = [os.path.join(args.output_dir, n) for n in names]
+
+    results = process_multi_files(
+        input_files,
+        output_files,
+        workers=args.jobs,
+        dictionary_path=args.dictionary,
+        chunksize=args.chunksize,
+    )
+
+    failed = [r for r in results if r["error"]]
+    if args.summary:
+        counters = []
+        for result in results:
+            if result["error"]:
+                continue
+            name = os.path.basename(result["output_file"])
+            counters.append(
+                generate_summary_report(
+                    result["output_file"],
+                    os.path.join(args.output_dir, f"B5T_frequency_{name}"),
+                )
+            )
+        # Corpus totals are merged from the per-file counts
+        combine(counters).to_frame().to_csv(
+            os.path.join(args.output_dir, "Combined_B5T_frequency.csv"), index=False
+        )
+
+    total_rows = sum(r["rows"] for r in results)
+    logging.info(
+        f"Coded {len(results) - len(failed)} of {len(results)} files ({total_rows} rows)"
+    )
+    for result in failed:
+        logging.error(f"{result['input_file']}: {result['error']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
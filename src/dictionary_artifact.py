@@ -0,0 +1,169 @@
+import glob
+import hashlib
+import io
+import logging
+import os
+import pickle
+from typing import Optional
+
+from classifier import CompiledDictionary, parse_dictionary
+from file_utils import atomic_write, evict_least_recently_used
+
+# Bump whenever CompiledDictionary changes shape so stale artifacts are rebuilt
+ARTIFACT_VERSION = 5
+ARTIFACT_MAGIC = b"B5TDICT\0"
+# Magic, version, SHA-256 of the dictionary CSV, SHA-256 of the pickled payload
+_HEADER_SIZE = len(ARTIFACT_MAGIC) + 4 + 32 + 32
+
+_APP_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), "../app"))
+
+# Dictionaries saved through the app; their artifacts are kept next to them
+# and cleaned up by DictionaryStore with the versions they belong to
+MANAGED_FOLDER = os.path.join(_APP_FOLDER, "uploaded_dictionaries")
+
+# Artifacts of any other dictionary CSV, e.g. one passed to the batch CLI,
+# least recently used first evicted once they add up to CACHE_MAX_BYTES
+CACHE_FOLDER = os.path.join(_APP_FOLDER, "dictionary_cache")
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Compiled dictionaries already loaded by this process, keyed by CSV path
+_loaded = {}
+
+
+def dictionary_hash(data: bytes) -> str:
+    """Return the SHA-256 hex digest identifying a dictionary's content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def artifact_path(dictionary_path: str, content_hash: str) -> str:
+    """
+    Path of the compiled artifact for a dictionary CSV with the given hash,
+    e.g. `.dictionary.3fa1c0de9b2e4d17.v5.b5t`, next to the CSV in
+    MANAGED_FOLDER and in CACHE_FOLDER otherwise.
+    """
+    folder, stem = _artifact_prefix(dictionary_path)
+    return os.path.join(
+        folder, f".{stem}.{content_hash[:16]}.v{ARTIFACT_VERSION}.b5t"
+    )
+
+
+def _artifact_prefix(dictionary_path: str):
+    folder, name = os.path.split(os.path.abspath(dictionary_path))
+    stem = os.path.splitext(name)[0]
+    managed = os.path.abspath(MANAGED_FOLDER)
+    if os.path.commonpath([managed, folder]) == managed:
+        return folder, stem
+    # CSVs from different folders may share a name
+    folder_hash = hashlib.sha256(folder.encode("utf-8")).hexdigest()[:8]
+    return os.path.abspath(CACHE_FOLDER), f"{stem}-{folder_hash}"
+
+
+def _compile_bytes(data: bytes) -> CompiledDictionary:
+    # Mirrors load_dictionaries: an unreadable dictionary is an empty one
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return CompiledDictionary({})
+    return CompiledDictionary(parse_dictionary(io.StringIO(text, newline=None)))
+
+
+def _read_artifact(path: str, content_hash: str) -> CompiledDictionary:
+    with open(path, "rb") as f:
+        data = f.read()
+    magic_end = len(ARTIFACT_MAGIC)
+    if data[:magic_end] != ARTIFACT_MAGIC:
+        raise ValueError("not a compiled dictionary artifact")
+    version = int.from_bytes(data[magic_end:magic_end + 4], "little")
+    if version != ARTIFACT_VERSION:
+        raise ValueError(f"unsupported artifact version {version}")
+    hash_end = magic_end + 4 + 32
+    if data[magic_end + 4:hash_end] != bytes.fromhex(content_hash):
+        raise ValueError("artifact does not match dictionary content")
+    payload = data[_HEADER_SIZE:]
+    if data[hash_end:_HEADER_SIZE] != hashlib.sha256(payload).digest():
+        raise ValueError("artifact payload is corrupt")
+    compiled = pickle.loads(payload)
+    if not isinstance(compiled, CompiledDictionary):
+        raise ValueError("artifact does not contain a compiled dictionary")
+    return compiled
+
+
+def _write_artifact(
+    dictionary_path: str, compiled: CompiledDictionary, content_hash: str
+):
+    path = artifact_path(dictionary_path, content_hash)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL)
+    header = [
+        ARTIFACT_MAGIC,
+        ARTIFACT_VERSION.to_bytes(4, "little"),
+        bytes.fromhex(content_hash),
+        hashlib.sha256(payload).digest(),
+    ]
+    atomic_write(path, b"".join(header + [payload]))
+    remove_artifacts(dictionary_path, keep=path)
+    if os.path.dirname(path) == os.path.abspath(CACHE_FOLDER):
+        evict_least_recently_used(os.path.dirname(path), CACHE_MAX_BYTES, ".b5t")
+
+
+def remove_artifacts(dictionary_path: str, keep: Optional[str] = None):
+    """Delete the compiled artifacts of a dictionary CSV, except keep."""
+    folder, stem = _artifact_prefix(dictionary_path)
+    for stale in glob.glob(os.path.join(folder, f".{glob.escape(stem)}.*.b5t")):
+        if stale != keep:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def load_compiled_dictionary(dictionary_path: str) -> CompiledDictionary:
+    """
+    Load the compiled form of a dictionary CSV from its artifact, compiling
+    and writing the artifact on a miss. A missing CSV compiles to an empty
+    dictionary.
+
+    Args:
+        dictionary_path: Path to the dictionary CSV
+
+    Returns:
+        CompiledDictionary with content_hash set
+    """
+    dictionary_path = os.path.abspath(dictionary_path)
+    try:
+        with open(dictionary_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        compiled = CompiledDictionary({})
+        compiled.content_hash = dictionary_hash(b"")
+        return compiled
+
+    content_hash = dictionary_hash(data)
+    cached = _loaded.get(dictionary_path)
+    if cached is not None and cached.content_hash == content_hash:
+        return cached
+
+    path = artifact_path(dictionary_path, content_hash)
+    compiled = None
+    if os.path.exists(path):
+        try:
+            compiled = _read_artifact(path, content_hash)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable dictionary artifact {path}: {e}")
+        else:
+            # Mark as recently used for eviction from CACHE_FOLDER
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    if compiled is None:
+        compiled = _compile_bytes(data)
+        try:
+            _write_artifact(dictionary_path, compiled, content_hash)
+        except OSError as e:
+            logging.warning(f"Could not write dictionary artifact {path}: {e}")
+
+    compiled.content_hash = content_hash
+    _loaded[dictionary_path] = compiled
+    return compiled
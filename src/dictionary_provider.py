@@ -0,0 +1,102 @@
+import logging
+import os
+import threading
+from typing import Union
+
+from classifier import CompiledDictionary
+from dictionary_artifact import dictionary_hash, load_compiled_dictionary
+from dictionary_store import DictionaryStore
+
+
+class DictionaryProvider:
+    """
+    Process-wide holder of the compiled form of one dictionary CSV, or of
+    a DictionaryStore's current version.
+
+    A changed CSV is recompiled on a background thread while the previous
+    dictionary keeps serving; only the first load blocks.
+    """
+
+    def __init__(self, source: Union[str, DictionaryStore]):
+        if isinstance(source, DictionaryStore):
+            self.store = source
+            self.dictionary_path = None
+        else:
+            self.store = None
+            self.dictionary_path = os.path.abspath(source)
+        self._lock = threading.Lock()
+        self._current = None
+        self._signature = None
+        # Bumped by invalidate() so a reload started before a save cannot
+        # mark the saved file as already loaded
+        self._generation = 0
+        self._reload_thread = None
+
+    def _stat_signature(self):
+        path = self.store.current_path() if self.store else self.dictionary_path
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (path, stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, signature, generation):
+        if signature is None:
+            path = self.store.current_path() if self.store else self.dictionary_path
+        else:
+            path = signature[0]
+        try:
+            compiled = load_compiled_dictionary(path)
+        except Exception as e:
+            logging.error(f"Error reloading dictionary: {str(e)}")
+            return
+        with self._lock:
+            self._current = compiled
+            if generation == self._generation:
+                self._signature = signature
+
+    def _start_reload(self, signature):
+        # Caller holds the lock; at most one reload runs at a time
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return
+        self._reload_thread = threading.Thread(
+            target=self._load, args=(signature, self._generation), daemon=True
+        )
+        self._reload_thread.start()
+
+    def get(self) -> CompiledDictionary:
+        """
+        Return the current compiled dictionary.
+
+        A missing CSV gives an empty compiled dictionary, as with
+        load_compiled_dictionary.
+        """
+        signature = self._stat_signature()
+        with self._lock:
+            current = self._current
+            if current is not None and signature != self._signature:
+                self._start_reload(signature)
+        if current is not None:
+            return current
+
+        # Nothing to serve yet, so the first load happens in the caller
+        self._load(signature, self._generation)
+        with self._lock:
+            if self._current is None:
+                self._current = CompiledDictionary({})
+                self._current.content_hash = dictionary_hash(b"")
+            return self._current
+
+    def invalidate(self):
+        """Recompile in the background, e.g. right after the CSV is saved."""
+        with self._lock:
+            self._signature = None
+            self._generation += 1
+            if self._current is not None:
+                self._start_reload(self._stat_signature())
+
+    def wait(self, timeout=None):
+        """Block until a pending background reload has finished."""
+        thread = self._reload_thread
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,143 @@
+import glob
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from dictionary_artifact import dictionary_hash
+from file_utils import atomic_write
+
+# Versions kept besides the current one, and how long any version stays
+# readable after it stops being current, so pinned readers never lose it
+DEFAULT_KEEP = 5
+DEFAULT_GRACE_SECONDS = 3600
+
+
+# One lock per store folder, so saves from concurrent sessions never
+# interleave their CURRENT and dictionary CSV writes
+_save_locks = {}
+_save_locks_guard = threading.Lock()
+
+
+def _save_lock(folder: str) -> threading.Lock:
+    with _save_locks_guard:
+        return _save_locks.setdefault(folder, threading.Lock())
+
+
+class DictionaryStore:
+    """
+    Immutable, content-addressed versions of the dictionary CSV, with
+    `versions/CURRENT` naming the current one.
+
+    Readers pin current_path() for a whole run. Saves also replace the
+    plain `<name>.csv`, and run one at a time per folder.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        name: str = "dictionary",
+        keep: int = DEFAULT_KEEP,
+        grace_seconds: float = DEFAULT_GRACE_SECONDS,
+    ):
+        self.folder = os.path.abspath(folder)
+        self.name = name
+        self.keep = keep
+        self.grace_seconds = grace_seconds
+        self.versions_folder = os.path.join(self.folder, "versions")
+        self.dictionary_path = os.path.join(self.folder, f"{name}.csv")
+        self._pointer_path = os.path.join(self.versions_folder, "CURRENT")
+
+    def version_path(self, content_hash: str) -> str:
+        """Path of the version with the given content hash."""
+        return os.path.join(
+            self.versions_folder, f"{self.name}.{content_hash[:16]}.csv"
+        )
+
+    def current_version(self) -> Optional[str]:
+        """File name of the current version, or None before the first save."""
+        try:
+            with open(self._pointer_path, encoding="utf-8") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def current_path(self) -> str:
+        """
+        Path to pin for reading the current dictionary.
+
+        Falls back to the plain dictionary CSV for folders written before
+        versions were introduced.
+        """
+        version = self.current_version()
+        if version is None:
+            return self.dictionary_path
+        return os.path.join(self.versions_folder, version)
+
+    def save(self, data: bytes) -> str:
+        """
+        Store data as a new version and make it current.
+
+        Args:
+            data: Dictionary CSV bytes
+
+        Returns:
+            Path of the saved version
+        """
+        os.makedirs(self.versions_folder, exist_ok=True)
+        path = self.version_path(dictionary_hash(data))
+        with _save_lock(self.folder):
+            if os.path.exists(path):
+                # Saving an older version again makes it the newest for GC
+                os.utime(path)
+            else:
+                atomic_write(path, data, fsync=True)
+            previous = self.current_version()
+            atomic_write(
+                self._pointer_path, os.path.basename(path).encode("utf-8"), fsync=True
+            )
+            if previous and previous != os.path.basename(path):
+                # Start the grace period of the version that was just replaced
+                try:
+                    os.utime(os.path.join(self.versions_folder, previous))
+                except OSError:
+                    pass
+            atomic_write(self.dictionary_path, data, fsync=True)
+            self.collect_garbage()
+        return path
+
+    def collect_garbage(self):
+        """
+        Delete old versions and their compiled artifacts.
+
+        The current version and the `keep` most recent others are kept, as
+        is any version that stopped being current less than grace_seconds
+        ago, so readers that pinned it can finish.
+        """
+        current = self.current_version()
+        pattern = os.path.join(self.versions_folder, f"{glob.escape(self.name)}.*.csv")
+        versions = []
+        for path in glob.glob(pattern):
+            if os.path.basename(path) == current:
+                continue
+            try:
+                versions.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+
+        cutoff = time.time() - self.grace_seconds
+        versions.sort(reverse=True)
+        for mtime, path in versions[self.keep:]:
+            if mtime > cutoff:
+                continue
+            stem = os.path.splitext(os.path.basename(path))[0]
+            artifacts = glob.glob(
+                os.path.join(self.versions_folder, f".{glob.escape(stem)}.*.b5t")
+            )
+            for stale in [path] + artifacts:
+                try:
+                    os.remove(stale)
+                except OSError as e:
+                    logging.warning(f"Could not remove old dictionary {stale}: {e}")
@@ -1,16 +1,41 @@
 import logging
 import os
-from typing import List, Union
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Union
 
+import numpy as np
 import pandas as pd
 
-from classifier import find_b5t_labels, load_dictionaries
+from classifier import (
+    ClassificationMemo,
+    classify_series,
+    coded_frame,
+    compile_dictionary,
+)
+from dictionary_artifact import load_compiled_dictionary
+from summary_report import FrequencyCounter, count_crosstabs
 
 # Setup logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Arrow-backed strings keep the Text column of coded output compact.
+# pyarrow is a requirement; without it the column keeps Python strings
+try:
+    import pyarrow  # noqa: F401
+
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = None
+
+# User-defined dictionary saved by the Dictionary page
+DICTIONARY_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../app/uploaded_dictionaries/dictionary.csv")
+)
+
 
 # Read CSV file and check for 'text' column
 def read_csv(file_path: str) -> pd.DataFrame:
@@ -25,6 +50,16 @@ def read_csv(file_path: str) -> pd.DataFrame:
     return df
 
 
+def read_csv_chunks(file_path: str, chunksize: int):
+    """Read a CSV file as an iterator of DataFrames of at most chunksize rows."""
+    try:
+        return pd.read_csv(file_path, chunksize=chunksize)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {file_path}")
+    except Exception as e:
+        raise Exception(f"Failed to read CSV {file_path}: {str(e)}")
+
+
 def get_text_column(df):
     # Support common 'text' column names
     for col in df.columns:
@@ -33,65 +68,525 @@ def get_text_column(df):
     raise ValueError("CSV must contain a 'text' column (case-insensitive)")
 
 
-# Process uploaded single CSV file
-def process_single_file(input_file: str, output_file: str):
-    """Process a single CSV file."""
-    df = read_csv(input_file)
-    text_col = get_text_column(df)
-
-    # Load user-defined dictionary csv file
-    file_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../app/uploaded_dictionaries/dictionary.csv'))
+def load_dictionary(dictionary_path: str = DICTIONARY_PATH):
+    """Load the compiled form of the user-defined dictionary csv file."""
     try:
-        b5t_dict = load_dictionaries(file_path)
-    except FileNotFoundError:
-        logging.error(f"Dictionary file not found at {file_path}")
-        raise FileNotFoundError("Dictionary file not found")
+        return load_compiled_dictionary(dictionary_path)
     except Exception as e:
         logging.error(f"Error loading dictionary: {str(e)}")
         raise Exception(f"Error loading dictionary: {str(e)}")
 
 
-    results = []
-    for text in df[text_col]:
-        if pd.isna(text):
-            continue
-        # sentence = load_dictionaries(str(text).strip())
-        b5t, sub1, sub2 = find_b5t_labels(b5t_dict, text)
-        results.append(
-            {"Text": text, "B5T": b5t, "Subcategory1": sub1, "Subcategory2": sub2}
+# Process uploaded single CSV file
+def process_single_file(
+    input_file: str,
+    output_file: str,
+    compiled_dict=None,
+    workers: int = 1,
+    chunk_rows: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    memo: Optional[ClassificationMemo] = None,
+):
+    """
+    Process a single CSV file.
+
+    Args:
+        input_file: Transcript CSV to code
+        output_file: Where to write the coded CSV
+        compiled_dict: Dictionary to code with (dict or CompiledDictionary).
+            Defaults to the compiled user-defined dictionary.
+        workers: Number of processes to split the rows of this file over
+        chunk_rows: Rows per chunk when workers > 1
+        chunksize: Stream the file in blocks of this many rows, appending
+            each coded block to the output, so memory use does not grow
+            with the size of the file
+        memo: Memo of repeated utterances to share with other files of the
+            same run. A fresh memo is used, and its stats logged, if omitted.
+
+    Returns:
+        Number of rows written
+    """
+    if compiled_dict is None:
+        compiled_dict = load_dictionary()
+    compiled_dict = compile_dictionary(compiled_dict)
+    own_memo = memo is None
+    if own_memo:
+        memo = ClassificationMemo()
+
+    if chunksize is None:
+        output_df = process_dataframe(
+            read_csv(input_file), compiled_dict, workers, chunk_rows, memo
+        )
+        output_df.to_csv(output_file, index=False)
+        rows = len(output_df)
+    else:
+        rows = _stream_file(
+            input_file, output_file, compiled_dict, workers, chunk_rows, chunksize, memo
         )
 
-    output_df = pd.DataFrame(results)
-    output_df.to_csv(output_file, index=False)
     logging.info(
-        f"Processed {len(results)} rows from {input_file}. Output saved to {output_file}"
+        f"Processed {rows} rows from {input_file}. Output saved to {output_file}"
     )
+    if own_memo:
+        log_memo_stats(memo.hits, memo.misses)
+    return rows
+
+
+def process_dataframe(
+    df: pd.DataFrame,
+    compiled_dict=None,
+    workers: int = 1,
+    chunk_rows: Optional[int] = None,
+    memo: Optional[ClassificationMemo] = None,
+    with_labels: bool = False,
+):
+    """
+    Code a transcript that is already in memory, as process_single_file
+    does without the CSV round trip.
+
+    Args:
+        df: Transcript with a 'text' column (case-insensitive)
+        compiled_dict: Dictionary to code with (dict or CompiledDictionary).
+            Defaults to the compiled user-defined dictionary.
+        workers: Number of processes to split the rows over
+        chunk_rows: Rows per chunk when workers > 1
+        memo: Memo of repeated utterances to share with other transcripts.
+            A fresh memo is used, and its stats logged, if omitted.
+        with_labels: Also return the LabelMatrix of every label each output
+            row matched. The rows are then coded in-process.
+
+    Returns:
+        DataFrame with the Text, B5T, Subcategory1 and Subcategory2 columns;
+        the code columns are categorical and Text is Arrow-backed when
+        pyarrow is installed. With with_labels, a (DataFrame, LabelMatrix)
+        tuple.
+    """
+    if compiled_dict is None:
+        compiled_dict = load_dictionary()
+    compiled_dict = compile_dictionary(compiled_dict)
+    own_memo = memo is None
+    if own_memo:
+        memo = ClassificationMemo()
+
+    output = _code_frame(
+        df,
+        get_text_column(df),
+        compiled_dict,
+        workers,
+        chunk_rows,
+        memo,
+        with_labels=with_labels,
+    )
+    if own_memo:
+        log_memo_stats(memo.hits, memo.misses)
+    return output
+
+
+def log_memo_stats(hits: int, misses: int):
+    """Log how many rows were served from the utterance memo."""
+    total = hits + misses
+    rate = hits / total if total else 0.0
+    logging.info(
+        f"Utterance memo: {hits} rows reused, {misses} rows matched ({rate:.1%} hit rate)"
+    )
+
+
+def _code_frame(
+    df, text_col, compiled_dict, workers, chunk_rows, memo, pool=None, with_labels=False
+):
+    """
+    Build the coded output frame for the text column of df, and with
+    with_labels its LabelMatrix.
+    """
+    texts = df[text_col].dropna()
+    labels = None
+    if with_labels:
+        coded, labels = classify_series(texts, compiled_dict, memo, with_labels=True)
+    elif workers > 1:
+        coded = classify_series_parallel(
+            texts, compiled_dict, workers, chunk_rows, pool=pool, memo=memo
+        )
+    else:
+        coded = classify_series(texts, compiled_dict, memo)
+    if TEXT_DTYPE is not None:
+        texts = texts.astype(TEXT_DTYPE)
+    output_df = pd.concat([texts.rename("Text"), coded], axis=1)
+    if with_labels:
+        return output_df, labels
+    return output_df
+
+
+def _stream_file(
+    input_file, output_file, compiled_dict, workers, chunk_rows, chunksize, memo
+):
+    """Code a CSV block by block, appending each block to the output file."""
+    rows = 0
+    text_col = None
+    # One pool serves every block instead of being recreated per block
+    pool_context = (
+        ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(compiled_dict,)
+        )
+        if workers > 1
+        else nullcontext()
+    )
+    with pool_context as pool:
+        for df in read_csv_chunks(input_file, chunksize):
+            first = text_col is None
+            if first:
+                text_col = get_text_column(df)
+            output_df = _code_frame(
+                df, text_col, compiled_dict, workers, chunk_rows, memo, pool
+            )
+            output_df.to_csv(
+                output_file, mode="w" if first else "a", header=first, index=False
+            )
+            rows += len(output_df)
+    return rows
+
+
+# Compiled dictionary and utterance memo of a pool worker, set by _init_worker
+_worker_dictionary = None
+_worker_memo = None
+
+
+def _init_worker(dictionary):
+    """Pool initializer: load a dictionary path, or adopt a compiled dictionary."""
+    global _worker_dictionary, _worker_memo
+    if isinstance(dictionary, str):
+        _worker_dictionary = load_dictionary(dictionary)
+    else:
+        _worker_dictionary = compile_dictionary(dictionary)
+    _worker_memo = ClassificationMemo()
+
+
+def _classify_chunk_task(shm_name: str, start: int, texts: np.ndarray):
+    """
+    Classify one row range and write its result codes into shared memory.
+
+    Only the small table of distinct (B5T, Subcategory1, Subcategory2)
+    triples and the memo counts for the range are pickled back; the
+    per-row codes go through the shared block.
+    """
+    hits, misses = _worker_memo.hits, _worker_memo.misses
+    coded = classify_series(pd.Series(texts), _worker_dictionary, _worker_memo)
+    codes, table = pd.factorize(pd.MultiIndex.from_frame(coded))
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(
+            (len(codes),), dtype=np.int32, buffer=shm.buf, offset=start * 4
+        )
+        out[:] = codes
+        del out
+    finally:
+        shm.close()
+    return list(table), _worker_memo.hits - hits, _worker_memo.misses - misses
+
+
+def classify_series_parallel(
+    texts: pd.Series,
+    compiled_dict,
+    workers: int,
+    chunk_rows: Optional[int] = None,
+    pool: Optional[ProcessPoolExecutor] = None,
+    memo: Optional[ClassificationMemo] = None,
+) -> pd.DataFrame:
+    """
+    Classify one large text column over several processes, which write
+    their row codes into shared memory.
+
+    Args:
+        texts: The transcript text column
+        compiled_dict: Dictionary to code with
+        workers: Number of worker processes
+        chunk_rows: Rows per chunk. Defaults to splitting the column into
+            four chunks per worker.
+        pool: Existing pool whose workers were initialized with
+            compiled_dict. A pool is created for this call if omitted.
+        memo: Memo used when the column is classified in-process. Worker
+            processes keep their own memos; their counts are added to it.
+
+    Returns:
+        Same frame as classify_series(texts, compiled_dict)
+    """
+    compiled_dict = compile_dictionary(compiled_dict)
+    total = len(texts)
+    if chunk_rows is None:
+        chunk_rows = -(-total // (workers * 4))
+    chunk_rows = max(1, chunk_rows)
+    if workers <= 1 or total <= chunk_rows:
+        return classify_series(texts, compiled_dict, memo)
+
+    values = texts.to_numpy()
+    starts = list(range(0, total, chunk_rows))
+    if pool is None:
+        pool_context = ProcessPoolExecutor(
+            max_workers=min(workers, len(starts)),
+            initializer=_init_worker,
+            initargs=(compiled_dict,),
+        )
+    else:
+        pool_context = nullcontext(pool)
+
+    shm = shared_memory.SharedMemory(create=True, size=total * 4)
+    try:
+        with pool_context as executor:
+            futures = [
+                executor.submit(
+                    _classify_chunk_task, shm.name, start, values[start:start + chunk_rows]
+                )
+                for start in starts
+            ]
+            chunk_results = [future.result() for future in futures]
+        codes = np.ndarray((total,), dtype=np.int32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Merge the per-chunk tables and remap each chunk's codes into it
+    merged = {}
+    for start, (table, hits, misses) in zip(starts, chunk_results):
+        if memo is not None:
+            memo.record(hits, misses)
+        mapping = np.array(
+            [merged.setdefault(triple, len(merged)) for triple in table],
+            dtype=np.int32,
+        )
+        chunk = codes[start:start + chunk_rows]
+        chunk[:] = mapping[chunk]
+
+    return coded_frame(list(merged), codes, texts.index)
+
+
+def _process_file_task(
+    in_file: str,
+    out_file: str,
+    compiled_dict=None,
+    chunksize: Optional[int] = None,
+    memo: Optional[ClassificationMemo] = None,
+) -> Dict:
+    """Worker task of process_multi_files: code one file into a result dict."""
+    if compiled_dict is None:
+        compiled_dict, memo = _worker_dictionary, _worker_memo
+    hits, misses = memo.hits, memo.misses
+    result = {"input_file": in_file, "output_file": out_file, "rows": 0, "error": None}
+    try:
+        result["rows"] = process_single_file(
+            in_file, out_file, compiled_dict, chunksize=chunksize, memo=memo
+        )
+    except Exception as e:
+        logging.error(f"Failed to process {in_file}: {str(e)}")
+        result["error"] = str(e)
+    result["memo_hits"] = memo.hits - hits
+    result["memo_misses"] = memo.misses - misses
+    return result
+
+
+def default_workers(file_count: int) -> int:
+    """Number of worker processes used when workers is not given."""
+    return max(1, min(file_count, os.cpu_count() or 1))
+
+
+def _cancelled_result(in_file: str, out_file: str) -> Dict:
+    return {
+        "input_file": in_file,
+        "output_file": out_file,
+        "rows": 0,
+        "error": "Cancelled",
+        "memo_hits": 0,
+        "memo_misses": 0,
+    }
+
+
+def _run_files(
+    pairs,
+    workers: Optional[int],
+    dictionary_path: str,
+    chunksize: Optional[int],
+    on_result: Optional[Callable[[int, Dict], Optional[bool]]] = None,
+) -> List[Dict]:
+    if workers is None:
+        workers = default_workers(len(pairs))
+    workers = min(workers, len(pairs))
+
+    # Compile (or load) the dictionary once before forking; every worker
+    # codes with this copy even if the CSV is replaced mid-batch
+    compiled_dict = load_dictionary(dictionary_path)
+
+    if workers <= 1:
+        memo = ClassificationMemo()
+        results = []
+        stopped = False
+        for position, (i, o) in enumerate(pairs):
+            if stopped:
+                results.append(_cancelled_result(i, o))
+                continue
+            result = _process_file_task(i, o, compiled_dict, chunksize, memo)
+            results.append(result)
+            if on_result is not None and on_result(position, result) is False:
+                stopped = True
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(compiled_dict,)
+        ) as pool:
+            futures = [
+                pool.submit(_process_file_task, i, o, None, chunksize) for i, o in pairs
+            ]
+            if on_result is not None:
+                positions = {future: position for position, future in enumerate(futures)}
+                for future in as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    if on_result(positions[future], future.result()) is False:
+                        # Files already running finish; queued ones never start
+                        for pending in futures:
+                            pending.cancel()
+            # Collect in submission order so results line up with the inputs
+            results = [
+                _cancelled_result(i, o) if future.cancelled() else future.result()
+                for future, (i, o) in zip(futures, pairs)
+            ]
+
+    log_memo_stats(
+        sum(r["memo_hits"] for r in results), sum(r["memo_misses"] for r in results)
+    )
+    return results
 
 
 # Process multiple CSV files or folders
 def process_multi_files(
-    input_path: Union[str, List[str]], output_path: Union[str, List[str]]
-):
+    input_path: Union[str, List[str]],
+    output_path: Union[str, List[str]],
+    workers: Optional[int] = None,
+    dictionary_path: str = DICTIONARY_PATH,
+    chunksize: Optional[int] = None,
+    on_result: Optional[Callable[[int, Dict], Optional[bool]]] = None,
+) -> List[Dict]:
+    """
+    Process a list of CSV files, a folder of CSV files, or a single file.
+
+    Files are spread over a pool of worker processes, each of which loads
+    the compiled dictionary once. A file that fails does not stop the rest
+    of the batch.
+
+    Args:
+        input_path: Input file, list of input files, or input folder
+        output_path: Output file, list of output files, or output folder
+        workers: Number of worker processes. Defaults to one per CPU,
+            capped at the number of files; 1 processes files in-process.
+        dictionary_path: Dictionary CSV to code with
+        chunksize: Stream each file in blocks of this many rows
+        on_result: Called with (position, result) as each file finishes,
+            in completion order. Returning False cancels the files that
+            have not started yet; they are reported with error "Cancelled".
+
+    Returns:
+        One result dict per file, in input order, with keys input_file,
+        output_file, rows, error (None on success), and memo_hits and
+        memo_misses (rows served from / added to the utterance memo)
+    """
     if isinstance(input_path, list):
         if not isinstance(output_path, list) or len(input_path) != len(output_path):
             raise ValueError(
                 "When input_path is a list, output_path must be a list of the same length."
             )
-        for in_file, out_file in zip(input_path, output_path):
-            process_single_file(in_file, out_file)
-        return
-
-    if os.path.isdir(input_path):
+        pairs = list(zip(input_path, output_path))
+    elif os.path.isdir(input_path):
         if not os.path.isdir(output_path):
             raise ValueError(
                 "When input_path is a folder, output_path must be a folder."
             )
-        for file in os.listdir(input_path):
-            if file.endswith(".csv"):
-                in_file = os.path.join(input_path, file)
-                out_file = os.path.join(output_path, file)
-                process_single_file(in_file, out_file)
-        return
-
-    # Single file case
-    process_single_file(input_path, output_path)
+        pairs = [
+            (os.path.join(input_path, file), os.path.join(output_path, file))
+            for file in sorted(os.listdir(input_path))
+            if file.endswith(".csv")
+        ]
+    else:
+        # Single file case
+        pairs = [(input_path, output_path)]
+
+    if not pairs:
+        return []
+    return _run_files(pairs, workers, dictionary_path, chunksize, on_result)
+
+
+def _process_frame_task(
+    df: pd.DataFrame,
+    compiled_dict=None,
+    memo: Optional[ClassificationMemo] = None,
+) -> Dict:
+    """Worker task of process_dataframes: code one transcript into a result dict."""
+    if compiled_dict is None:
+        compiled_dict, memo = _worker_dictionary, _worker_memo
+    hits, misses = memo.hits, memo.misses
+    result = {
+        "output": None,
+        "rows": 0,
+        "error": None,
+        "summary": None,
+        "labels": None,
+        "crosstabs": None,
+    }
+    try:
+        result["output"], result["labels"] = process_dataframe(
+            df, compiled_dict, memo=memo, with_labels=True
+        )
+        result["rows"] = len(result["output"])
+        # Counted here, while the frame is at hand, so reports never recount it
+        result["summary"] = FrequencyCounter.from_series(result["output"]["B5T"])
+        result["crosstabs"] = count_crosstabs(result["output"], result["labels"])
+    except Exception as e:
+        logging.error(f"Failed to process transcript: {str(e)}")
+        result["error"] = str(e)
+    result["memo_hits"] = memo.hits - hits
+    result["memo_misses"] = memo.misses - misses
+    return result
+
+
+# Process multiple in-memory transcripts
+def process_dataframes(
+    dfs: List[pd.DataFrame],
+    compiled_dict=None,
+    workers: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Code several in-memory transcripts, the DataFrame form of process_multi_files.
+
+    Args:
+        dfs: Transcripts, each with a 'text' column (case-insensitive)
+        compiled_dict: Dictionary to code with (dict or CompiledDictionary).
+            Defaults to the compiled user-defined dictionary.
+        workers: Number of worker processes. Defaults to one per CPU,
+            capped at the number of transcripts; 1 codes them in-process.
+
+    Returns:
+        One result dict per transcript, in input order, with keys output
+        (the coded DataFrame, None on failure), summary (its B5T
+        FrequencyCounter), labels (its LabelMatrix), crosstabs (see
+        count_crosstabs), rows, error (None on success), memo_hits and
+        memo_misses
+    """
+    if not dfs:
+        return []
+    if compiled_dict is None:
+        compiled_dict = load_dictionary()
+    compiled_dict = compile_dictionary(compiled_dict)
+    if workers is None:
+        workers = default_workers(len(dfs))
+    workers = min(workers, len(dfs))
+
+    if workers <= 1:
+        memo = ClassificationMemo()
+        results = [_process_frame_task(df, compiled_dict, memo) for df in dfs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(compiled_dict,)
+        ) as pool:
+            futures = [pool.submit(_process_frame_task, df) for df in dfs]
+            results = [future.result() for future in futures]
+
+    log_memo_stats(
+        sum(r["memo_hits"] for r in results), sum(r["memo_misses"] for r in results)
+    )
+    return results
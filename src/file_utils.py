@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+
+def atomic_write(path: str, data: bytes, fsync: bool = False):
+    """
+    Replace the file at path with data through a uniquely named temporary
+    file in the same folder.
+
+    Args:
+        path: File to write
+        data: Complete new content
+        fsync: Flush the data to disk before the rename
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def evict_least_recently_used(folder: str, max_bytes: int, suffix: str):
+    """
+    Delete the files ending in suffix with the oldest mtime until those
+    left in folder add up to at most max_bytes.
+
+    Readers mark a file as used by touching it.
+    """
+    entries = []
+    for name in os.listdir(folder):
+        if not name.endswith(suffix):
+            continue
+        try:
+            stat = os.stat(os.path.join(folder, name))
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
+        total -= size
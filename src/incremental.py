@@ -0,0 +1,149 @@
+from typing import Iterable, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from classifier import (
+    OUTPUT_COLUMNS,
+    _TOKEN_RE,
+    classify_series,
+    code_column,
+    compile_dictionary,
+    fold_series,
+)
+from label_matrix import LabelMatrix
+
+
+def dictionary_diff(old_dict, new_dict) -> Optional[Set[str]]:
+    """
+    Keywords whose matches can differ between two versions of a dictionary.
+
+    A keyword added to or removed from a label, or moved between labels,
+    only changes the coding of rows it occurs in. Rows without any of the
+    returned keywords code the same under both versions.
+
+    Args:
+        old_dict: Dictionary the stored output was coded with
+        new_dict: Dictionary to recode with
+
+    Returns:
+        The set of changed case-folded keywords, or None when the change
+        cannot be limited to rows containing them: labels kept by both
+        versions were reordered (which reorders matched labels in every
+        row), or a changed keyword starts with punctuation and so cannot
+        be looked up by word token.
+    """
+    old_dict, new_dict = compile_dictionary(old_dict), compile_dictionary(new_dict)
+    old_keywords, new_keywords = old_dict.keywords(), new_dict.keywords()
+
+    kept_old = [label for label in old_dict.labels if label in new_keywords]
+    kept_new = [label for label in new_dict.labels if label in old_keywords]
+    if kept_old != kept_new:
+        return None
+
+    changed = set()
+    for label in set(old_keywords) | set(new_keywords):
+        changed |= old_keywords.get(label, set()) ^ new_keywords.get(label, set())
+    if any(not _TOKEN_RE.match(kw) for kw in changed):
+        return None
+    return changed
+
+
+class TranscriptIndex:
+    """
+    Inverted index from word token to the rows of a transcript containing it.
+
+    Built once over a coded transcript's Text column and stored with it, so
+    that after a dictionary edit only the rows that can contain a changed
+    keyword are looked at again.
+    """
+
+    def __init__(self, texts: pd.Series):
+        codes, uniques = pd.factorize(fold_series(texts))
+        # Row -> distinct utterance, and token -> distinct utterances
+        self._codes = codes.astype(np.int32)
+        postings = {}
+        for unique, text in enumerate(uniques):
+            for token in set(_TOKEN_RE.findall(text)):
+                postings.setdefault(token, []).append(unique)
+        self._postings = {
+            token: np.array(uniques, dtype=np.int32)
+            for token, uniques in postings.items()
+        }
+
+    def __len__(self):
+        return len(self._codes)
+
+    def rows_containing(self, keywords: Iterable[str]) -> np.ndarray:
+        """
+        Positions of the rows that may contain any of the keywords.
+
+        Every word token of a whole-word keyword match is also a token of
+        the row, so a row is a candidate only if it has all of them.
+        """
+        candidates = []
+        for kw in keywords:
+            found = None
+            for token in set(_TOKEN_RE.findall(kw)):
+                posting = self._postings.get(token)
+                if posting is None:
+                    found = None
+                    break
+                found = posting if found is None else np.intersect1d(found, posting)
+            if found is not None and len(found):
+                candidates.append(found)
+        if not candidates:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(np.isin(self._codes, np.concatenate(candidates)))
+
+
+def recode(
+    coded_df: pd.DataFrame,
+    index: TranscriptIndex,
+    old_dict,
+    new_dict,
+    labels: Optional[LabelMatrix] = None,
+):
+    """
+    Bring a coded transcript up to date with a new dictionary version.
+
+    Only rows that contain a keyword changed between the two versions are
+    classified again; every other row keeps its stored codes.
+
+    Args:
+        coded_df: Output of process_dataframe made with old_dict
+        index: TranscriptIndex over coded_df's Text column
+        old_dict: Dictionary coded_df was coded with
+        new_dict: Dictionary to recode with
+        labels: LabelMatrix of coded_df's rows, updated the same way if given
+
+    Returns:
+        The recoded frame, or None if the change needs a full recode; with
+        labels, a (frame, LabelMatrix) tuple or None
+    """
+    changed = dictionary_diff(old_dict, new_dict)
+    if changed is None or len(index) != len(coded_df):
+        return None
+
+    if labels is not None and len(labels) != len(coded_df):
+        return None
+
+    recoded = coded_df.copy()
+    rows = index.rows_containing(changed)
+    if labels is None:
+        coded = classify_series(coded_df["Text"].iloc[rows], new_dict)
+    else:
+        coded, row_labels = classify_series(
+            coded_df["Text"].iloc[rows], new_dict, with_labels=True
+        )
+        labels = labels.replace_rows(rows, row_labels)
+    if len(rows):
+        # Rebuilt rather than set in place, as the new codes may not be
+        # categories of the stored columns yet
+        for name in OUTPUT_COLUMNS:
+            values = recoded[name].to_numpy(dtype=object, copy=True)
+            values[rows] = coded[name].to_numpy(dtype=object)
+            recoded[name] = code_column(values, recoded.index)
+    if labels is not None:
+        return recoded, labels
+    return recoded
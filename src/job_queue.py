@@ -0,0 +1,329 @@
+"""
+Background coding jobs for the Upload page.
+
+Jobs and their per-file progress live in a SQLite database. Each job's
+inputs, outputs and a copy of its dictionary live in a folder next to it.
+A job is run by a detached runner process (this module run as a script)
+that calls process_multi_files, so work carries on when the browser tab
+is closed or the app server restarts:
+
+    python src/job_queue.py run <queue folder> <job id>
+"""
+
+import logging
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import closing
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from dictionary_artifact import remove_artifacts
+from file_processor import process_multi_files
+
+# Job statuses; files use the same values
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# pid recorded while a runner is being launched
+_LAUNCHING = -1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    pid INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS job_files (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    PRIMARY KEY (job_id, position)
+);
+"""
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    if pid == _LAUNCHING:
+        return True
+    try:
+        # Reap a runner this process launched so it does not linger as a zombie
+        if os.waitpid(pid, os.WNOHANG)[0] == pid:
+            return False
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    SQLite-backed queue of background coding jobs, usable from several
+    sessions and processes at once.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = os.path.abspath(folder)
+        os.makedirs(self.folder, exist_ok=True)
+        self.db_path = os.path.join(self.folder, "jobs.sqlite3")
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _execute(self, sql: str, params=()) -> int:
+        with closing(self._connect()) as conn, conn:
+            return conn.execute(sql, params).rowcount
+
+    def _query(self, sql: str, params=()) -> List[Dict]:
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def job_folder(self, job_id: str) -> str:
+        return os.path.join(self.folder, job_id)
+
+    def _input_path(self, job_id: str, position: int) -> str:
+        return os.path.join(self.job_folder(job_id), "input", f"{position}.csv")
+
+    def output_path(self, job_id: str, position: int) -> str:
+        """Path of the coded CSV for one file of a job."""
+        return os.path.join(self.job_folder(job_id), "output", f"{position}.csv")
+
+    def _dictionary_path(self, job_id: str) -> str:
+        return os.path.join(self.job_folder(job_id), "dictionary.csv")
+
+    def submit(
+        self,
+        files: List[Tuple[str, pd.DataFrame]],
+        dictionary_path: str,
+        start: bool = True,
+    ) -> str:
+        """
+        Queue a job coding the given transcripts and start its runner.
+
+        The dictionary is copied into the job, so later dictionary saves
+        do not affect a queued or resumed job.
+
+        Args:
+            files: (file name, transcript DataFrame) pairs
+            dictionary_path: Dictionary CSV to code with
+            start: Launch a runner process right away
+
+        Returns:
+            The new job's id
+        """
+        job_id = uuid.uuid4().hex
+        job_folder = self.job_folder(job_id)
+        os.makedirs(os.path.join(job_folder, "input"))
+        os.makedirs(os.path.join(job_folder, "output"))
+        if os.path.exists(dictionary_path):
+            shutil.copyfile(dictionary_path, self._dictionary_path(job_id))
+        for position, (_, df) in enumerate(files):
+            df.to_csv(self._input_path(job_id, position), index=False)
+
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, created, updated) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, now, now),
+            )
+            conn.executemany(
+                "INSERT INTO job_files (job_id, position, name, status) VALUES (?, ?, ?, ?)",
+                [(job_id, position, name, QUEUED) for position, (name, _) in enumerate(files)],
+            )
+        if start:
+            self.start(job_id)
+        return job_id
+
+    def start(self, job_id: str) -> bool:
+        """
+        Launch a detached runner for a queued or interrupted job.
+
+        Returns:
+            False if the job is finished or another runner owns it
+        """
+        # Claim the job first so two sessions never launch two runners
+        rows = self._query("SELECT status, pid FROM jobs WHERE id = ?", (job_id,))
+        if not rows or rows[0]["status"] not in ACTIVE_STATUSES:
+            return False
+        pid = rows[0]["pid"]
+        if _pid_alive(pid):
+            return False
+        claimed = self._execute(
+            "UPDATE jobs SET pid = ? WHERE id = ? AND pid IS ?", (_LAUNCHING, job_id, pid)
+        )
+        if not claimed:
+            return False
+
+        try:
+            with open(os.path.join(self.job_folder(job_id), "runner.log"), "ab") as log:
+                process = subprocess.Popen(
+                    [sys.executable, os.path.abspath(__file__), "run", self.folder, job_id],
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    # Own session: the runner outlives the app server
+                    start_new_session=True,
+                )
+        except Exception:
+            # Release the claim, or the job would look launched forever
+            self._execute(
+                "UPDATE jobs SET pid = NULL WHERE id = ? AND pid = ?", (job_id, _LAUNCHING)
+            )
+            raise
+        self._execute("UPDATE jobs SET pid = ? WHERE id = ?", (process.pid, job_id))
+        return True
+
+    def resume(self) -> List[str]:
+        """Restart runners of unfinished jobs whose runner is gone."""
+        resumed = []
+        for job in self._query(
+            "SELECT id, pid FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+        ):
+            if not _pid_alive(job["pid"]) and self.start(job["id"]):
+                resumed.append(job["id"])
+        return resumed
+
+    def cancel(self, job_id: str):
+        """Cancel a job: files not started are skipped, running ones finish."""
+        now = time.time()
+        self._execute(
+            "UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status IN (?, ?)",
+            (CANCELLED, now, job_id, *ACTIVE_STATUSES),
+        )
+        # A file that is mid-way still records its result when it finishes
+        self._execute(
+            "UPDATE job_files SET status = ? WHERE job_id = ? AND status IN (?, ?)",
+            (CANCELLED, job_id, *ACTIVE_STATUSES),
+        )
+
+    def delete(self, job_id: str):
+        """Cancel a job and remove its record and files."""
+        self.cancel(job_id)
+        self._execute("DELETE FROM job_files WHERE job_id = ?", (job_id,))
+        self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        shutil.rmtree(self.job_folder(job_id), ignore_errors=True)
+        remove_artifacts(self._dictionary_path(job_id))
+
+    def jobs(self, limit: int = 20) -> List[Dict]:
+        """Most recent jobs first, each with done and total file counts."""
+        return self._query(
+            """
+            SELECT jobs.*,
+                   SUM(job_files.status IN (?, ?)) AS finished,
+                   COUNT(job_files.position) AS total
+            FROM jobs LEFT JOIN job_files ON job_files.job_id = jobs.id
+            GROUP BY jobs.id ORDER BY jobs.created DESC LIMIT ?
+            """,
+            (DONE, FAILED, limit),
+        )
+
+    def files(self, job_id: str) -> List[Dict]:
+        """Per-file progress of a job, in submission order."""
+        files = self._query(
+            "SELECT * FROM job_files WHERE job_id = ? ORDER BY position", (job_id,)
+        )
+        for f in files:
+            f["output_path"] = self.output_path(job_id, f["position"])
+        return files
+
+    def _is_cancelled(self, job_id: str) -> bool:
+        rows = self._query("SELECT status FROM jobs WHERE id = ?", (job_id,))
+        return not rows or rows[0]["status"] == CANCELLED
+
+    def run(self, job_id: str, workers: Optional[int] = None):
+        """
+        Code the unfinished files of a job. Called in the runner process.
+
+        Files already done are skipped, so an interrupted job picks up
+        where it stopped.
+        """
+        self._execute(
+            "UPDATE jobs SET status = ?, updated = ?, pid = ? WHERE id = ? AND status IN (?, ?)",
+            (RUNNING, time.time(), os.getpid(), job_id, *ACTIVE_STATUSES),
+        )
+        if self._is_cancelled(job_id):
+            return
+        positions = [
+            f["position"]
+            for f in self.files(job_id)
+            if f["status"] in ACTIVE_STATUSES
+        ]
+        self._execute(
+            "UPDATE job_files SET status = ? WHERE job_id = ? AND status = ?",
+            (RUNNING, job_id, QUEUED),
+        )
+
+        def record(index, result):
+            self._execute(
+                "UPDATE job_files SET status = ?, rows = ?, error = ? WHERE job_id = ? AND position = ?",
+                (
+                    FAILED if result["error"] else DONE,
+                    result["rows"],
+                    result["error"],
+                    job_id,
+                    positions[index],
+                ),
+            )
+            self._execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time(), job_id))
+            return not self._is_cancelled(job_id)
+
+        try:
+            if positions:
+                process_multi_files(
+                    [self._input_path(job_id, p) for p in positions],
+                    [self.output_path(job_id, p) for p in positions],
+                    workers=workers,
+                    dictionary_path=self._dictionary_path(job_id),
+                    on_result=record,
+                )
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {str(e)}")
+            self._execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                (FAILED, str(e), time.time(), job_id),
+            )
+            return
+
+        # Files that never started because the job was cancelled
+        self._execute(
+            "UPDATE job_files SET status = ? WHERE job_id = ? AND status IN (?, ?)",
+            (CANCELLED, job_id, *ACTIVE_STATUSES),
+        )
+        self._execute(
+            "UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?",
+            (DONE, time.time(), job_id, RUNNING),
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "run":
+        sys.exit(__doc__)
+    JobQueue(sys.argv[2]).run(sys.argv[3])
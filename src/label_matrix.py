@@ -0,0 +1,180 @@
+from typing import List, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class LabelMatrix:
+    """
+    Rows x labels boolean matrix of every label a transcript row matched,
+    not only those kept in the coded columns.
+
+    Stored in CSR form: row i matched labels[indices[indptr[i]:indptr[i + 1]]].
+    """
+
+    def __init__(self, labels: Sequence[str], indptr: np.ndarray, indices: np.ndarray):
+        self.labels = list(labels)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+
+    @classmethod
+    def from_codes(
+        cls, labels: Sequence[str], codes: np.ndarray, label_sets: List[Sequence[int]]
+    ) -> "LabelMatrix":
+        """
+        Build the matrix of a factorized column.
+
+        Args:
+            labels: Label names, in dictionary order
+            codes: Distinct utterance of each row; -1 for rows without text
+            label_sets: Positions in labels matched by each distinct utterance
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        # A trailing empty set is picked up by code -1
+        set_lengths = np.array([len(s) for s in label_sets] + [0], dtype=np.int64)
+        set_starts = np.cumsum(set_lengths) - set_lengths
+        flat = np.fromiter(
+            (i for s in label_sets for i in s), dtype=np.int32, count=int(set_lengths.sum())
+        )
+
+        row_lengths = set_lengths[codes]
+        indptr = np.concatenate([[0], np.cumsum(row_lengths)])
+        offsets = np.arange(indptr[-1]) - np.repeat(indptr[:-1], row_lengths)
+        indices = flat[np.repeat(set_starts[codes], row_lengths) + offsets]
+        return cls(labels, indptr, indices)
+
+    @classmethod
+    def concat(cls, matrices: Sequence["LabelMatrix"]) -> "LabelMatrix":
+        """
+        Stack the rows of several matrices over the same labels.
+
+        Raises:
+            ValueError: If the matrices have different labels
+        """
+        if not matrices:
+            raise ValueError("No label matrices to concatenate")
+        labels = matrices[0].labels
+        if any(m.labels != labels for m in matrices):
+            raise ValueError("Label matrices were built with different dictionaries")
+        ends = np.cumsum([0] + [m.indptr[-1] for m in matrices[:-1]])
+        indptr = np.concatenate(
+            [[0]] + [m.indptr[1:] + end for m, end in zip(matrices, ends)]
+        )
+        return cls(labels, indptr, np.concatenate([m.indices for m in matrices]))
+
+    def replace_rows(self, rows: np.ndarray, other: "LabelMatrix") -> "LabelMatrix":
+        """
+        Copy of the matrix with some rows replaced, over other's labels.
+
+        Args:
+            rows: Positions of the rows to replace, in ascending order
+            other: Matrix with the new contents of those rows, one row each
+
+        Raises:
+            ValueError: If a kept row matched a label other does not have
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(other) != len(rows):
+            raise ValueError("other must have one row per replaced row")
+        positions = {label: i for i, label in enumerate(other.labels)}
+        remap = np.array([positions.get(label, -1) for label in self.labels], dtype=np.int32)
+        combined = np.concatenate([remap[self.indices], other.indices])
+
+        lengths = self.row_lengths()
+        starts = self.indptr[:-1].copy()
+        lengths[rows] = other.row_lengths()
+        starts[rows] = other.indptr[:-1] + len(self.indices)
+
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        offsets = np.arange(indptr[-1]) - np.repeat(indptr[:-1], lengths)
+        indices = combined[np.repeat(starts, lengths) + offsets]
+        if (indices < 0).any():
+            raise ValueError("A kept row matched a label the new matrix does not have")
+        return LabelMatrix(other.labels, indptr, indices)
+
+    @property
+    def shape(self):
+        return len(self.indptr) - 1, len(self.labels)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def row_lengths(self) -> np.ndarray:
+        """Number of labels matched by each row."""
+        return np.diff(self.indptr)
+
+    def row_labels(self, row: int) -> List[str]:
+        """Labels matched by one row, in dictionary order."""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return [self.labels[i] for i in self.indices[start:end]]
+
+    def to_dense(self) -> np.ndarray:
+        """The matrix as a rows x labels bool array."""
+        dense = np.zeros(self.shape, dtype=bool)
+        rows = np.repeat(np.arange(len(self)), self.row_lengths())
+        dense[rows, self.indices] = True
+        return dense
+
+    def label_counts(self) -> pd.Series:
+        """Number of rows that matched each label."""
+        counts = np.bincount(self.indices, minlength=len(self.labels))
+        return pd.Series(counts, index=self.labels, name="count")
+
+    def cooccurrence(self) -> pd.DataFrame:
+        """
+        Labels x labels counts of rows that matched both labels.
+
+        The diagonal holds label_counts. Each row contributes one entry per
+        ordered pair of its labels, so the cost grows with the square of the
+        (small) number of labels per row, not with the number of labels.
+        """
+        width = len(self.labels)
+        lengths = self.row_lengths()
+        # Every entry is paired with each entry of its own row
+        entry_lengths = np.repeat(lengths, lengths)
+        entry_starts = np.repeat(self.indptr[:-1], lengths)
+        pair_starts = np.cumsum(entry_lengths) - entry_lengths
+        offsets = np.arange(entry_lengths.sum()) - np.repeat(pair_starts, entry_lengths)
+        left = np.repeat(self.indices, entry_lengths)
+        right = self.indices[np.repeat(entry_starts, entry_lengths) + offsets]
+
+        counts = np.bincount(
+            left.astype(np.int64) * width + right, minlength=width * width
+        ).reshape(width, width)
+        return pd.DataFrame(counts, index=self.labels, columns=self.labels)
+
+    def crosstab(self, codes: pd.Series) -> pd.DataFrame:
+        """
+        Counts of rows by a code column and matched label.
+
+        Args:
+            codes: One value per row, in row order, e.g. the B5T column.
+                Rows with a missing value are not counted.
+
+        Returns:
+            DataFrame with one row per distinct value of codes (sorted) and
+            one column per label
+        """
+        if len(codes) != len(self):
+            raise ValueError("codes must have one value per row of the matrix")
+        width = len(self.labels)
+        row_codes, values = pd.factorize(codes, sort=True)
+        entry_codes = np.repeat(row_codes, self.row_lengths())
+        kept = entry_codes >= 0
+        counts = np.bincount(
+            entry_codes[kept].astype(np.int64) * width + self.indices[kept],
+            minlength=len(values) * width,
+        ).reshape(len(values), width)
+        return pd.DataFrame(
+            counts,
+            index=pd.Index(np.asarray(values, dtype=object), name=codes.name),
+            columns=self.labels,
+        )
+
+
+def file_label_counts(matrices: Sequence[LabelMatrix], names: Sequence[str]) -> pd.DataFrame:
+    """Files x labels counts of rows that matched each label."""
+    counts = pd.DataFrame(
+        [m.label_counts() for m in matrices], index=list(names)
+    ).fillna(0)
+    return counts.astype(np.int64)
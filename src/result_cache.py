@@ -0,0 +1,234 @@
+import hashlib
+import logging
+import os
+import pickle
+from typing import Dict, Optional
+
+import pandas as pd
+
+from classifier import classify_series
+from dictionary_artifact import ARTIFACT_VERSION
+from file_utils import atomic_write, evict_least_recently_used
+from incremental import TranscriptIndex, recode
+from label_matrix import LabelMatrix
+from summary_report import CrosstabCounter, FrequencyCounter, count_crosstabs
+
+# Default upper bound on the total size of cached coded transcripts
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Bump whenever the coded output or the pickled TranscriptIndex and
+# FrequencyCounter change, so entries written by older code are never
+# loaded. Entries also pickle CompiledDictionary, so ARTIFACT_VERSION is
+# part of every key too.
+CACHE_VERSION = 1
+CACHE_FORMAT = f"{CACHE_VERSION}.{ARTIFACT_VERSION}"
+
+
+def content_hash(data: bytes) -> str:
+    """Return the SHA-256 hex digest of an uploaded file's bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of coded transcripts keyed by transcript and dictionary
+    hash, evicting the least recently used entries past max_bytes.
+
+    After a dictionary edit, get_coded recodes the transcript's latest
+    output incrementally instead of coding it again.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.folder = os.path.abspath(folder)
+        self.max_bytes = max_bytes
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def key(file_hash: str, dictionary_hash: str) -> str:
+        """Cache key of a transcript coded with a given dictionary."""
+        return hashlib.sha256(
+            f"{CACHE_FORMAT}:{file_hash}:{dictionary_hash}".encode()
+        ).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.folder, f"{key}.pkl")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return the cached coded DataFrame for key, or None on a miss."""
+        return self._read(self._path(key))
+
+    def _read(self, path: str):
+        try:
+            obj = pd.read_pickle(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Discarding unreadable cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        # Mark as recently used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return obj
+
+    def put(self, key: str, df: pd.DataFrame):
+        """Store a coded DataFrame, then evict old entries if over budget."""
+        self._write(self._path(key), df)
+        self.evict()
+
+    def _write(self, path: str, obj):
+        atomic_write(path, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _source_path(self, file_hash: str) -> str:
+        return os.path.join(self.folder, f"source-{file_hash}.v{CACHE_FORMAT}.pkl")
+
+    def _dictionary_path(self, dictionary_hash: str) -> str:
+        return os.path.join(self.folder, f"dictionary-{dictionary_hash}.v{CACHE_FORMAT}.pkl")
+
+    def _summary_path(self, key: str) -> str:
+        return os.path.join(self.folder, f"summary-{key}.pkl")
+
+    def _labels_path(self, key: str) -> str:
+        return os.path.join(self.folder, f"labels-{key}.pkl")
+
+    def _crosstabs_path(self, key: str) -> str:
+        return os.path.join(self.folder, f"crosstabs-{key}.pkl")
+
+    def get_summary(self, file_hash: str, compiled_dict) -> Optional[FrequencyCounter]:
+        """
+        B5T counts of a transcript's coded output for a dictionary.
+
+        Summaries are stored by put_coded; one missing from an older entry
+        is counted from the cached output once and stored.
+        """
+        key = self.key(file_hash, compiled_dict.content_hash)
+        summary = self._read(self._summary_path(key))
+        if summary is None:
+            df = self.get(key)
+            if df is None:
+                return None
+            summary = FrequencyCounter.from_series(df["B5T"])
+            self._write(self._summary_path(key), summary)
+        return summary
+
+    def get_labels(self, file_hash: str, compiled_dict) -> Optional[LabelMatrix]:
+        """
+        LabelMatrix of a transcript's coded output for a dictionary.
+
+        Matrices are stored by put_coded; one missing from an older entry is
+        built from the cached output's Text column once and stored.
+        """
+        key = self.key(file_hash, compiled_dict.content_hash)
+        labels = self._read(self._labels_path(key))
+        if labels is None:
+            df = self.get(key)
+            if df is None:
+                return None
+            labels = classify_series(df["Text"], compiled_dict, with_labels=True)[1]
+            self._write(self._labels_path(key), labels)
+        return labels
+
+    def get_crosstabs(self, file_hash: str, compiled_dict) -> Optional[Dict[str, CrosstabCounter]]:
+        """
+        Cross-tab counts (see count_crosstabs) of a transcript's coded
+        output for a dictionary, counted once and stored if missing.
+        """
+        key = self.key(file_hash, compiled_dict.content_hash)
+        crosstabs = self._read(self._crosstabs_path(key))
+        if crosstabs is None:
+            df = self.get(key)
+            if df is None:
+                return None
+            crosstabs = count_crosstabs(df, self.get_labels(file_hash, compiled_dict))
+            self._write(self._crosstabs_path(key), crosstabs)
+        return crosstabs
+
+    def get_coded(self, file_hash: str, compiled_dict) -> Optional[pd.DataFrame]:
+        """
+        Coded output of a transcript for a dictionary, or None on a miss.
+
+        If the transcript was last coded with another dictionary version,
+        that output and its LabelMatrix are recoded incrementally and stored
+        for this version.
+
+        Args:
+            file_hash: content_hash of the transcript's uploaded bytes
+            compiled_dict: CompiledDictionary with content_hash set
+        """
+        df = self.get(self.key(file_hash, compiled_dict.content_hash))
+        if df is not None:
+            return df
+
+        source = self._read(self._source_path(file_hash))
+        if source is None:
+            return None
+        old_dict = self._read(self._dictionary_path(source["dictionary_hash"]))
+        old_df = self.get(self.key(file_hash, source["dictionary_hash"]))
+        if old_dict is None or old_df is None:
+            return None
+        old_labels = self._read(self._labels_path(self.key(file_hash, source["dictionary_hash"])))
+        recoded = recode(old_df, source["index"], old_dict, compiled_dict, old_labels)
+        if recoded is None:
+            return None
+        df, labels = recoded if old_labels is not None else (recoded, None)
+        try:
+            self.put_coded(file_hash, compiled_dict, df, source["index"], labels=labels)
+        except OSError as e:
+            logging.warning(f"Could not cache recoded transcript {file_hash}: {e}")
+        return df
+
+    def put_coded(
+        self,
+        file_hash: str,
+        compiled_dict,
+        df: pd.DataFrame,
+        index: Optional[TranscriptIndex] = None,
+        summary: Optional[FrequencyCounter] = None,
+        labels: Optional[LabelMatrix] = None,
+        crosstabs: Optional[Dict[str, CrosstabCounter]] = None,
+    ):
+        """
+        Store the coded output of a transcript for a dictionary.
+
+        Args:
+            file_hash: content_hash of the transcript's uploaded bytes
+            compiled_dict: CompiledDictionary with content_hash set
+            df: Coded output, as returned by process_dataframe
+            index: TranscriptIndex over df's Text column, built if omitted
+            summary: B5T counts of df, counted if omitted
+            labels: LabelMatrix of df's rows; get_labels builds it on
+                first use if omitted
+            crosstabs: count_crosstabs of df and labels, counted if omitted
+        """
+        if index is None:
+            index = TranscriptIndex(df["Text"])
+        if summary is None:
+            summary = FrequencyCounter.from_series(df["B5T"])
+        key = self.key(file_hash, compiled_dict.content_hash)
+        self._write(self._summary_path(key), summary)
+        if labels is not None:
+            self._write(self._labels_path(key), labels)
+        if crosstabs is None:
+            crosstabs = count_crosstabs(df, labels)
+        self._write(self._crosstabs_path(key), crosstabs)
+        dictionary_path = self._dictionary_path(compiled_dict.content_hash)
+        if not os.path.exists(dictionary_path):
+            self._write(dictionary_path, compiled_dict)
+        self._write(
+            self._source_path(file_hash),
+            {"dictionary_hash": compiled_dict.content_hash, "index": index},
+        )
+        self.put(key, df)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        evict_least_recently_used(self.folder, self.max_bytes, ".pkl")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
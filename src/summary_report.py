@@ -1,20 +1,266 @@
+"""
+B5T frequency reports for coded transcripts.
+
+Counts are built by streaming only the B5T column of each coded CSV and
+can be merged, so corpus totals come from per-file counts without
+reading any rows again:
+
+    python src/summary_report.py coded/ -o Combined_B5T_frequency.csv --per-file-dir reports/ -j 8
+"""
+
+import argparse
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
 import pandas as pd
 
-# Read the classified CSV file, count B5T frequency, and output the report
+# Rows of the B5T column read at a time
+DEFAULT_CHUNKSIZE = 200_000
 
 
-def generate_summary_report(input_path, output_path):
-    df = pd.read_csv(input_path)
-    if "B5T" not in df.columns:
-        raise Exception("The 'B5T' column is missing in the CSV file")
+class FrequencyCounter:
+    """
+    Mergeable count of B5T codes.
+
+    Codes are kept as strings, the way they appear in a coded CSV, so
+    counts from DataFrames and from files add up. Missing codes are not
+    counted, as with value_counts.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+
+    @classmethod
+    def from_series(cls, codes: pd.Series) -> "FrequencyCounter":
+        """Count the codes of a B5T column."""
+        if not isinstance(codes.dtype, pd.CategoricalDtype):
+            codes = codes.dropna().astype(str)
+        # A categorical column is counted per category, unused ones as zero
+        counts = codes.value_counts()
+        return cls({str(code): int(n) for code, n in counts.items() if n})
+
+    def update(self, codes: pd.Series):
+        """Add the codes of another block of the same column."""
+        self.counts.update(FrequencyCounter.from_series(codes).counts)
+
+    def merge(self, other: "FrequencyCounter") -> "FrequencyCounter":
+        """Return the combined counts of two counters."""
+        return FrequencyCounter(self.counts + other.counts)
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    def __radd__(self, other):
+        # Lets sum() start from 0
+        return self if other == 0 else self.merge(other)
+
+    def __eq__(self, other):
+        return isinstance(other, FrequencyCounter) and self.counts == other.counts
+
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def to_frame(
+        self, count_column: str = "Frequency", by_frequency: bool = False
+    ) -> pd.DataFrame:
+        """
+        Frequency table with columns B5T and count_column.
+
+        Rows are sorted by code, or by descending frequency (ties by code)
+        when by_frequency is set.
+        """
+        if by_frequency:
+            items = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+        else:
+            items = sorted(self.counts.items())
+        return pd.DataFrame(items, columns=["B5T", count_column])
+
+
+class CrosstabCounter:
+    """
+    Mergeable count of rows by B5T code and a second column, the
+    counterpart of pd.crosstab that adds up across transcripts.
+
+    Rows with a missing value in either column are not counted. columns
+    keeps the order of the second column's values for to_frame, e.g. the
+    dictionary order of labels; values without one are sorted.
+    """
+
+    def __init__(self, counts=None, columns: Optional[List[str]] = None):
+        self.counts = Counter(counts or {})
+        self.columns = list(columns or [])
+
+    @classmethod
+    def from_series(cls, codes: pd.Series, other: pd.Series) -> "CrosstabCounter":
+        """Count the (code, value) pairs of two aligned columns."""
+        sizes = pd.DataFrame({"code": codes, "other": other}).groupby(
+            ["code", "other"], observed=True, sort=False
+        ).size()
+        return cls({(str(code), str(value)): int(n) for (code, value), n in sizes.items() if n})
+
+    @classmethod
+    def from_labels(cls, codes: pd.Series, labels) -> "CrosstabCounter":
+        """Count the rows of each code that matched each label of a LabelMatrix."""
+        table = labels.crosstab(codes)
+        counts = {
+            (str(code), label): int(n)
+            for code, row in zip(table.index, table.to_numpy())
+            for label, n in zip(table.columns, row)
+            if n
+        }
+        return cls(counts, labels.labels)
+
+    def merge(self, other: "CrosstabCounter") -> "CrosstabCounter":
+        """Return the combined counts of two counters."""
+        columns = self.columns + [c for c in other.columns if c not in self.columns]
+        return CrosstabCounter(self.counts + other.counts, columns)
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    def __radd__(self, other):
+        # Lets sum() start from 0
+        return self if other == 0 else self.merge(other)
+
+    def __eq__(self, other):
+        return isinstance(other, CrosstabCounter) and self.counts == other.counts
 
-    freq = df["B5T"].value_counts().reset_index()
-    freq.columns = ["B5T", "Frequency"]
-    freq.to_csv(output_path, index=False)
+    def to_frame(self, index_name: str = "B5T") -> pd.DataFrame:
+        """Table of counts with one row per code (sorted) and one column per value."""
+        values = {value for _, value in self.counts}
+        columns = self.columns + sorted(values - set(self.columns))
+        codes = sorted({code for code, _ in self.counts})
+        table = pd.DataFrame(0, index=pd.Index(codes, name=index_name), columns=columns)
+        for (code, value), n in self.counts.items():
+            table.at[code, value] = n
+        return table
+
+
+def combine(counters: Iterable[FrequencyCounter]) -> FrequencyCounter:
+    """Corpus totals of several per-file counters."""
+    return sum(counters, FrequencyCounter())
+
+
+def count_crosstabs(coded: pd.DataFrame, labels=None) -> Dict[str, CrosstabCounter]:
+    """
+    Cross-tab counts of a coded transcript: B5T by Subcategory1, and B5T
+    by every matched label when its LabelMatrix is given.
+    """
+    crosstabs = {"Subcategory1": CrosstabCounter.from_series(coded["B5T"], coded["Subcategory1"])}
+    if labels is not None:
+        crosstabs["Label"] = CrosstabCounter.from_labels(coded["B5T"], labels)
+    return crosstabs
+
+
+def count_csv(
+    input_path: str, column: str = "B5T", chunksize: int = DEFAULT_CHUNKSIZE
+) -> FrequencyCounter:
+    """
+    Count the codes of a coded CSV, reading only its B5T column in chunks.
+
+    Raises:
+        Exception: If the column is missing
+    """
+    header = pd.read_csv(input_path, nrows=0).columns
+    if column not in header:
+        raise Exception(f"The '{column}' column is missing in the CSV file")
+
+    counter = FrequencyCounter()
+    for chunk in pd.read_csv(
+        input_path, usecols=[column], dtype=str, chunksize=chunksize
+    ):
+        counter.update(chunk[column])
+    return counter
+
+
+# Read the classified CSV file, count B5T frequency, and output the report
+def generate_summary_report(input_path, output_path):
+    counter = count_csv(input_path)
+    counter.to_frame(by_frequency=True).to_csv(output_path, index=False)
     print(f"Frequency summary report saved to {output_path}")
+    return counter
+
+
+def _count_file(input_path: str) -> Dict:
+    """Result dict of one file for summarize_files."""
+    try:
+        return {"input_file": input_path, "counter": count_csv(input_path), "error": None}
+    except Exception as e:
+        logging.error(f"Failed to summarize {input_path}: {str(e)}")
+        return {"input_file": input_path, "counter": None, "error": str(e)}
+
+
+def summarize_files(
+    input_files: List[str], workers: Optional[int] = None
+) -> List[Dict]:
+    """
+    Count several coded CSVs in parallel.
+
+    Args:
+        input_files: Coded CSV files
+        workers: Number of worker processes. Defaults to one per CPU,
+            capped at the number of files; 1 counts in-process.
+
+    Returns:
+        One result dict per file, in input order, with keys input_file,
+        counter (FrequencyCounter, None on failure) and error
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(input_files)))
+    if workers == 1:
+        return [_count_file(path) for path in input_files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_count_file, input_files))
+
+
+def _csv_files(folder: str) -> List[str]:
+    return [
+        os.path.join(folder, name)
+        for name in sorted(os.listdir(folder))
+        if name.endswith(".csv")
+    ]
+
+
+def summarize_directory(folder: str, workers: Optional[int] = None) -> List[Dict]:
+    """Count every CSV in a folder, in name order; see summarize_files."""
+    return summarize_files(_csv_files(folder), workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python src/summary_report.py",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("inputs", nargs="+", help="Coded CSV files or folders of them")
+    parser.add_argument("-o", "--output", required=True, help="Corpus frequency CSV to write")
+    parser.add_argument(
+        "--per-file-dir", help="Also write B5T_frequency_<name> for each file here"
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes")
+    args = parser.parse_args(argv)
+
+    input_files = []
+    for item in args.inputs:
+        input_files.extend(_csv_files(item) if os.path.isdir(item) else [item])
+
+    results = summarize_files(input_files, args.jobs)
+    ok = [r for r in results if r["error"] is None]
+    if args.per_file_dir:
+        os.makedirs(args.per_file_dir, exist_ok=True)
+        for result in ok:
+            name = os.path.basename(result["input_file"])
+            result["counter"].to_frame(by_frequency=True).to_csv(
+                os.path.join(args.per_file_dir, f"B5T_frequency_{name}"), index=False
+            )
+    combine(r["counter"] for r in ok).to_frame().to_csv(args.output, index=False)
+    print(f"Summarized {len(ok)} of {len(results)} files into {args.output}")
+    return 0 if len(ok) == len(results) else 1
 
 
 if __name__ == "__main__":
-    input_path = "../data/output.csv"  # Assume the output file is in the data directory
-    output_path = "../data/summary_report.csv"
-    generate_summary_report(input_path, output_path)
+    raise SystemExit(main())
@@ -0,0 +1,99 @@
+"""
+Unit tests for the classification pipeline in the dispatcher.
+"""
+
+import pandas as pd
+import pytest
+
+from planb.controller import dispatcher
+from planb.pipeline.llm_adapter import OpenRouterClient
+
+
+class FakeClient(OpenRouterClient):
+    """OpenRouterClient answering from a table instead of the API."""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+        self.cache = None
+        self.model = "fake"
+
+    def classify_line(self, text, context):
+        self.calls.append((text, context))
+        answer = self.answers.get(text, {})
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeClient(
+        {
+            "refund please": {"code": "BILLING", "confidence": 0.9, "explanation": "money"},
+            "cancel it": RuntimeError("API unavailable"),
+            "bad answer": {"code": "X", "confidence": "high", "explanation": "?"},
+        }
+    )
+    monkeypatch.setattr(dispatcher, "AsyncOpenRouterClient", lambda: client)
+    return client
+
+
+def test_stages_preserve_per_row_results(fake_client):
+    """Test that every row gets the results of its own keyword, LLM and aggregate steps."""
+    transcript_df = pd.DataFrame(
+        {
+            "content": ["refund please", "cancel it", None, "bad answer", "hello"],
+            "speaker": ["customer", None, "agent", "agent", "agent"],
+        }
+    )
+    dict_df = pd.DataFrame(
+        {"keyword": ["refund", "cancel"], "code": ["REFUND", "CANCEL"]}
+    )
+
+    result = dispatcher.classify_dataframe(transcript_df, dict_df, threshold=0.5)
+
+    assert list(result["primary_code"]) == ["REFUND", "CANCEL", None, None, None]
+    assert list(result["primary_confidence"]) == [1.0, 1.0, 0.0, 0.0, 0.0]
+    assert list(result["secondary_code"]) == ["BILLING", None, None, None, None]
+    assert list(result["secondary_confidence"]) == [0.9, 0.0, 0.0, 0.0, 0.0]
+    assert list(result["explanation"]) == ["money", None, None, None, None]
+    assert result["primary_confidence"].dtype == float
+    # The caller's DataFrame is left untouched
+    assert "primary_code" not in transcript_df.columns
+
+    # Rows whose text cannot be matched never reach the LLM
+    assert [text for text, _ in fake_client.calls] == [
+        "refund please",
+        "cancel it",
+        "bad answer",
+        "hello",
+    ]
+    assert fake_client.calls[0][1] == {
+        "row_id": 0,
+        "transcript_row": 1,
+        "keywords_found": ["REFUND"],
+        "speaker": "customer",
+    }
+    assert "speaker" not in fake_client.calls[1][1]
+
+
+def test_repeated_lines_reach_the_llm_once(fake_client):
+    """Test that rows repeating the same line and context share one LLM request."""
+    transcript_df = pd.DataFrame(
+        {
+            "content": ["refund please", "hello", "refund please", "hello", "refund please"],
+            "speaker": ["customer", "agent", "customer", "customer", "customer"],
+        }
+    )
+    dict_df = pd.DataFrame({"keyword": ["refund"], "code": ["REFUND"]})
+
+    result = dispatcher.classify_dataframe(transcript_df, dict_df, threshold=0.5)
+
+    # Row numbers do not matter; a different speaker does
+    assert [(text, context.get("speaker")) for text, context in fake_client.calls] == [
+        ("refund please", "customer"),
+        ("hello", "agent"),
+        ("hello", "customer"),
+    ]
+    assert list(result["secondary_code"]) == ["BILLING", None, "BILLING", None, "BILLING"]
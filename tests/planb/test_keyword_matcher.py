@@ -2,10 +2,12 @@
 Unit tests for the keyword matcher functionality.
 """
 
+import re
+
 import pandas as pd
 import pytest
 
-from planb.pipeline.keyword_matcher import keyword_match
+from planb.pipeline.keyword_matcher import KeywordMatcher, keyword_match
 
 
 def test_basic_word_matching():
@@ -144,3 +146,49 @@ def test_no_matches():
 
     # Check results
     assert len(results) == 0
+
+
+def test_matcher_agrees_with_regex_per_keyword():
+    """Test that the compiled matcher finds what a regex per keyword finds."""
+    kw_df = pd.DataFrame(
+        {
+            "keyword": [
+                "cancel",
+                "Cancel my subscription",
+                "c++",
+                "-ve",
+                "refund?",
+                "cancel",
+                None,
+                "sub",
+            ],
+            "code": ["A", "B", "C", "D", "E", "F", "G", "H"],
+        }
+    )
+    matcher = KeywordMatcher(kw_df)
+    texts = [
+        "I want to CANCEL my subscription",
+        "cancel-my subscription, refund? c++ -ve",
+        "a c++ coder said -ve",
+        "subscription cancelled",
+        "",
+    ]
+    keywords = kw_df.dropna()
+    for text in texts:
+        expected = [
+            (code, 1.0)
+            for keyword, code in zip(keywords["keyword"], keywords["code"])
+            if re.search(r"\b" + re.escape(keyword.lower()) + r"\b", text.lower())
+        ]
+        assert matcher.match(text) == expected
+    # Keywords without a value are skipped
+    assert len(matcher) == 7
+
+
+def test_matcher_uses_given_columns():
+    """Test that a matcher can read inferred dictionary columns directly."""
+    dict_df = pd.DataFrame({"term": ["cancel"], "classification_code": ["CANCEL"]})
+    matcher = KeywordMatcher(dict_df, "term", "classification_code")
+    assert matcher.match("Please cancel it") == [("CANCEL", 1.0)]
+    with pytest.raises(ValueError, match="must contain 'keyword' and 'code' columns"):
+        KeywordMatcher(dict_df)
@@ -0,0 +1,289 @@
+"""
+Unit tests for the LLM clients, against a local OpenAI-compatible stand-in server.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from planb.pipeline.llm_adapter import (
+    ANSWER_TOKENS_PER_LINE,
+    BATCH_SYSTEM_MESSAGE,
+    AsyncOpenRouterClient,
+    LLMResponseCache,
+    OfflineCacheMiss,
+    OpenRouterClient,
+    estimate_tokens,
+    next_batch_end,
+)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers chat completions with the classified text echoed back as the code."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        if prompt.startswith("Classify each of these items:"):
+            self.answer_batch(body, json.loads(prompt.split("\n\n", 1)[1]))
+            return
+        text = prompt.rsplit("\n", 1)[-1]
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests.append(text)
+            attempt = server.requests.count(text)
+        try:
+            time.sleep(1.0 if text == "slow" else 0.05)
+            if text == "down" or (text == "flaky" and attempt == 1):
+                self.reply(500, {"error": {"message": "unavailable"}})
+                return
+            content = json.dumps(
+                {"code": text.upper(), "confidence": 0.8, "explanation": "stand-in"}
+            )
+            self.reply(200, completion(body, content))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def answer_batch(self, body, items):
+        """Answer a batch in reverse order; "skip" gets no item, "bad" an incomplete one
+        and "cutoff" cuts the whole reply short."""
+        texts = [item["text"] for item in items]
+        with self.server.lock:
+            self.server.batches.append(texts)
+        results = []
+        for item in reversed(items):
+            if item["text"] == "skip":
+                continue
+            result = {"id": item["id"], "code": item["text"].upper(), "explanation": "batch"}
+            if item["text"] != "bad":
+                result["confidence"] = 0.7
+            results.append(result)
+        content = json.dumps({"results": results})
+        if "cutoff" in texts:
+            content = content[: len(content) // 2]
+        self.reply(200, completion(body, content))
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def completion(body, content):
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": body["model"],
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+    }
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = 0
+    server.requests = []
+    server.batches = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def test_async_client_keeps_row_order_within_concurrency(server):
+    """Test that results come back in input order with bounded concurrency."""
+    client = AsyncOpenRouterClient(api_key="test", base_url=base_url(server), concurrency=4)
+    texts = [f"line{i}" for i in range(20)]
+
+    results = client.classify_lines(texts, [{"row_id": i} for i in range(20)])
+
+    assert [r["code"] for r in results] == [t.upper() for t in texts]
+    assert 1 < server.max_in_flight <= 4
+
+
+def test_async_client_retries_and_reports_failures_in_place(server):
+    """Test that failed lines are retried and then returned as exceptions."""
+    client = AsyncOpenRouterClient(
+        api_key="test", base_url=base_url(server), concurrency=2, timeout=0.5
+    )
+
+    results = client.classify_lines(["flaky", "down", "slow", "fine"], [{}] * 4)
+
+    assert results[0]["code"] == "FLAKY"
+    assert isinstance(results[1], Exception)
+    # The slow line times out on every attempt
+    assert isinstance(results[2], Exception)
+    assert results[3]["code"] == "FINE"
+    assert server.requests.count("flaky") == 2
+    assert server.requests.count("down") == 3
+
+
+def test_sync_client_uses_configured_base_url(server, monkeypatch):
+    """Test that the base URL can come from the environment."""
+    monkeypatch.setenv("OPENROUTER_API_KEY", "test")
+    monkeypatch.setenv("OPENROUTER_BASE_URL", base_url(server))
+
+    result = OpenRouterClient().classify_line("hello", {"row_id": 0})
+
+    assert result == {"code": "HELLO", "confidence": 0.8, "explanation": "stand-in"}
+
+
+def test_cache_replays_without_network(server, tmp_path):
+    """Test that cached lines make no requests, also in offline replay."""
+    path = str(tmp_path / "llm_cache.sqlite")
+    cache = LLMResponseCache(path)
+    client = AsyncOpenRouterClient(api_key="test", base_url=base_url(server), cache=cache)
+    texts = ["one", "two", "one"]
+    contexts = [{"row_id": 0}, {"row_id": 1}, {"row_id": 2}]
+
+    first = client.classify_lines(texts, contexts)
+    # Identical lines are requested once, even when sent concurrently and
+    # from different rows
+    assert sorted(server.requests) == ["one", "two"]
+    assert first[2] == first[0]
+    requests = len(server.requests)
+    assert OpenRouterClient(
+        api_key="test", base_url=base_url(server), cache=cache
+    ).classify_line("two", {"row_id": 7, "transcript_row": 8}) == first[1]
+    assert len(server.requests) == requests
+
+    offline = LLMResponseCache(path, offline=True)
+    replay = AsyncOpenRouterClient(base_url=base_url(server), cache=offline)
+    results = replay.classify_lines(texts + ["three"], contexts + [{"row_id": 3}])
+    assert results[:3] == first
+    assert isinstance(results[3], OfflineCacheMiss)
+    assert len(server.requests) == requests
+    # One lookup per distinct line
+    assert (offline.hits, offline.misses) == (2, 1)
+    assert len(offline) == 2
+
+
+def test_cache_eviction(tmp_path):
+    """Test TTL expiry and least-recently-used size eviction."""
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    for name in ["a", "b", "c"]:
+        cache.put(name, {"code": name})
+        time.sleep(0.01)
+    cache.get("a")
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == {"code": "a"}
+
+    cache.ttl_seconds = 0.0
+    assert cache.get("c") is None
+    assert cache.evict() == 2
+    assert cache.stats()["size"] == 0
+    # Requests differing in any part of the prompt use different entries
+    messages = [{"content": "system"}, {"content": "user"}]
+    assert LLMResponseCache.key("m", messages, 0.2) != LLMResponseCache.key("m", messages, 0.3)
+
+
+def test_batch_mode_falls_back_only_for_failed_items(server, tmp_path):
+    """Test that batched answers align with the lines and only invalid ones are retried alone."""
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite"))
+    client = OpenRouterClient(
+        api_key="test", base_url=base_url(server), cache=cache, batch_lines=8
+    )
+    texts = ["alpha", "skip", "bad", "beta", "gamma"]
+    contexts = [{"row_id": i} for i in range(5)]
+
+    results = client.classify_lines(texts, contexts)
+
+    assert [r["code"] for r in results] == [t.upper() for t in texts]
+    assert results[0] == {"code": "ALPHA", "confidence": 0.7, "explanation": "batch"}
+    assert results[1]["explanation"] == "stand-in"
+    assert server.batches == [texts]
+    assert server.requests == ["skip", "bad"]
+
+    assert (cache.hits, cache.misses) == (0, 5)
+
+    # Answers are cached per line, batched or not
+    assert client.classify_lines(texts, contexts) == results
+    assert len(server.batches) == 1
+    assert server.requests == ["skip", "bad"]
+    assert (cache.hits, cache.misses) == (5, 5)
+
+    # Offline, each line is still one lookup
+    offline = LLMResponseCache(str(tmp_path / "cache.sqlite"), offline=True)
+    replay = OpenRouterClient(base_url=base_url(server), cache=offline, batch_lines=8)
+    replayed = replay.classify_lines(texts + ["unseen"], contexts + [{"row_id": 5}])
+    assert replayed[:5] == results
+    assert isinstance(replayed[5], OfflineCacheMiss)
+    assert (offline.hits, offline.misses) == (5, 1)
+    assert len(server.batches) == 1
+
+
+def test_batch_size_adapts_to_token_budget():
+    """Test that batches stop at the line limit or the token budget, but hold at least one line."""
+    tokens = [40] * 10
+    assert next_batch_end(tokens, 0, 4, 10**6) == 4
+    assert next_batch_end(tokens, 8, 4, 10**6) == 10
+    # System prompt plus three lines of prompt and answer
+    budget = estimate_tokens(BATCH_SYSTEM_MESSAGE) + 3 * (40 + ANSWER_TOKENS_PER_LINE)
+    assert next_batch_end(tokens, 0, 10, budget) == 3
+    assert next_batch_end([10**6], 0, 10, 100) == 1
+    assert estimate_tokens("x" * 40) == 11
+
+
+def test_async_batch_mode_shrinks_after_cut_off_reply(server):
+    """Test that a reply with no usable item halves the batch size and its lines go one by one."""
+    client = AsyncOpenRouterClient(
+        api_key="test", base_url=base_url(server), concurrency=1, batch_lines=4
+    )
+    texts = ["one", "cutoff", "two", "three", "four", "five", "six", "seven"]
+
+    results = client.classify_lines(texts, [{}] * 8)
+
+    assert [r["code"] for r in results] == [t.upper() for t in texts]
+    # The lines after the cut-off batch go out in halved batches in the same run
+    assert list(map(len, server.batches)) == [4, 2, 2]
+    assert sorted(server.requests) == ["cutoff", "one", "three", "two"]
+    assert client.batch_lines == 2
+
+
+def test_cache_hits_defer_access_writes(tmp_path):
+    """Test that hits only read the file until their access times are flushed."""
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMResponseCache(path)
+    cache.put("a", {"code": "a"})
+
+    def accessed():
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT accessed FROM responses").fetchone()[0]
+
+    stored = accessed()
+    time.sleep(0.01)
+    assert cache.get("a") == {"code": "a"}
+    assert cache.get("a") == {"code": "a"}
+    assert accessed() == stored
+    cache.flush()
+    assert accessed() > stored
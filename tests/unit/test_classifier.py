@@ -0,0 +1,205 @@
+import os
+import re
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+from classifier import (
+    B5TDictionary,
+    ClassificationMemo,
+    CompiledDictionary,
+    classify_series,
+    compile_dictionary,
+    find_b5t_labels,
+    find_tl_subcategory,
+    parse_dictionary,
+)
+
+
+def regex_labels(b5t_dict, text):
+    """Reference implementation: one regex search per keyword."""
+    matched = []
+    for label, keywords_str in b5t_dict.items():
+        keywords = [kw.strip() for kw in keywords_str.split(",") if kw.strip()]
+        for kw in keywords:
+            if re.search(r"\b" + re.escape(kw) + r"\b", text, re.IGNORECASE):
+                matched.append(label)
+                break
+    return matched
+
+
+class TestCompiledDictionary(unittest.TestCase):
+    def setUp(self):
+        self.b5t_dict = {
+            "ASP": "allocating, assign",
+            "ORD": "down all masts,come to",
+            "WL": "watch leader, sir",
+            "SA": "identified,tma2,s9",
+            "Q": "?,what?,-ve",
+            "Empty": " , ",
+        }
+        self.texts = [
+            "Allocating you S1",
+            "Down all masts",
+            "S9 has been identified",
+            "solution is lagging TMA2",
+            "Aye sir, come to periscope depth",
+            "Watch Leader here, what? -ve contact",
+            "downallmasts reassigned",
+            "",
+            "?",
+        ]
+
+    def test_matches_regex_reference(self):
+        """Compiled matching returns the same labels as the per-keyword regex scan."""
+        compiled = compile_dictionary(self.b5t_dict)
+        for text in self.texts:
+            self.assertEqual(
+                compiled.match(text), regex_labels(self.b5t_dict, text), text
+            )
+
+    def test_find_b5t_labels_accepts_plain_and_compiled(self):
+        """find_b5t_labels gives identical results for both dictionary forms."""
+        compiled = compile_dictionary(self.b5t_dict)
+        for text in self.texts:
+            expected = find_tl_subcategory(regex_labels(self.b5t_dict, text))
+            self.assertEqual(find_b5t_labels(self.b5t_dict, text), expected)
+            self.assertEqual(find_b5t_labels(compiled, text), expected)
+
+    def test_whole_word_boundaries(self):
+        """Keywords only match on word boundaries, including overlapping ones."""
+        compiled = CompiledDictionary({"A": "can", "B": "cancel", "C": "cel"})
+        self.assertEqual(compiled.match("cancel"), ["B"])
+        self.assertEqual(compiled.match("can cancel"), ["A", "B"])
+        self.assertEqual(compiled.match("cancellation"), [])
+
+    def test_empty_dictionary(self):
+        """An empty dictionary classifies everything as 99."""
+        self.assertEqual(find_b5t_labels({}, "Down all masts"), ("99", "", ""))
+
+    def test_non_ascii_case_folding_matches_regex(self):
+        """Non-ASCII keywords and text fold the way re.IGNORECASE does."""
+        cases = [
+            ("οδοσ", "ΟΔΟΣ"),
+            ("istanbul", "İSTANBUL"),
+            ("ıi", "II"),
+            ("sir", "ſIR"),
+            ("kilo", "\u212aILO"),
+            ("café", "CAFÉ’S"),
+        ]
+        for keyword, text in cases:
+            b5t_dict = {"A": keyword, "B": "ok"}
+            compiled = compile_dictionary(b5t_dict)
+            for row in [text, text + " ok", "ok " + text.lower()]:
+                self.assertEqual(compiled.match(row), regex_labels(b5t_dict, row), row)
+            self.assertEqual(compiled.match(text), ["A"])
+            result = classify_series(pd.Series([text, "OK"]), compiled)
+            self.assertEqual(list(result["B5T"]), ["A", "B"])
+
+    def test_non_ascii_text_uses_index(self):
+        """Typographic punctuation and accents do not force a regex per keyword."""
+        compiled = compile_dictionary(self.b5t_dict)
+        compiled.patterns = None
+        self.assertEqual(compiled.match("Aye sir, “come to” José’s depth"), ["ORD", "WL"])
+
+    def test_compile_is_idempotent(self):
+        compiled = compile_dictionary(self.b5t_dict)
+        self.assertIs(compile_dictionary(compiled), compiled)
+
+
+class TestTokenIndex(unittest.TestCase):
+    def test_index_keyed_by_first_token(self):
+        """Keywords are indexed under their first case-folded word token."""
+        b5t_dict = B5TDictionary(
+            {"ORD": "Down all masts, down", "SA": "S9,tma2", "Q": "?, -ve"}
+        )
+
+        self.assertEqual(b5t_dict.token_index["down"], [("ORD", "down all masts"), ("ORD", "down")])
+        self.assertEqual(b5t_dict.token_index["s9"], [("SA", "s9")])
+        self.assertEqual(b5t_dict.untokenized, [("Q", "?"), ("Q", "-ve")])
+
+    def test_index_follows_changes_to_the_mapping(self):
+        """Compiling after a change uses the current entries, not a stale index."""
+        b5t_dict = parse_dictionary(["A,foo", "B,bar", "C,qux"])
+        b5t_dict["A"] = "baz"
+        self.assertEqual(compile_dictionary(b5t_dict).match("foo baz"), ["A"])
+
+        b5t_dict.pop("B")
+        self.assertEqual(compile_dictionary(b5t_dict).match("bar baz"), ["A"])
+
+        del b5t_dict["C"]
+        b5t_dict.update(D="qux")
+        b5t_dict.setdefault("E", "quux")
+        self.assertEqual(compile_dictionary(b5t_dict).match("qux quux"), ["D", "E"])
+        self.assertEqual(b5t_dict.token_index["quux"], [("E", "quux")])
+
+        b5t_dict.clear()
+        self.assertEqual(compile_dictionary(b5t_dict).match("baz"), [])
+
+    def test_parse_dictionary_builds_index(self):
+        b5t_dict = parse_dictionary(["b5t,keywords", "ASP,allocating"])
+        self.assertIsInstance(b5t_dict, B5TDictionary)
+        self.assertEqual(b5t_dict.token_index["allocating"], [("ASP", "allocating")])
+        self.assertEqual(find_b5t_labels(b5t_dict, "Allocating S1"), ("TL", "ASP", ""))
+
+
+class TestClassifySeries(unittest.TestCase):
+    def test_matches_row_by_row_classification(self):
+        """classify_series agrees with find_b5t_labels for every row."""
+        b5t_dict = {"ASP": "allocating", "WL": "sir", "SA": "identified,s9"}
+        texts = pd.Series(
+            ["Allocating you S1", "Aye sir", "aye SIR", None, "S9 identified", "Aye sir"],
+            index=[10, 11, 12, 13, 14, 15],
+        )
+        result = classify_series(texts, compile_dictionary(b5t_dict))
+
+        self.assertEqual(list(result.columns), ["B5T", "Subcategory1", "Subcategory2"])
+        self.assertEqual(list(result.index), list(texts.index))
+        for idx, text in texts.items():
+            expected = find_b5t_labels(b5t_dict, text) if text else ("99", "", "")
+            self.assertEqual(tuple(result.loc[idx]), expected)
+
+    def test_empty_series(self):
+        result = classify_series(pd.Series([], dtype=object), {})
+        self.assertTrue(result.empty)
+
+
+class TestClassificationMemo(unittest.TestCase):
+    def setUp(self):
+        self.compiled = compile_dictionary({"WL": "sir", "ORD": "down all masts"})
+
+    def test_repeats_are_counted_as_hits(self):
+        """Repeated utterances, across calls, are only matched once."""
+        memo = ClassificationMemo()
+        first = classify_series(pd.Series(["Aye sir", "aye SIR", "Roger"]), self.compiled, memo)
+        second = classify_series(pd.Series(["  Aye sir ", "Down all masts"]), self.compiled, memo)
+
+        self.assertEqual(list(first["B5T"]), ["WL", "WL", "99"])
+        self.assertEqual(list(second["B5T"]), ["WL", "TL"])
+        self.assertEqual(memo.stats()["misses"], 3)
+        self.assertEqual(memo.stats()["hits"], 2)
+
+    def test_lru_eviction(self):
+        memo = ClassificationMemo(maxsize=2)
+        memo.put("a", ("99", "", ""))
+        memo.put("b", ("99", "", ""))
+        memo.get("a")
+        memo.put("c", ("99", "", ""))
+
+        self.assertEqual(len(memo), 2)
+        self.assertIsNotNone(memo.get("a"))
+        self.assertIsNone(memo.get("b"))
+
+    def test_new_dictionary_clears_memo(self):
+        memo = ClassificationMemo()
+        classify_series(pd.Series(["Aye sir"]), self.compiled, memo)
+        other = compile_dictionary({"ACK": "aye"})
+        result = classify_series(pd.Series(["Aye sir"]), other, memo)
+
+        self.assertEqual(list(result["B5T"]), ["ACK"])
+
+
+if __name__ == "__main__":
+    unittest.main()
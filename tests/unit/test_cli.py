@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+import dictionary_artifact
+from cli import expand_inputs, main
+
+SAMPLE_FILES = os.path.abspath(os.path.join(os.path.dirname(__file__), "../sample_files"))
+
+
+@pytest.fixture(autouse=True)
+def cache_folder(tmp_path, monkeypatch):
+    folder = tmp_path / "cache"
+    monkeypatch.setattr(dictionary_artifact, "CACHE_FOLDER", str(folder))
+    return folder
+
+
+def test_expand_inputs_files_folders_and_globs():
+    batch = os.path.join(SAMPLE_FILES, "batch")
+    single = os.path.join(SAMPLE_FILES, "test.csv")
+
+    files = expand_inputs([batch, os.path.join(batch, "*.csv"), single])
+
+    assert files == [
+        os.path.join(batch, "test_1.csv"),
+        os.path.join(batch, "test_2.csv"),
+        single,
+    ]
+
+
+def test_expand_inputs_missing():
+    with pytest.raises(FileNotFoundError):
+        expand_inputs([os.path.join(SAMPLE_FILES, "nope_*.csv")])
+
+
+def test_main_codes_files_and_writes_summaries(tmp_path):
+    dictionary = tmp_path / "dictionary.csv"
+    dictionary.write_text("b5t,keywords\nASP,allocating\nSA,identified\n")
+    out_dir = tmp_path / "coded"
+
+    exit_code = main(
+        [
+            os.path.join(SAMPLE_FILES, "batch"),
+            "-o", str(out_dir),
+            "-d", str(dictionary),
+            "--jobs", "2",
+            "--summary",
+        ]
+    )
+
+    assert exit_code == 0
+    total = 0
+    for name in ["test_1.csv", "test_2.csv"]:
+        coded = pd.read_csv(out_dir / name)
+        assert list(coded.columns) == ["Text", "B5T", "Subcategory1", "Subcategory2"]
+        summary = pd.read_csv(out_dir / f"B5T_frequency_{name}")
+        assert summary["Frequency"].sum() == len(coded)
+        total += len(coded)
+    combined = pd.read_csv(out_dir / "Combined_B5T_frequency.csv")
+    assert combined["Frequency"].sum() == total
+
+
+def test_main_rejects_duplicate_names(tmp_path):
+    single = os.path.join(SAMPLE_FILES, "test.csv")
+    other = tmp_path / "test.csv"
+    other.write_text("text\nhello\n")
+
+    assert main([single, str(other), "-o", str(tmp_path / "out")]) == 2
@@ -0,0 +1,120 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+import dictionary_artifact
+from classifier import find_b5t_labels
+from dictionary_artifact import artifact_path, dictionary_hash, load_compiled_dictionary
+
+
+@pytest.fixture(autouse=True)
+def cache_folder(tmp_path, monkeypatch):
+    folder = tmp_path / "cache"
+    monkeypatch.setattr(dictionary_artifact, "CACHE_FOLDER", str(folder))
+    return folder
+
+
+def write_dictionary(folder, content):
+    path = folder / "dictionary.csv"
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_artifact_written_and_reused(tmp_path):
+    dict_path = write_dictionary(tmp_path, "b5t,keywords\nASP,allocating\nWL,sir\n")
+    content_hash = dictionary_hash(open(dict_path, "rb").read())
+
+    compiled = load_compiled_dictionary(dict_path)
+    assert compiled.content_hash == content_hash
+    assert os.path.exists(artifact_path(dict_path, content_hash))
+
+    # A fresh process state loads the artifact instead of reparsing the CSV
+    dictionary_artifact._loaded.clear()
+    reloaded = load_compiled_dictionary(dict_path)
+    assert reloaded is not compiled
+    assert reloaded.labels == compiled.labels
+    assert find_b5t_labels(reloaded, "Allocating, sir") == ("WL", "ASP", "")
+
+
+def test_changed_dictionary_replaces_artifact(tmp_path):
+    dict_path = write_dictionary(tmp_path, "b5t,keywords\nASP,allocating\n")
+    old = load_compiled_dictionary(dict_path)
+
+    write_dictionary(tmp_path, "b5t,keywords\nORD,down all masts\n")
+    new = load_compiled_dictionary(dict_path)
+
+    assert new.content_hash != old.content_hash
+    assert find_b5t_labels(new, "Down all masts") == ("TL", "ORD", "")
+    artifacts = [f for f in os.listdir(tmp_path / "cache") if f.endswith(".b5t")]
+    assert artifacts == [os.path.basename(artifact_path(dict_path, new.content_hash))]
+
+
+def test_artifacts_stay_out_of_unmanaged_folders(tmp_path, monkeypatch, cache_folder):
+    dict_path = write_dictionary(tmp_path, "b5t,keywords\nASP,allocating\n")
+    load_compiled_dictionary(dict_path)
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".b5t")]
+    assert len(os.listdir(cache_folder)) == 1
+
+    # Dictionaries in the managed store keep theirs alongside
+    managed = tmp_path / "managed"
+    managed.mkdir()
+    monkeypatch.setattr(dictionary_artifact, "MANAGED_FOLDER", str(managed))
+    managed_path = write_dictionary(managed, "b5t,keywords\nWL,sir\n")
+    compiled = load_compiled_dictionary(managed_path)
+    assert os.path.dirname(artifact_path(managed_path, compiled.content_hash)) == str(managed)
+    assert os.path.exists(artifact_path(managed_path, compiled.content_hash))
+
+
+def test_cache_folder_is_bounded(tmp_path, monkeypatch, cache_folder):
+    paths = []
+    for i in range(4):
+        folder = tmp_path / f"d{i}"
+        folder.mkdir()
+        paths.append(write_dictionary(folder, f"b5t,keywords\nWL,keyword{i}\n"))
+
+    artifacts = []
+    for i, path in enumerate(paths):
+        compiled = load_compiled_dictionary(path)
+        artifacts.append(artifact_path(path, compiled.content_hash))
+        os.utime(artifacts[-1], (i, i))
+        if i == 0:
+            # Room for two artifacts
+            size = os.path.getsize(artifacts[0])
+            monkeypatch.setattr(dictionary_artifact, "CACHE_MAX_BYTES", 2 * size + 16)
+
+    # The least recently used artifacts were evicted
+    assert sorted(os.listdir(cache_folder)) == sorted(os.path.basename(a) for a in artifacts[2:])
+
+
+def test_corrupt_artifact_is_rebuilt(tmp_path):
+    dict_path = write_dictionary(tmp_path, "b5t,keywords\nASP,allocating\n")
+    compiled = load_compiled_dictionary(dict_path)
+    with open(artifact_path(dict_path, compiled.content_hash), "wb") as f:
+        f.write(b"garbage")
+
+    dictionary_artifact._loaded.clear()
+    rebuilt = load_compiled_dictionary(dict_path)
+    assert rebuilt.labels == ["b5t", "ASP"]
+
+
+def test_corrupt_payload_is_rebuilt(tmp_path):
+    dict_path = write_dictionary(tmp_path, "b5t,keywords\nASP,allocating\n")
+    compiled = load_compiled_dictionary(dict_path)
+    path = artifact_path(dict_path, compiled.content_hash)
+    data = bytearray(open(path, "rb").read())
+    data[-2] ^= 0xFF
+    with open(path, "wb") as f:
+        f.write(bytes(data))
+
+    with pytest.raises(ValueError, match="payload is corrupt"):
+        dictionary_artifact._read_artifact(path, compiled.content_hash)
+    dictionary_artifact._loaded.clear()
+    assert load_compiled_dictionary(dict_path).labels == ["b5t", "ASP"]
+
+
+def test_missing_dictionary_is_empty(tmp_path):
+    compiled = load_compiled_dictionary(str(tmp_path / "missing.csv"))
+    assert compiled.labels == []
+    assert find_b5t_labels(compiled, "anything") == ("99", "", "")
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+import dictionary_artifact
+from classifier import find_b5t_labels
+from dictionary_provider import DictionaryProvider
+
+
+@pytest.fixture(autouse=True)
+def cache_folder(tmp_path, monkeypatch):
+    folder = tmp_path / "cache"
+    monkeypatch.setattr(dictionary_artifact, "CACHE_FOLDER", str(folder))
+    return folder
+
+
+def write_dictionary(path, content):
+    path.write_text(content, encoding="utf-8")
+
+
+def test_shared_until_file_changes(tmp_path):
+    dict_path = tmp_path / "dictionary.csv"
+    write_dictionary(dict_path, "b5t,keywords\nWL,sir\n")
+    provider = DictionaryProvider(str(dict_path))
+
+    first = provider.get()
+    assert provider.get() is first
+    assert find_b5t_labels(first, "Aye sir") == ("WL", "", "")
+
+    write_dictionary(dict_path, "b5t,keywords\nACK,aye\nWL,sir\n")
+    # The old dictionary keeps serving while the new one compiles
+    stale = provider.get()
+    provider.wait()
+    fresh = provider.get()
+
+    assert stale is first
+    assert fresh is not first
+    assert find_b5t_labels(fresh, "Aye sir") == ("WL", "ACK", "")
+
+
+def test_invalidate_reloads_unchanged_stat(tmp_path):
+    dict_path = tmp_path / "dictionary.csv"
+    write_dictionary(dict_path, "b5t,keywords\nWL,sir\n")
+    provider = DictionaryProvider(str(dict_path))
+    first = provider.get()
+
+    # Same size and restored mtime: only an explicit invalidate notices
+    stat = os.stat(dict_path)
+    write_dictionary(dict_path, "b5t,keywords\nWL,aye\n")
+    os.utime(dict_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert provider.get() is first
+
+    provider.invalidate()
+    provider.wait()
+    assert find_b5t_labels(provider.get(), "Aye") == ("WL", "", "")
+
+
+def test_missing_dictionary_is_empty(tmp_path):
+    provider = DictionaryProvider(str(tmp_path / "dictionary.csv"))
+    assert find_b5t_labels(provider.get(), "Aye sir") == ("99", "", "")
@@ -0,0 +1,89 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+import dictionary_artifact
+from classifier import find_b5t_labels
+from dictionary_artifact import load_compiled_dictionary
+from dictionary_provider import DictionaryProvider
+from dictionary_store import DictionaryStore
+
+
+@pytest.fixture(autouse=True)
+def cache_folder(tmp_path, monkeypatch):
+    folder = tmp_path / "cache"
+    monkeypatch.setattr(dictionary_artifact, "CACHE_FOLDER", str(folder))
+    return folder
+
+
+def dictionary_csv(keyword):
+    return f"b5t,keywords\nWL,{keyword}\n".encode("utf-8")
+
+
+def test_pinned_version_survives_later_saves(tmp_path):
+    store = DictionaryStore(str(tmp_path))
+    assert store.current_version() is None
+
+    store.save(dictionary_csv("sir"))
+    pinned = store.current_path()
+    store.save(dictionary_csv("aye"))
+
+    # The pinned version is unchanged; the current one and the mirror moved on
+    assert open(pinned, "rb").read() == dictionary_csv("sir")
+    assert open(store.current_path(), "rb").read() == dictionary_csv("aye")
+    assert open(store.dictionary_path, "rb").read() == dictionary_csv("aye")
+    assert find_b5t_labels(load_compiled_dictionary(pinned), "Aye sir") == ("WL", "", "")
+
+
+def test_old_versions_collected(tmp_path):
+    store = DictionaryStore(str(tmp_path), keep=1)
+    paths = [store.save(dictionary_csv(kw)) for kw in ["a", "b", "c"]]
+    load_compiled_dictionary(paths[0])
+    for age, path in enumerate(paths):
+        os.utime(path, (1000 + age, 1000 + age))
+    store.grace_seconds = 0
+    store.collect_garbage()
+
+    # The current version and the newest other one are kept
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1])
+    assert os.path.exists(paths[2])
+    # Artifacts compiled from a collected version go with it
+    assert not any(
+        name.startswith(f".{os.path.basename(paths[0])[:-4]}.")
+        for name in os.listdir(store.versions_folder)
+    )
+
+
+def test_grace_period_protects_recent_versions(tmp_path):
+    store = DictionaryStore(str(tmp_path), keep=0)
+    first = store.save(dictionary_csv("a"))
+    store.save(dictionary_csv("b"))
+
+    assert os.path.exists(first)
+
+
+def test_provider_follows_current_version(tmp_path):
+    store = DictionaryStore(str(tmp_path))
+    store.save(dictionary_csv("sir"))
+    provider = DictionaryProvider(store)
+    assert find_b5t_labels(provider.get(), "sir") == ("WL", "", "")
+
+    store.save(dictionary_csv("aye"))
+    provider.get()
+    provider.wait()
+    assert find_b5t_labels(provider.get(), "aye") == ("WL", "", "")
+
+
+def test_concurrent_saves_stay_consistent(tmp_path):
+    store = DictionaryStore(str(tmp_path), keep=100)
+    payloads = [dictionary_csv(f"keyword{i}") for i in range(16)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda data: [store.save(data) for _ in range(5)], payloads))
+
+    # Whichever save finished last left CURRENT and the mirror on one version
+    assert open(store.current_path(), "rb").read() == open(store.dictionary_path, "rb").read()
+    assert not [name for name in os.listdir(store.versions_folder) if name.endswith(".tmp")]
@@ -5,7 +5,36 @@ import sys
 import pandas as pd
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
-from file_processor import process_single_file, process_multi_files
+from classifier import compile_dictionary
+from file_processor import (
+    process_dataframe,
+    process_dataframes,
+    process_multi_files,
+    process_single_file,
+)
+
+# Keywords that occur in tests/sample_files/test.csv, so its rows get real codes
+SAMPLE_DICTIONARY = {
+    "ASP": "allocating",
+    "ORD": "down all masts",
+    "SA": "identified,s9,sierra 1",
+    "ACK": "roger,thank you",
+    "WL": "watchleader",
+    "SOL": "solution",
+}
+
+# (B5T, Subcategory1, Subcategory2) of some rows of test.csv coded with SAMPLE_DICTIONARY
+SAMPLE_CODES = {
+    0: ("TL", "ASP", ""),
+    1: ("TL", "ORD", ""),
+    2: ("SA", "", ""),
+    4: ("99", "", ""),
+    10: ("WL", "", ""),
+    13: ("SA", "ACK", ""),
+    17: ("SA", "ACK", "SOL"),
+    26: ("ACK", "SOL", ""),
+    31: ("99", "", ""),
+}
 
 
 class TestFileProcessor(unittest.TestCase):
@@ -23,6 +52,7 @@ class TestFileProcessor(unittest.TestCase):
         # Single file testing
         self.single_input = os.path.join(self.sample_files, "test.csv")
         self.single_output = os.path.join(self.output_dir, "output.csv")
+        self.compiled = compile_dictionary(SAMPLE_DICTIONARY)
 
         # Multiple files batch testing
         self.batch_input = [self.single_input, self.single_input]
@@ -55,6 +85,13 @@ class TestFileProcessor(unittest.TestCase):
         if os.path.exists(self.output_dir) and not os.listdir(self.output_dir):
             os.rmdir(self.output_dir)
 
+    def assert_sample_codes(self, df):
+        """Check the codes of rows of test.csv that match SAMPLE_DICTIONARY."""
+        self.assertEqual(len(df), 32)
+        codes = df[["B5T", "Subcategory1", "Subcategory2"]].astype(object).fillna("")
+        for row, expected in SAMPLE_CODES.items():
+            self.assertEqual(tuple(codes.iloc[row]), expected, f"row {row}")
+
     def test_process_single_file(self):
         """Test processing a single CSV file."""
         process_single_file(self.single_input, self.single_output)
@@ -114,6 +151,129 @@ class TestFileProcessor(unittest.TestCase):
             )
             self.assertGreater(len(df), 0, "A folder output file contains no rows.")
 
+    def test_parallel_batch_processing(self):
+        """Test that a worker pool reports results per file in input order."""
+        missing = os.path.join(self.sample_files, "missing.csv")
+        inputs = [self.single_input, missing, self.single_input]
+        outputs = self.batch_output + [self.single_output]
+        results = process_multi_files(inputs, outputs, workers=2)
+
+        self.assertEqual([r["input_file"] for r in results], inputs)
+        self.assertEqual([r["output_file"] for r in results], outputs)
+        self.assertIsNone(results[0]["error"])
+        self.assertIsNotNone(results[1]["error"], "Missing file should report an error.")
+        self.assertIsNone(results[2]["error"])
+
+        expected = pd.read_csv(self.batch_output[0])
+        pd.testing.assert_frame_equal(pd.read_csv(self.single_output), expected)
+        self.assertEqual(results[0]["rows"], len(expected))
+
+    def test_on_result_cancels_remaining_files(self):
+        """Test that returning False from on_result skips files not yet started."""
+        inputs = [self.single_input] * 3
+        outputs = self.batch_output + [self.single_output]
+        seen = []
+
+        def stop_after_first(position, result):
+            seen.append(position)
+            return False
+
+        results = process_multi_files(
+            inputs, outputs, workers=1, on_result=stop_after_first
+        )
+        self.assertEqual(seen, [0])
+        self.assertEqual([r["error"] for r in results], [None, "Cancelled", "Cancelled"])
+
+    def test_chunk_parallel_single_file(self):
+        """Test that splitting one file over workers keeps rows and codes in order."""
+        process_single_file(self.single_input, self.batch_output[0], self.compiled)
+        process_single_file(
+            self.single_input, self.batch_output[1], self.compiled, workers=2, chunk_rows=2
+        )
+
+        expected = pd.read_csv(self.batch_output[0])
+        self.assert_sample_codes(expected)
+        pd.testing.assert_frame_equal(pd.read_csv(self.batch_output[1]), expected)
+
+    def test_streaming_single_file(self):
+        """Test that streaming a file in blocks writes the same output."""
+        process_single_file(self.single_input, self.single_output, self.compiled)
+        expected = pd.read_csv(self.single_output)
+        self.assert_sample_codes(expected)
+
+        rows = process_single_file(
+            self.single_input, self.batch_output[0], self.compiled, chunksize=2
+        )
+        self.assertEqual(rows, len(expected))
+        pd.testing.assert_frame_equal(pd.read_csv(self.batch_output[0]), expected)
+
+        process_single_file(
+            self.single_input,
+            self.batch_output[1],
+            self.compiled,
+            workers=2,
+            chunk_rows=1,
+            chunksize=3,
+        )
+        pd.testing.assert_frame_equal(pd.read_csv(self.batch_output[1]), expected)
+
+    def coded_csv(self):
+        process_single_file(self.single_input, self.single_output, self.compiled)
+        with open(self.single_output) as f:
+            return f.read()
+
+    def test_in_memory_processing(self):
+        """Test that coding a DataFrame directly matches coding the CSV file."""
+        expected = self.coded_csv()
+        coded = process_dataframe(pd.read_csv(self.single_input), self.compiled)
+        self.assertEqual(coded.to_csv(index=False), expected)
+        self.assert_sample_codes(coded)
+
+    def test_code_columns_are_categorical(self):
+        """Test that codes are stored once per distinct value, not once per row."""
+        coded = process_dataframe(pd.read_csv(self.single_input), self.compiled)
+        for column in ["B5T", "Subcategory1", "Subcategory2"]:
+            self.assertIsInstance(coded[column].dtype, pd.CategoricalDtype)
+
+    def test_process_dataframes(self):
+        """Test that a bad transcript fails alone and the rest are coded."""
+        expected = self.coded_csv()
+        df = pd.read_csv(self.single_input)
+        results = process_dataframes(
+            [df, pd.DataFrame({"other": [1]}), df], self.compiled, workers=2
+        )
+        self.assertEqual([r["error"] is None for r in results], [True, False, True])
+        self.assertIsNone(results[1]["output"])
+        self.assertEqual(results[2]["output"].to_csv(index=False), expected)
+        self.assert_sample_codes(results[0]["output"])
+
+    def test_process_dataframes_summaries(self):
+        """Test that each coded frame comes with its B5T counts."""
+        df = pd.read_csv(self.single_input)
+        results = process_dataframes([df, pd.DataFrame({"other": [1]})], self.compiled)
+        self.assertIsNone(results[1]["summary"])
+        self.assertEqual(results[0]["summary"].total(), len(df))
+        self.assertEqual(
+            dict(results[0]["summary"].counts),
+            results[0]["output"]["B5T"].value_counts().to_dict(),
+        )
+
+    def test_process_dataframes_labels_and_crosstabs(self):
+        """Test that each coded frame comes with every label its rows matched and its cross-tabs."""
+        df = pd.read_csv(self.single_input)
+        results = process_dataframes([df, pd.DataFrame({"other": [1]})], self.compiled)
+        self.assertIsNone(results[1]["labels"])
+        self.assertIsNone(results[1]["crosstabs"])
+        labels = results[0]["labels"]
+        self.assertEqual(len(labels), len(df))
+        self.assertEqual(labels.row_labels(17), ["SA", "ACK", "SOL"])
+        self.assertEqual(labels.row_labels(4), [])
+        coded = results[0]["output"]
+        self.assertEqual(
+            results[0]["crosstabs"]["Subcategory1"].counts[("SA", "ACK")],
+            int(((coded["B5T"] == "SA") & (coded["Subcategory1"] == "ACK")).sum()),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,158 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+import incremental
+import result_cache
+from classifier import classify_series, compile_dictionary
+from file_processor import process_dataframe
+from incremental import TranscriptIndex, dictionary_diff, recode
+from result_cache import ResultCache, content_hash
+from summary_report import FrequencyCounter, count_crosstabs
+
+OLD = {"ASP": "allocating, assign", "WL": "sir", "ORD": "down all masts", "Q": "?"}
+TEXTS = [
+    "Allocating you S1",
+    "Aye sir",
+    "Down all masts, sir",
+    "Assign tracker",
+    "downallmasts",
+    "What?",
+    "Roger that",
+    "Aye sir",
+]
+
+
+def compiled(b5t_dict, content_hash):
+    result = compile_dictionary(b5t_dict)
+    result.content_hash = content_hash
+    return result
+
+
+def test_diff_lists_changed_keywords():
+    new = dict(OLD, ASP="allocating, assigning", ORD="down all masts, roger")
+    assert dictionary_diff(OLD, new) == {"assign", "assigning", "roger"}
+    # A label moved to the end of the dictionary reorders every match
+    reordered = {"WL": "sir", "ORD": "down all masts", "Q": "?", "ASP": "allocating, assign"}
+    assert dictionary_diff(OLD, reordered) is None
+    # Punctuation-initial keywords cannot be found by word token
+    assert dictionary_diff(OLD, dict(OLD, Q="?, -ve")) is None
+    # Added and removed labels are fine while kept labels keep their order
+    assert dictionary_diff(OLD, {"ACK": "aye", **OLD}) == {"aye"}
+
+
+def test_rows_containing_needs_every_token():
+    index = TranscriptIndex(pd.Series(TEXTS))
+    assert list(index.rows_containing(["aye sir"])) == [1, 7]
+    assert list(index.rows_containing(["all masts", "tracker"])) == [2, 3]
+    assert list(index.rows_containing(["unknown"])) == []
+
+
+def test_recode_matches_full_recode():
+    df = pd.DataFrame({"text": TEXTS})
+    old_df = process_dataframe(df, OLD)
+    index = TranscriptIndex(old_df["Text"])
+    for new in [
+        dict(OLD, WL="sir, roger"),
+        {"ACK": "aye", **OLD},
+        {label: kws for label, kws in OLD.items() if label != "WL"},
+        dict(OLD, ORD="down all masts, masts"),
+    ]:
+        recoded = recode(old_df, index, OLD, new)
+        pd.testing.assert_frame_equal(recoded, process_dataframe(df, new))
+    assert recode(old_df, index, OLD, dict(OLD, Q="-ve")) is None
+
+
+def test_recode_updates_label_matrix():
+    df = pd.DataFrame({"text": TEXTS})
+    old_df, old_labels = process_dataframe(df, OLD, with_labels=True)
+    index = TranscriptIndex(old_df["Text"])
+    for new in [dict(OLD, WL="sir, roger"), {"ACK": "aye", **OLD}]:
+        recoded, labels = recode(old_df, index, OLD, new, old_labels)
+        expected = process_dataframe(df, new, with_labels=True)[1]
+        assert labels.labels == expected.labels
+        assert [labels.row_labels(i) for i in range(len(TEXTS))] == [
+            expected.row_labels(i) for i in range(len(TEXTS))
+        ]
+
+
+def test_cache_recodes_from_earlier_version(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    file_hash = content_hash(b"uploaded transcript")
+    old, new = compiled(OLD, "v1"), compiled(dict(OLD, WL="sir, roger"), "v2")
+    df = pd.DataFrame({"text": TEXTS})
+
+    assert cache.get_coded(file_hash, old) is None
+    cache.put_coded(file_hash, old, process_dataframe(df, old))
+
+    recoded = cache.get_coded(file_hash, new)
+    pd.testing.assert_frame_equal(recoded, process_dataframe(df, new))
+    # The recoded output is stored for the new version
+    pd.testing.assert_frame_equal(cache.get(ResultCache.key(file_hash, "v2")), recoded)
+
+
+def test_cache_stores_summaries(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    file_hash = content_hash(b"uploaded transcript")
+    old, new = compiled(OLD, "v1"), compiled(dict(OLD, WL="sir, roger"), "v2")
+    df = pd.DataFrame({"text": TEXTS})
+
+    assert cache.get_summary(file_hash, old) is None
+    cache.put_coded(file_hash, old, process_dataframe(df, old))
+    expected = FrequencyCounter.from_series(process_dataframe(df, old)["B5T"])
+    assert cache.get_summary(file_hash, old) == expected
+
+    # A recoded version gets its own summary
+    cache.get_coded(file_hash, new)
+    expected = FrequencyCounter.from_series(process_dataframe(df, new)["B5T"])
+    assert cache.get_summary(file_hash, new) == expected
+
+
+def test_cache_stores_label_matrices(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    file_hash = content_hash(b"uploaded transcript")
+    old, new = compiled(OLD, "v1"), compiled(dict(OLD, WL="sir, roger"), "v2")
+    df = pd.DataFrame({"text": TEXTS})
+
+    assert cache.get_labels(file_hash, old) is None
+    coded, labels = process_dataframe(df, old, with_labels=True)
+    cache.put_coded(file_hash, old, coded, labels=labels)
+    stored = cache.get_labels(file_hash, old)
+    assert [stored.row_labels(i) for i in range(len(TEXTS))] == [
+        labels.row_labels(i) for i in range(len(TEXTS))
+    ]
+
+    # A recoded version gets its matrix recoded with it
+    cache.get_coded(file_hash, new)
+    expected = process_dataframe(df, new, with_labels=True)[1]
+    recoded = cache.get_labels(file_hash, new)
+    assert [recoded.row_labels(i) for i in range(len(TEXTS))] == [
+        expected.row_labels(i) for i in range(len(TEXTS))
+    ]
+    assert recoded.row_labels(6) == ["WL"]
+
+
+def test_cache_recode_classifies_only_changed_rows(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    file_hash = content_hash(b"uploaded transcript")
+    old, new = compiled(OLD, "v1"), compiled(dict(OLD, WL="sir, roger"), "v2")
+    coded, labels = process_dataframe(pd.DataFrame({"text": TEXTS}), old, with_labels=True)
+    cache.put_coded(file_hash, old, coded, labels=labels)
+
+    classified = []
+
+    def counting_classify_series(texts, *args, **kwargs):
+        classified.extend(texts)
+        return classify_series(texts, *args, **kwargs)
+
+    monkeypatch.setattr(incremental, "classify_series", counting_classify_series)
+    monkeypatch.setattr(result_cache, "classify_series", counting_classify_series)
+    cache.get_coded(file_hash, new)
+    cache.get_labels(file_hash, new)
+    crosstabs = cache.get_crosstabs(file_hash, new)
+    assert classified == ["Roger that"]
+
+    expected = count_crosstabs(*process_dataframe(pd.DataFrame({"text": TEXTS}), new, with_labels=True))
+    assert crosstabs == expected
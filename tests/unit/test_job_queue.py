@@ -0,0 +1,111 @@
+import os
+import sys
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+import dictionary_artifact
+import job_queue
+from job_queue import CANCELLED, DONE, FAILED, JobQueue
+
+
+@pytest.fixture
+def cache_folder(tmp_path, monkeypatch):
+    folder = tmp_path / "cache"
+    monkeypatch.setattr(dictionary_artifact, "CACHE_FOLDER", str(folder))
+    return folder
+
+
+def make_dictionary(tmp_path):
+    path = tmp_path / "dictionary.csv"
+    path.write_text("b5t,keywords\nWL,sir\nASP,allocating\n", encoding="utf-8")
+    return str(path)
+
+
+def transcripts():
+    return [
+        ("a.csv", pd.DataFrame({"text": ["Aye sir", "Allocating S1"]})),
+        ("bad.csv", pd.DataFrame({"other": ["no text column"]})),
+        ("b.csv", pd.DataFrame({"Text": ["Roger"]})),
+    ]
+
+
+def wait_for(queue, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = next(j for j in queue.jobs() if j["id"] == job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_run_records_per_file_progress(tmp_path, cache_folder):
+    queue = JobQueue(str(tmp_path / "jobs"))
+    job_id = queue.submit(transcripts(), make_dictionary(tmp_path), start=False)
+    queue.run(job_id)
+
+    job = queue.jobs()[0]
+    assert (job["status"], job["finished"], job["total"]) == (DONE, 3, 3)
+    files = queue.files(job_id)
+    assert [f["status"] for f in files] == [DONE, FAILED, DONE]
+    assert [f["rows"] for f in files] == [2, 0, 1]
+    coded = pd.read_csv(files[0]["output_path"])
+    assert list(coded["B5T"]) == ["WL", "TL"]
+
+
+def test_cancelled_job_does_not_run(tmp_path, cache_folder):
+    queue = JobQueue(str(tmp_path / "jobs"))
+    job_id = queue.submit(transcripts(), make_dictionary(tmp_path), start=False)
+    queue.cancel(job_id)
+    queue.run(job_id)
+
+    assert queue.jobs()[0]["status"] == CANCELLED
+    assert {f["status"] for f in queue.files(job_id)} == {CANCELLED}
+    assert not os.path.exists(queue.files(job_id)[0]["output_path"])
+
+
+def test_detached_runner_and_resume(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs"))
+    dictionary_path = make_dictionary(tmp_path)
+    job_id = queue.submit(transcripts(), dictionary_path)
+    assert wait_for(queue, job_id)["status"] == DONE
+
+    # A job left without a live runner, e.g. by a server restart, is picked up
+    other_id = queue.submit(transcripts(), dictionary_path, start=False)
+    assert queue.resume() == [other_id]
+    assert wait_for(queue, other_id)["status"] == DONE
+    assert queue.resume() == []
+
+    # Deleting a job also removes the artifact its runner compiled
+    artifact = dictionary_artifact.artifact_path(
+        queue._dictionary_path(job_id),
+        dictionary_artifact.dictionary_hash(open(dictionary_path, "rb").read()),
+    )
+    assert os.path.exists(artifact)
+    queue.delete(job_id)
+    assert [j["id"] for j in queue.jobs()] == [other_id]
+    assert not os.path.exists(queue.job_folder(job_id))
+    assert not os.path.exists(artifact)
+    queue.delete(other_id)
+
+
+def test_failed_launch_releases_the_job(tmp_path, monkeypatch):
+    queue = JobQueue(str(tmp_path / "jobs"))
+    job_id = queue.submit(transcripts(), make_dictionary(tmp_path), start=False)
+
+    def fail(*args, **kwargs):
+        raise OSError("cannot start runner")
+
+    monkeypatch.setattr(job_queue.subprocess, "Popen", fail)
+    with pytest.raises(OSError):
+        queue.start(job_id)
+    assert queue.jobs()[0]["pid"] is None
+
+    # The job can still be launched once starting works again
+    monkeypatch.undo()
+    assert queue.start(job_id)
+    assert wait_for(queue, job_id)["status"] == DONE
+    queue.delete(job_id)
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+from classifier import ClassificationMemo, classify_series, compile_dictionary
+from label_matrix import LabelMatrix, file_label_counts
+
+DICTIONARY = {
+    "WL": "sir",
+    "ASP": "allocating",
+    "ORD": "down all masts",
+    "DUP": "duplicate",
+    "ACK": "aye, roger",
+    "Q": "what",
+}
+TEXTS = pd.Series(
+    [
+        "Aye sir, allocating and down all masts, duplicate what",
+        "Roger",
+        None,
+        "Nothing here",
+        "Aye sir",
+        "Roger",
+    ]
+)
+
+
+def test_matrix_keeps_every_matched_label():
+    compiled = compile_dictionary(DICTIONARY)
+    coded, matrix = classify_series(TEXTS, compiled, with_labels=True)
+    pd.testing.assert_frame_equal(coded, classify_series(TEXTS, compiled))
+
+    assert matrix.shape == (6, 6)
+    assert [matrix.row_labels(i) for i in range(len(matrix))] == [
+        compiled.match(text) if text else [] for text in TEXTS
+    ]
+    # The resolved columns keep only four of the six labels of the first row
+    assert matrix.row_labels(0) == ["WL", "ASP", "ORD", "DUP", "ACK", "Q"]
+    assert coded.iloc[0].tolist() == ["WL", "ASP", "ORD,DUP"]
+
+
+def test_matrix_is_the_same_with_a_memo():
+    compiled = compile_dictionary(DICTIONARY)
+    memo = ClassificationMemo()
+    first = classify_series(TEXTS, compiled, memo, with_labels=True)[1]
+    second = classify_series(TEXTS, compiled, memo, with_labels=True)[1]
+    assert memo.hits > 0
+    np.testing.assert_array_equal(first.to_dense(), second.to_dense())
+
+
+def test_reports_from_matrix():
+    compiled = compile_dictionary(DICTIONARY)
+    coded, matrix = classify_series(TEXTS, compiled, with_labels=True)
+    dense = matrix.to_dense().astype(int)
+
+    counts = matrix.label_counts()
+    assert counts.to_dict() == {"WL": 2, "ASP": 1, "ORD": 1, "DUP": 1, "ACK": 4, "Q": 1}
+
+    cooccurrence = matrix.cooccurrence()
+    np.testing.assert_array_equal(cooccurrence.to_numpy(), dense.T @ dense)
+    assert cooccurrence.loc["WL", "ACK"] == 2
+
+    crosstab = matrix.crosstab(coded["B5T"])
+    assert list(crosstab.index) == ["99", "ACK", "WL"]
+    assert crosstab.loc["WL"].to_dict() == {
+        "WL": 2, "ASP": 1, "ORD": 1, "DUP": 1, "ACK": 2, "Q": 1
+    }
+    assert crosstab.loc["ACK", "ACK"] == 2
+    assert crosstab.loc["99"].sum() == 0
+
+
+def test_concat_and_per_file_counts():
+    compiled = compile_dictionary(DICTIONARY)
+    first = classify_series(TEXTS[:3], compiled, with_labels=True)[1]
+    second = classify_series(TEXTS[3:], compiled, with_labels=True)[1]
+    whole = classify_series(TEXTS, compiled, with_labels=True)[1]
+
+    stacked = LabelMatrix.concat([first, second])
+    np.testing.assert_array_equal(stacked.to_dense(), whole.to_dense())
+
+    per_file = file_label_counts([first, second], ["a.csv", "b.csv"])
+    assert per_file.loc["b.csv"].to_dict() == {
+        "WL": 1, "ASP": 0, "ORD": 0, "DUP": 0, "ACK": 2, "Q": 0
+    }
+    assert per_file.sum().to_dict() == whole.label_counts().to_dict()
+
+    other = classify_series(TEXTS, compile_dictionary({"WL": "sir"}), with_labels=True)[1]
+    with pytest.raises(ValueError):
+        LabelMatrix.concat([first, other])
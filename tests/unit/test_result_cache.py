@@ -0,0 +1,76 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+import result_cache
+from result_cache import ResultCache, content_hash
+
+
+def coded_frame(rows=3):
+    return pd.DataFrame(
+        {"Text": ["Aye sir"] * rows, "B5T": ["WL"] * rows, "Subcategory1": [""] * rows}
+    )
+
+
+def test_round_trip_and_keying(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = ResultCache.key(content_hash(b"text\nAye sir\n"), "dict-a")
+
+    assert cache.get(key) is None
+    cache.put(key, coded_frame())
+    pd.testing.assert_frame_equal(cache.get(key), coded_frame())
+
+    # The same transcript coded with another dictionary is a different entry
+    assert cache.get(ResultCache.key(content_hash(b"text\nAye sir\n"), "dict-b")) is None
+    # A second cache over the same folder (another session) sees the entry
+    assert ResultCache(str(tmp_path)).get(key) is not None
+
+
+def test_entries_are_keyed_by_cache_format(tmp_path, monkeypatch):
+    file_hash = content_hash(b"text\nAye sir\n")
+    key = ResultCache.key(file_hash, "dict-a")
+    ResultCache(str(tmp_path)).put(key, coded_frame())
+
+    # Entries written by code with another output or pickle layout are not loaded
+    monkeypatch.setattr(result_cache, "CACHE_FORMAT", "0.0")
+    assert ResultCache.key(file_hash, "dict-a") != key
+    assert ResultCache(str(tmp_path)).get(ResultCache.key(file_hash, "dict-a")) is None
+
+
+def test_least_recently_used_entries_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    for name in ["a", "b", "c"]:
+        cache.put(name, coded_frame(1000))
+    entry_size = os.path.getsize(tmp_path / "a.pkl")
+    for age, name in enumerate(["a", "b", "c"]):
+        os.utime(tmp_path / f"{name}.pkl", (1000 + age, 1000 + age))
+
+    # Reading "a" makes "b" the least recently used entry
+    cache.get("a")
+    cache.max_bytes = entry_size * 2
+    cache.evict()
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    (tmp_path / "broken.pkl").write_bytes(b"not a pickle")
+
+    assert cache.get("broken") is None
+    assert not (tmp_path / "broken.pkl").exists()
+
+
+def test_concurrent_puts(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = ResultCache.key(content_hash(b"text\nAye sir\n"), "dict-a")
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda _: cache.put(key, coded_frame()), range(120)))
+
+    pd.testing.assert_frame_equal(cache.get(key), coded_frame())
+    assert os.listdir(tmp_path) == [f"{key}.pkl"]
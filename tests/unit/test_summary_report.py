@@ -0,0 +1,91 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
+from classifier import classify_series
+from summary_report import (
+    CrosstabCounter,
+    FrequencyCounter,
+    combine,
+    count_crosstabs,
+    count_csv,
+    generate_summary_report,
+    main,
+    summarize_directory,
+)
+
+
+def write_coded(path, codes):
+    pd.DataFrame({"Text": ["x"] * len(codes), "B5T": codes}).to_csv(path, index=False)
+
+
+def test_chunked_count_matches_value_counts(tmp_path):
+    codes = ["TL", "99", "WL", "99", None, "TL", "99"]
+    write_coded(tmp_path / "coded.csv", codes)
+
+    counter = count_csv(str(tmp_path / "coded.csv"), chunksize=2)
+    expected = pd.Series(codes).value_counts()
+    assert counter.counts == {code: n for code, n in expected.items()}
+    # Numeric-looking codes count the same from files and from DataFrames
+    assert counter == FrequencyCounter.from_series(pd.Series([99, 99, 99, "TL", "TL", "WL"]))
+    # Categorical code columns count the same, without their unused categories
+    categorical = pd.Series(pd.Categorical(codes, categories=["99", "ASP", "TL", "WL"]))
+    assert FrequencyCounter.from_series(categorical) == counter
+
+
+def test_report_sorted_by_frequency(tmp_path):
+    write_coded(tmp_path / "coded.csv", ["WL", "TL", "TL", "ASP"])
+    generate_summary_report(str(tmp_path / "coded.csv"), str(tmp_path / "report.csv"))
+
+    report = pd.read_csv(tmp_path / "report.csv")
+    assert list(report.columns) == ["B5T", "Frequency"]
+    assert list(report["B5T"]) == ["TL", "ASP", "WL"]
+
+
+def test_directory_totals_merge_per_file_counts(tmp_path):
+    write_coded(tmp_path / "a.csv", ["TL", "99"])
+    write_coded(tmp_path / "b.csv", ["TL", "WL"])
+    (tmp_path / "bad.csv").write_text("Text\nno codes\n")
+
+    results = summarize_directory(str(tmp_path), workers=2)
+    assert [os.path.basename(r["input_file"]) for r in results] == ["a.csv", "b.csv", "bad.csv"]
+    assert results[2]["counter"] is None and results[2]["error"]
+
+    total = combine(r["counter"] for r in results[:2])
+    assert total.counts == {"TL": 2, "99": 1, "WL": 1}
+    assert list(total.to_frame()["B5T"]) == ["99", "TL", "WL"]
+
+
+def test_crosstabs_merge_per_file_counts():
+    b5t_dict = {"ACK": "aye", "WL": "sir", "ASP": "allocating"}
+    parts = [pd.Series(["Aye sir", "Sir", "Aye"]), pd.Series(["Allocating sir", None, "Hello"])]
+    coded = [classify_series(texts, b5t_dict, with_labels=True) for texts in parts]
+    merged = sum(count_crosstabs(df, labels)["Subcategory1"] for df, labels in coded)
+    merged_labels = sum(count_crosstabs(df, labels)["Label"] for df, labels in coded)
+
+    whole, labels = classify_series(pd.concat(parts, ignore_index=True), b5t_dict, with_labels=True)
+    expected = pd.crosstab(whole["B5T"], whole["Subcategory1"])
+    assert (merged.to_frame().to_numpy() == expected.to_numpy()).all()
+    assert list(merged.to_frame().columns) == list(expected.columns)
+    # Label columns stay in dictionary order, rows without a match are left out
+    by_label = merged_labels.to_frame()
+    assert list(by_label.columns) == ["ACK", "WL", "ASP"]
+    assert list(by_label.index) == ["ACK", "WL"]
+    assert by_label.loc["WL"].tolist() == [1, 3, 1]
+    assert merged_labels == CrosstabCounter.from_labels(whole["B5T"], labels)
+
+
+def test_main_writes_combined_and_per_file(tmp_path):
+    coded = tmp_path / "coded"
+    coded.mkdir()
+    write_coded(coded / "a.csv", ["TL", "99"])
+    write_coded(coded / "b.csv", ["TL"])
+
+    exit_code = main(
+        [str(coded), "-o", str(tmp_path / "total.csv"), "--per-file-dir", str(tmp_path / "per")]
+    )
+    assert exit_code == 0
+    assert pd.read_csv(tmp_path / "total.csv")["Frequency"].tolist() == [1, 2]
+    assert os.path.exists(tmp_path / "per" / "B5T_frequency_a.csv")